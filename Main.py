@@ -1,169 +1,524 @@
+import argparse
+import itertools
 import os
 import sqlite3
-from pkmOCR import process_image  # Import the function from pkmOCR.py
+import threading
+import instrumentation
+from instrumentation import instrumented, timed
+from leagueBuild import LEAGUES
+from tableVersions import get_table_version
+
+# pkmOCR (OpenCV, EasyOCR, torch) is imported inside process_folder, so ranking lookups start fast
 
 # Database path
 DB_PATH = 'pokemon.db'
 
+# Report written by process_folder
+REPORT_PATH = "pokemon_rankings.txt"
+
+# Screenshot formats process_folder picks up (screen recordings: videoFrames.VIDEO_EXTENSIONS)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Optional packed rank index written by rankIndex.py; when the file exists it answers get_rankings
+RANK_INDEX_PATH = 'pokemon_ranks.bin'
+
+# (DB_PATH, RANK_INDEX_PATH, file identity, RankIndex or None, league_rankings version) as last
+# checked by check_rank_index
+_rank_index = None
+
+# Per-thread SQLite connection reused by every lookup (see get_connection)
+_connections = threading.local()
+
+# Requests per batched query; keeps the bound parameters below SQLite's limit of 999
+LOOKUP_CHUNK_SIZE = 150
+
+# Tables kept in memory by the lookups (name index, evolution graph, CP index), reloaded when
+# statScraping.py or evolineScraping.py bumps their version in table_versions
+CACHED_TABLES = ('pokemon_stats', 'pokemon_evoline')
+
+# (DB_PATH, versions of CACHED_TABLES) as last read by refresh_table_versions
+_table_versions = None
+
+# (table versions, NameIndex) built by get_name_index on first use
+_name_index = None
+
+# (table versions, EvolutionGraph) loaded by get_evolution_graph
+_evolution_graph = None
+
+
+# Function to read the versions of the tables kept in memory, once per lookup batch
+def refresh_table_versions():
+    """Called at the start of every lookup batch, so single lookups such as resolve_pokemon_name
+    and get_rankings run no SQL while a refreshed table or rank index is still picked up by the
+    next batch."""
+    global _table_versions
+    cursor = get_connection().cursor()
+    previous = _table_versions
+    _table_versions = (DB_PATH, tuple(get_table_version(cursor, table) for table in CACHED_TABLES))
+
+    # The CP index and the custom rankings cache base stats per species
+    if previous is not None and previous[0] == DB_PATH and previous[1][0] != _table_versions[1][0]:
+        from cpIndex import clear_caches
+        clear_caches()
+
+    check_rank_index(get_table_version(cursor, 'league_rankings'))
+    return _table_versions
+
+
+# Function to get the table versions read by the last refresh_table_versions (reading them on first use)
+def get_table_versions():
+    if _table_versions is None or _table_versions[0] != DB_PATH:
+        return refresh_table_versions()
+    return _table_versions
+
+
+# Function to build the fuzzy name index once, rebuilding it after pokemon_stats or pokemon_evoline changed
+def get_name_index():
+    global _name_index
+    from nameIndex import build_name_index
+
+    versions = get_table_versions()
+    if _name_index is None or _name_index[0] != versions:
+        _name_index = (versions, build_name_index(DB_PATH))
+        instrumentation.register_cache("name_index", _name_index[1].lookup)
+    return _name_index[1]
+
+
+# Function to map an OCR'd name to the closest known Pokémon name
+@instrumented("lookup.names")
+def resolve_pokemon_name(pokemon_name):
+    """Returns (known name, edit distance), or (pokemon_name, None) if no known name is close enough."""
+    return get_name_index().lookup(pokemon_name) or (pokemon_name, None)
+
+
+# Function to reuse one SQLite connection per thread for every lookup
+def get_connection():
+    """Returns this thread's connection to DB_PATH, opening it on first use (or after DB_PATH changed)."""
+    conn = getattr(_connections, "conn", None)
+    if conn is None or _connections.db_path != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(DB_PATH)
+        _connections.conn, _connections.db_path = conn, DB_PATH
+    return conn
+
+
+# Function to get the pokemon_id of many pokemon_names with one query
+@instrumented("lookup.ids")
+def get_pokemon_ids_by_names(pokemon_names):
+    """Returns {pokemon_name: pokemon_id} for the names found in pokemon_stats (the lowest id if a name repeats)."""
+    pokemon_names = list(set(pokemon_names))
+    pokemon_ids = {}
+    cursor = get_connection().cursor()
+    for start in range(0, len(pokemon_names), LOOKUP_CHUNK_SIZE):
+        chunk = pokemon_names[start:start + LOOKUP_CHUNK_SIZE]
+        cursor.execute(f"""
+            SELECT pokemon_name, pokemon_id FROM pokemon_stats
+            WHERE pokemon_name IN ({', '.join('?' * len(chunk))}) ORDER BY pokemon_id
+        """, chunk)
+        for pokemon_name, pokemon_id in cursor.fetchall():
+            pokemon_ids.setdefault(pokemon_name, pokemon_id)
+    return pokemon_ids
+
 
 # Function to get pokemon_id by pokemon_name
 def get_pokemon_id_by_name(pokemon_name):
     """Fetches the pokemon_id for a given pokemon_name."""
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT pokemon_id FROM pokemon_stats WHERE pokemon_name = ?", (pokemon_name,))
-        result = cursor.fetchone()
-        return result[0] if result else None
+    return get_pokemon_ids_by_names([pokemon_name]).get(pokemon_name)
+
+
+# Function to load the evolution graph once, reloading it after evolineScraping.py refreshed the table
+def get_evolution_graph():
+    global _evolution_graph
+    from evolutionGraph import load_evolution_graph
+
+    versions = get_table_versions()
+    if _evolution_graph is None or _evolution_graph[0] != versions:
+        _evolution_graph = (versions, load_evolution_graph(get_connection().cursor()))
+    return _evolution_graph[1]
+
+
+# Function to get the relevant evolutions of many Pokémon from the in-memory evolution graph
+@instrumented("lookup.evolutions")
+def get_relevant_evolutions_batch(pokemon_names):
+    """Returns {pokemon_name: relevant evolutions} for the names found in pokemon_evoline."""
+    evolution_graph = get_evolution_graph()
+    return {pokemon_name: evolution_graph.relevant_evolutions(pokemon_name)
+            for pokemon_name in pokemon_names if pokemon_name in evolution_graph.descendants}
 
 
 # Function to get relevant evolutions based on the Pokémon's stage
 def get_relevant_evolutions(pokemon_name):
-    """Fetches relevant evolutions for a given pokemon_name based on its evolution stage."""
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT basic, stage2, stage3 FROM pokemon_evoline
-            WHERE basic = ? OR stage2 = ? OR stage3 = ?
-        """, (pokemon_name, pokemon_name, pokemon_name))
-
-        result = cursor.fetchone()
-
-        if not result:
-            return []
-
-        # Identify the evolution stage and filter based on requirements
-        basic, stage2, stage3 = result
-        if pokemon_name == basic:
-            # If the Pokémon is basic, return itself, stage1, and stage2
-            return [basic] + [stage for stage in [stage2, stage3] if stage]
-        elif pokemon_name == stage2:
-            # If the Pokémon is stage1, return itself (stage1) and stage2
-            return [stage2] + ([stage3] if stage3 else [])
-        elif pokemon_name == stage3:
-            # If the Pokémon is stage2, return only itself (stage2)
-            return [stage3]
-        return []
+    """Returns the Pokémon itself and every Pokémon it can evolve into, across all branches."""
+    return get_evolution_graph().relevant_evolutions(pokemon_name)
+
+
+# Function to (re)open the packed rank index and check it against the league_rankings version, once per lookup batch
+def check_rank_index(rankings_version):
+    """The file is reopened whenever it is replaced (e.g. re-exported while watchFolder.py runs). An
+    index exported before the last league build is ignored, with a note, until it is re-exported."""
+    global _rank_index
+    previous = _rank_index
+    try:
+        stat = os.stat(RANK_INDEX_PATH) if RANK_INDEX_PATH else None
+    except OSError:
+        stat = None
+    if stat is None:
+        _rank_index = (DB_PATH, RANK_INDEX_PATH, None, None, rankings_version)
+        return
+
+    identity = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    if previous is not None and previous[1:3] == (RANK_INDEX_PATH, identity):
+        rank_index = previous[3]
+    else:
+        from rankIndex import RankIndex
+        try:
+            rank_index = RankIndex(RANK_INDEX_PATH)
+        except (OSError, ValueError) as e:
+            print(f"[DEBUG] Ignoring rank index {RANK_INDEX_PATH}: {e}")
+            rank_index = None
+    _rank_index = (DB_PATH, RANK_INDEX_PATH, identity, rank_index, rankings_version)
+
+    stale = rank_index is not None and rank_index.rankings_version != rankings_version
+    if stale and (previous is None or previous[3:] != (rank_index, rankings_version)):
+        print(f"[DEBUG] {RANK_INDEX_PATH} is older than league_rankings; querying SQLite until it is "
+              f"re-exported (python rankIndex.py --output {RANK_INDEX_PATH}).")
+
+
+# Function to get the packed rank index checked by the last refresh_table_versions
+def get_rank_index():
+    """Returns the RankIndex, or None to query SQLite instead (no index, or one older than league_rankings).
+
+    Costs no system call or SQL: the file and the league_rankings version are only checked once
+    per lookup batch, by refresh_table_versions.
+    """
+    if _rank_index is None or _rank_index[:2] != (DB_PATH, RANK_INDEX_PATH):
+        refresh_table_versions()
+    rank_index, rankings_version = _rank_index[3:]
+    if rank_index is None or rank_index.rankings_version != rankings_version:
+        return None
+    return rank_index
+
+
+# Function to query the rankings of many (pokemon_id, IVs) requests in every league at once
+@instrumented("lookup.rankings")
+def get_rankings_batch(requests):
+    """requests is a list of (pokemon_id, iv_attack, iv_defense, iv_stamina); returns one get_rankings dict per request.
+
+    Served by the packed rank index when available, otherwise by one query per LOOKUP_CHUNK_SIZE
+    requests over the persistent connection.
+    """
+    rank_index = get_rank_index()
+    if rank_index is not None:
+        return [rank_index.get_rankings(*request) for request in requests]
+
+    all_rankings = [{settings["name"]: "No ranking data found." for settings in LEAGUES.values()}
+                    for _ in requests]
+    cursor = get_connection().cursor()
+
+    for start in range(0, len(requests), LOOKUP_CHUNK_SIZE):
+        chunk = requests[start:start + LOOKUP_CHUNK_SIZE]
+
+        # One primary key seek per request and league on the league_rankings covering index
+        try:
+            cursor.execute(f"""
+                WITH requested (request, pokemon_id, iv_attack, iv_defense, iv_stamina) AS (
+                    VALUES {', '.join(['(?, ?, ?, ?, ?)'] * len(chunk))}
+                )
+                SELECT requested.request, league, rank, sp, cp, level, percentage
+                FROM requested CROSS JOIN league_rankings
+                WHERE league IN ({', '.join('?' * len(LEAGUES))})
+                  AND league_rankings.pokemon_id = requested.pokemon_id
+                  AND league_rankings.iv_attack = requested.iv_attack
+                  AND league_rankings.iv_defense = requested.iv_defense
+                  AND league_rankings.iv_stamina = requested.iv_stamina
+            """, [value for i, request in enumerate(chunk, start) for value in (i, *request)] + list(LEAGUES))
+
+            for request, league, rank, sp, cp, level, percentage in cursor.fetchall():
+                all_rankings[request][LEAGUES[league]["name"]] = {
+                    "rank": rank,
+                    "stat_product": sp,
+                    "combat_power": cp,
+                    "level": level,
+                    "percentage": percentage
+                }
+
+        except sqlite3.Error as e:
+            print(f"[DEBUG] Error querying league rankings: {e}")
+            for i in range(start, start + len(chunk)):
+                all_rankings[i] = {league: "Error querying league data." for league in all_rankings[i]}
+
+    return all_rankings
 
 
 # Function to query the database for rankings in different leagues
 def get_rankings(pokemon_id, iv_attack, iv_defense, iv_stamina):
-    """Fetches rankings for each league."""
-    rankings = {}
-
-    # Connect to the database
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-
-        # League tables mapping
-        league_tables = {
-            "Little Cup": f"LC_{pokemon_id}_stats",
-            "Great League": f"GL_{pokemon_id}_stats",
-            "Ultra League": f"UL_{pokemon_id}_stats",
-            "Master League": f"ML_{pokemon_id}_stats"
-        }
-
-        # Query each league table using pokemon_id
-        for league, table_name in league_tables.items():
-            try:
-                query = f"""
-                    SELECT rank, sp, cp, level, percentage
-                    FROM {table_name}
-                    WHERE pokemon_id = ? AND iv_attack = ? AND iv_defense = ? AND iv_stamina = ?
-                    ORDER BY rank ASC
-                """
-                cursor.execute(query, (pokemon_id, iv_attack, iv_defense, iv_stamina))
-
-                result = cursor.fetchone()
-                if result:
-                    rankings[league] = {
-                        "rank": result[0],
-                        "stat_product": result[1],
-                        "combat_power": result[2],
-                        "level": result[3],
-                        "percentage": result[4]
-                    }
-                else:
-                    rankings[league] = "No ranking data found."
-
-            except sqlite3.Error as e:
-                print(f"[DEBUG] Error querying {league}: {e}")
-                rankings[league] = "Error querying league data."
-
-    return rankings
+    """Fetches rankings for each league, from the packed rank index when available."""
+    return get_rankings_batch([(pokemon_id, iv_attack, iv_defense, iv_stamina)])[0]
+
+
+# Function to write the league rankings of one evolution
+def write_rankings(output_file, evo_name, rankings):
+    output_file.write(f"\n--- Rankings for {evo_name} ---\n")
+    for league, result in rankings.items():
+        output_file.write(f"--- {league} ---\n")
+        if isinstance(result, dict):
+            output_file.write(f"  Rank: {result['rank']}\n")
+            output_file.write(f"  Stat Product (SP): {result['stat_product']}\n")
+            output_file.write(f"  Combat Power (CP): {result['combat_power']}\n")
+            output_file.write(f"  Level: {result['level']}\n")
+            output_file.write(f"  Percentage: {result['percentage']}%\n")
+        else:
+            output_file.write(f"  {result}\n")
+
+
+# Function to look up the rankings of every relevant evolution of many Pokémon at once
+def lookup_evolution_rankings_batch(requests):
+    """requests is a list of (pokemon_name, iv_attack, iv_defense, iv_stamina).
+
+    Returns one lookup_evolution_rankings result per request. The evolutions come from the
+    in-memory evolution graph; the database is queried once for the pokemon_ids and once per
+    LOOKUP_CHUNK_SIZE ranking lookups in total.
+    """
+    refresh_table_versions()
+    return _lookup_evolution_rankings_batch(requests)
+
+
+# Function to look up the rankings of many Pokémon once the table versions of the batch are checked
+def _lookup_evolution_rankings_batch(requests):
+    # Retrieve relevant evolutions for the Pokémon
+    evolutions = get_relevant_evolutions_batch([request[0] for request in requests])
+    pokemon_ids = get_pokemon_ids_by_names({evo_name for evo_names in evolutions.values() for evo_name in evo_names})
+
+    # Get rankings in each league using pokemon_id and IVs, for every evolution found in the database
+    ranking_requests = sorted({(pokemon_ids[evo_name], *ivs)
+                               for pokemon_name, *ivs in requests
+                               for evo_name in evolutions.get(pokemon_name, ()) if evo_name in pokemon_ids})
+    rankings = dict(zip(ranking_requests, get_rankings_batch(ranking_requests)))
+
+    results = []
+    for pokemon_name, *ivs in requests:
+        if pokemon_name not in evolutions:
+            results.append(None)
+            continue
+        results.append([(evo_name, rankings[(pokemon_ids[evo_name], *ivs)] if evo_name in pokemon_ids else None)
+                        for evo_name in evolutions[pokemon_name]])
+    return results
+
+
+# Function to look up the rankings of every relevant evolution of a Pokémon
+def lookup_evolution_rankings(pokemon_name, iv_attack, iv_defense, iv_stamina):
+    """Returns [(evo_name, rankings or None if not in the database)], or None without evolutionary data."""
+    return lookup_evolution_rankings_batch([(pokemon_name, iv_attack, iv_defense, iv_stamina)])[0]
+
+
+# Function to write the looked-up rankings of every relevant evolution of a Pokémon
+# Returns False if no evolutionary data was found for the Pokémon.
+def write_evolution_report(output_file, pokemon_name, evolution_rankings):
+    if evolution_rankings is None:
+        output_file.write(f"No evolutionary data found for {pokemon_name}.\n\n")
+        return False
+
+    for evo_name, rankings in evolution_rankings:
+        if rankings is None:
+            output_file.write(f"Skipping {evo_name} as it was not found in the database.\n\n")
+            continue
+
+        # Write the results for each league to the file
+        write_rankings(output_file, evo_name, rankings)
+
+    return True
+
+
+# Function to write the rankings of every relevant evolution of a Pokémon
+# Returns False if no evolutionary data was found for the Pokémon.
+def write_evolution_rankings(output_file, pokemon_name, iv_attack, iv_defense, iv_stamina):
+    evolution_rankings = lookup_evolution_rankings(pokemon_name, iv_attack, iv_defense, iv_stamina)
+    return write_evolution_report(output_file, pokemon_name, evolution_rankings)
+
+
+# Function to find the levels at which a Pokémon with these IVs has the OCR'd CP
+@instrumented("lookup.cp_levels")
+def find_cp_levels(pokemon_id, cp_text, iv_attack, iv_defense, iv_stamina):
+    """Returns the possible levels (empty if CP and IVs contradict each other), or None if it cannot be checked."""
+    if pokemon_id is None or not cp_text.isdigit():
+        return None
+
+    from cpIndex import find_levels
+    return find_levels(pokemon_id, int(cp_text), iv_attack, iv_defense, iv_stamina, DB_PATH)
+
+
+# Function to look up the rankings for many extracted images at once (None for images that failed)
+# Each OCR'd name is first matched to the closest known name, recorded under "name_match", and
+# the CP is checked against the IVs, recording the possible levels under "levels".
+def lookup_extracted_batch(extracted_batch):
+    refresh_table_versions()
+    requests = []
+    for extracted_data in extracted_batch:
+        if 'error' in extracted_data:
+            continue
+        pokemon_name, distance = resolve_pokemon_name(extracted_data["ocr_specific"]["Name"])
+        extracted_data["name_match"] = {"name": pokemon_name, "distance": distance}
+        requests.append((pokemon_name, extracted_data["attack_value"], extracted_data["defense_value"],
+                         extracted_data["hp_value"]))
+
+    pokemon_ids = get_pokemon_ids_by_names([request[0] for request in requests])
+    evolution_rankings = iter(_lookup_evolution_rankings_batch(requests))
+
+    results = []
+    for extracted_data in extracted_batch:
+        if 'error' in extracted_data:
+            results.append(None)
+            continue
+        extracted_data["levels"] = find_cp_levels(
+            pokemon_ids.get(extracted_data["name_match"]["name"]), extracted_data["ocr_specific"]["CP"],
+            extracted_data["attack_value"], extracted_data["defense_value"], extracted_data["hp_value"])
+        results.append(next(evolution_rankings))
+    return results
+
+
+# Function to look up the rankings for one extracted image (None for images that failed)
+def lookup_extracted_data(extracted_data):
+    return lookup_extracted_batch([extracted_data])[0]
+
+
+# Function to write the report entry of one extracted image
+def write_extracted_data(output_file, extracted_data, evolution_rankings):
+    filename = os.path.basename(extracted_data["image"])
+
+    # Write the image filename to the file
+    output_file.write(f"\nProcessing image: {filename}\n")
+    output_file.write("-" * 40 + "\n")
+
+    if 'error' in extracted_data:
+        output_file.write(f"Error processing image: {extracted_data['error']}\n\n")
+        return
+
+    # Extract details from OCR results
+    pokemon_name = extracted_data["ocr_specific"]["Name"]
+    cp_value = extracted_data["ocr_specific"]["CP"]
+    iv_attack = extracted_data["attack_value"]
+    iv_defense = extracted_data["defense_value"]
+    iv_stamina = extracted_data["hp_value"]
+    is_shadow = extracted_data["is_shadow"]
+
+    # Write extracted information
+    output_file.write(f"Extracted Information for {pokemon_name}:\n")
+    name_match = extracted_data.get("name_match")
+    if name_match and name_match["distance"]:
+        output_file.write(f"  Matched Name: {name_match['name']} (edit distance {name_match['distance']})\n")
+    output_file.write(f"  CP: {cp_value}\n")
+    levels = extracted_data.get("levels")
+    if levels:
+        output_file.write(f"  Level: {' or '.join(str(level) for level in levels)}\n")
+    elif levels == []:
+        output_file.write("  Level: no level gives this CP with these IVs (check the OCR result)\n")
+    output_file.write(f"  IVs - Attack: {iv_attack}, Defense: {iv_defense}, Stamina: {iv_stamina}\n")
+    output_file.write(f"  Shadow Status: {'Shadow' if is_shadow else 'Normal'}\n\n")
+
+    if not write_evolution_report(output_file, pokemon_name, evolution_rankings):
+        return
+
+    # Add a separator for readability between entries
+    output_file.write("\n" + "=" * 50 + "\n")
 
 
 # Main function to process all images in a folder and save results in a text file
-def process_folder(folder_path):
-    # Open the text file in write mode
-    with open("pokemon_rankings.txt", "w") as output_file:
-
-        # Check each file in the folder
-        for filename in os.listdir(folder_path):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                image_path = os.path.join(folder_path, filename)
-
-                # Write the image filename to the file
-                output_file.write(f"\nProcessing image: {filename}\n")
-                output_file.write("-" * 40 + "\n")
-
-                # Process the image to extract data
-                extracted_data = process_image(image_path)
-
-                if 'error' in extracted_data:
-                    output_file.write(f"Error processing image: {extracted_data['error']}\n\n")
-                    continue
-
-                # Extract details from OCR results
-                pokemon_name = extracted_data["ocr_specific"]["Name"]
-                cp_value = extracted_data["ocr_specific"]["CP"]
-                iv_attack = extracted_data["attack_value"]
-                iv_defense = extracted_data["defense_value"]
-                iv_stamina = extracted_data["hp_value"]
-                is_shadow = extracted_data["is_shadow"]
-
-                # Write extracted information
-                output_file.write(f"Extracted Information for {pokemon_name}:\n")
-                output_file.write(f"  CP: {cp_value}\n")
-                output_file.write(f"  IVs - Attack: {iv_attack}, Defense: {iv_defense}, Stamina: {iv_stamina}\n")
-                output_file.write(f"  Shadow Status: {'Shadow' if is_shadow else 'Normal'}\n\n")
-
-                # Retrieve relevant evolutions for the Pokémon
-                relevant_evolutions = get_relevant_evolutions(pokemon_name)
-
-                if not relevant_evolutions:
-                    output_file.write(f"No evolutionary data found for {pokemon_name}.\n\n")
-                    continue
-
-                # Iterate over each relevant evolution and get rankings
-                for evo_name in relevant_evolutions:
-                    pokemon_id = get_pokemon_id_by_name(evo_name)
-
-                    if pokemon_id is None:
-                        output_file.write(f"Skipping {evo_name} as it was not found in the database.\n\n")
-                        continue
-
-                    # Get rankings in each league using pokemon_id and IVs
-                    rankings = get_rankings(pokemon_id, iv_attack, iv_defense, iv_stamina)
-
-                    # Write the results for each league to the file
-                    output_file.write(f"\n--- Rankings for {evo_name} ---\n")
-                    for league, result in rankings.items():
-                        output_file.write(f"--- {league} ---\n")
-                        if isinstance(result, dict):
-                            output_file.write(f"  Rank: {result['rank']}\n")
-                            output_file.write(f"  Stat Product (SP): {result['stat_product']}\n")
-                            output_file.write(f"  Combat Power (CP): {result['combat_power']}\n")
-                            output_file.write(f"  Level: {result['level']}\n")
-                            output_file.write(f"  Percentage: {result['percentage']}%\n")
-                        else:
-                            output_file.write(f"  {result}\n")
-
-                # Add a separator for readability between entries
-                output_file.write("\n" + "=" * 50 + "\n")
-
-
-# Example usage
+# Screen recordings are processed too; only their distinct, stable appraisal frames are extracted.
+# Name and CP areas are recognized batch_size images at a time (see pkmOCR.process_frames);
+# recognition_only=True skips EasyOCR's text detector for those fixed areas.
+# workers > 1 spreads the files over that many processes (0 = one per CPU core); the report keeps the file order.
+# pipelined=True overlaps decoding, OCR, ranking lookups and writing in threads (see ocrPipeline.run_pipeline).
+# With cache=True files already extracted with the same settings are taken from extractionCache, without OCR.
+# output_paths lists the files to write, each in the format of its extension (see resultSinks.SINKS).
+# instrument=True prints the time spent per stage, call counts and cache hit rates at the end; profile_path
+# and memory_path also dump a cProfile and a tracemalloc snapshot of the run (see instrumentation.start_run).
+def process_folder(folder_path, batch_size=None, recognition_only=False, workers=1, pipelined=False, cache=False,
+                   output_paths=(REPORT_PATH,), instrument=False, profile_path=None, memory_path=None):
+    from pkmOCR import OCR_BATCH_SIZE, process_sources_parallel
+    from videoFrames import VIDEO_EXTENSIONS
+    from extractionCache import EXTRACTION_CACHE_PATH, ExtractionCache, process_sources_cached
+    from resultSinks import open_sink
+
+    batch_size = batch_size or OCR_BATCH_SIZE
+
+    # Check each file in the folder
+    paths = [os.path.join(folder_path, filename) for filename in os.listdir(folder_path)
+             if filename.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS)]
+
+    # The extraction cache is opt-in and lives next to the database
+    extraction_cache = None
+    if cache:
+        extraction_cache = ExtractionCache(os.path.join(os.path.dirname(DB_PATH), EXTRACTION_CACHE_PATH))
+    sinks = []
+
+    # Function to stream one extracted image and its rankings to every output file
+    def write(extracted_data, evolution_rankings):
+        with timed("write"):
+            for sink in sinks:
+                sink.write(extracted_data, evolution_rankings)
+
+    if instrument or profile_path or memory_path:
+        instrumentation.start_run(profile_path, memory_path)
+
+    try:
+        # Open the output files in write mode
+        for output_path in output_paths:
+            sinks.append(open_sink(output_path))
+
+        if pipelined:
+            from ocrPipeline import run_pipeline
+
+            # Decode, extract and look up in background threads; only the writing happens here
+            run_pipeline(paths, lookup_extracted_batch, lambda item: write(*item),
+                         batch_size, recognition_only, workers, cache=extraction_cache)
+
+        else:
+            if extraction_cache is not None:
+                results = process_sources_cached(paths, extraction_cache, workers, batch_size,
+                                                 recognition_only=recognition_only)
+            else:
+                results = process_sources_parallel(paths, workers, batch_size, recognition_only=recognition_only)
+
+            # Process the images and video frames to extract data, looking up their rankings batch by batch
+            while True:
+                extracted_batch = list(itertools.islice(results, batch_size))
+                if not extracted_batch:
+                    break
+                for extracted_data, evolution_rankings in zip(extracted_batch,
+                                                              lookup_extracted_batch(extracted_batch)):
+                    write(extracted_data, evolution_rankings)
+    finally:
+        with timed("write"):
+            for sink in sinks:
+                sink.close()
+        if extraction_cache is not None:
+            print(f"Extraction cache: {extraction_cache.hits} hits, {extraction_cache.misses} misses.")
+            extraction_cache.close()
+        instrumentation.finish_run()
+
+
 if __name__ == "__main__":
-    # Replace with the path to your folder containing images
-    folder_path = "path_to_screenshot_folder"
-    process_folder(folder_path)
+    parser = argparse.ArgumentParser(description="Report the league rankings of the Pokémon appraised in a folder.")
+    parser.add_argument("folder", help="Folder with screenshots and screen recordings")
+    parser.add_argument("--output", action="append",
+                        help="File to write, in the format of its extension (.txt, .jsonl, .csv, .db); "
+                             f"may be repeated (default: {REPORT_PATH})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="OCR worker processes (0 = one per CPU core, 1 = no process pool)")
+    parser.add_argument("--pipelined", action="store_true", help="Run decoding, OCR, lookups and writing as threads")
+    parser.add_argument("--recognition-only", action="store_true", help="Skip EasyOCR's text detector")
+    parser.add_argument("--batch-size", type=int,
+                        help="Name/CP crops per OCR batch and results per lookup batch (default: OCR_BATCH_SIZE)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse the extraction results of files seen before (extraction_cache.db next to the database)")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Print the time per stage, call counts and cache hit rates")
+    parser.add_argument("--profile", metavar="PATH", help="Dump a cProfile of the run to this file")
+    parser.add_argument("--trace-memory", metavar="PATH", help="Dump a tracemalloc snapshot of the run to this file")
+    args = parser.parse_args()
+
+    process_folder(args.folder, batch_size=args.batch_size, recognition_only=args.recognition_only,
+                   workers=args.workers, pipelined=args.pipelined, cache=args.cache,
+                   output_paths=args.output or [REPORT_PATH], instrument=args.instrument,
+                   profile_path=args.profile, memory_path=args.trace_memory)
@@ -0,0 +1,399 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import Main
+import instrumentation
+from cpIndex import get_cp_index
+from customRankings import load_inputs
+from leagueBuild import LEAGUES, build_leagues, load_build_inputs, rank_pokemon
+from pkmOCR import OCR_ALLOWLISTS, OCR_AREAS, RECTANGLES, SHADOW_ROI, process_image
+from videoFrames import SCREEN_SIZE
+
+# File the benchmark results are written to
+BENCHMARK_PATH = 'benchmark_results.json'
+
+# Benchmarks run by default
+BENCHMARKS = ('process_image', 'process_folder', 'league_build')
+
+# Number of synthetic screens rendered per run, and the seed that makes them reproducible
+BENCHMARK_SCREENS = 50
+BENCHMARK_SEED = 0
+
+# Share of the synthetic screens with a shadow background
+SHADOW_RATE = 0.3
+
+# Species ranked one at a time to measure the per-species latency of the league build
+LEAGUE_SAMPLE_SIZE = 20
+
+# Tables the league build reads, copied into a scratch database so the real one is never modified
+BUILD_INPUT_TABLES = ('pokemon_stats', 'pokemon_ivs', 'cp_multiplier')
+
+# Colors (BGR) of the synthetic screens; the bar colors fall inside pkmOCR.HSV_RANGES
+BACKGROUND_COLOR = (236, 240, 226)
+EMPTY_BAR_COLOR = (220, 220, 220)
+ORANGE_BAR_COLOR = (0, 140, 255)
+RED_BAR_COLOR = (60, 60, 230)
+TEXT_COLOR = (60, 60, 60)
+TEXT_FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+# Background shades (RGB) is_shadow_pokemon looks for, painted as bands on shadow screens
+SHADOW_SHADES = [(107, 66, 158), (101, 45, 174), (108, 64, 184), (15, 10, 85), (35, 22, 129)]
+
+
+# Function to pick the species, IVs, level and CP of every synthetic screen
+def generate_ground_truth(count, seed=BENCHMARK_SEED, db_path=Main.DB_PATH):
+    """Returns count truth dicts; the CP is the one the species really has at that level with those IVs.
+
+    Only species whose names Hershey fonts can render (ASCII names within the Name allowlist) are used.
+    """
+    pokemon_stats, _ = load_inputs(db_path)
+    allowed = set(OCR_ALLOWLISTS["Name"])
+    species = sorted(pokemon_id for pokemon_id, (name, _, _, _) in pokemon_stats.items() if name.isascii() and set(name) <= allowed)
+    if not species:
+        raise ValueError(f"No species with a renderable name in {db_path}")
+
+    rng = random.Random(seed)
+    truth = []
+    for _ in range(count):
+        pokemon_id = rng.choice(species)
+        iv_attack, iv_defense, iv_stamina = (rng.randrange(16) for _ in range(3))
+        cp_index = get_cp_index(pokemon_id, db_path)
+        level_index = rng.randrange(len(cp_index.levels))
+        truth.append({
+            "pokemon_id": pokemon_id,
+            "name": pokemon_stats[pokemon_id][0],
+            "cp": str(int(cp_index.cp_grid[iv_attack * 256 + iv_defense * 16 + iv_stamina, level_index])),
+            "level": float(cp_index.levels[level_index]),
+            "attack": iv_attack,
+            "defense": iv_defense,
+            "hp": iv_stamina,
+            "is_shadow": rng.random() < SHADOW_RATE
+        })
+    return truth
+
+
+# Function to draw text centered in an OCR area, as large as the area allows
+def draw_text(image, text, area):
+    (x0, y0), (x1, y1) = area
+    (width, height), _ = cv2.getTextSize(text, TEXT_FONT, 1.0, 2)
+    scale = min(0.8 * (x1 - x0) / width, 0.5 * (y1 - y0) / height)
+    thickness = max(2, int(scale * 2))
+    (width, height), _ = cv2.getTextSize(text, TEXT_FONT, scale, thickness)
+    origin = (x0 + (x1 - x0 - width) // 2, y0 + (y1 - y0 + height) // 2)
+    cv2.putText(image, text, origin, TEXT_FONT, scale, TEXT_COLOR, thickness, cv2.LINE_AA)
+
+
+# Function to fill the segments of one IV bar the way the game shows an IV value
+def draw_iv_bar(image, rectangles, iv_value, divisions=5):
+    segment = 0
+    for (top_left, bottom_right) in rectangles:
+        cv2.rectangle(image, top_left, (bottom_right[0] - 1, bottom_right[1] - 1), EMPTY_BAR_COLOR, cv2.FILLED)
+        division_width = (bottom_right[0] - top_left[0]) // divisions
+        for j in range(divisions):
+            # Segments are split exactly like pkmOCR.process_rectangles does
+            x_start = top_left[0] + j * division_width
+            if iv_value == 15 or segment < iv_value:
+                color = RED_BAR_COLOR if iv_value == 15 else ORANGE_BAR_COLOR
+                cv2.rectangle(image, (x_start, top_left[1]), (x_start + division_width - 1, bottom_right[1] - 1),
+                              color, cv2.FILLED)
+            segment += 1
+
+
+# Function to render a synthetic appraisal screen in the RECTANGLES/OCR_AREAS layout
+def render_screen(truth):
+    width, height = SCREEN_SIZE
+    image = np.full((height, width, 3), BACKGROUND_COLOR, dtype=np.uint8)
+
+    if truth["is_shadow"]:
+        (x0, y0), (x1, y1) = SHADOW_ROI
+        band_height = (y1 - y0) // len(SHADOW_SHADES)
+        for i, (red, green, blue) in enumerate(SHADOW_SHADES):
+            image[y0 + i * band_height:y0 + (i + 1) * band_height, x0:x1] = (blue, green, red)
+
+    draw_text(image, f"CP{truth['cp']}", OCR_AREAS["CP"])
+    draw_text(image, truth["name"], OCR_AREAS["Name"])
+    for stat, rectangles in RECTANGLES.items():
+        draw_iv_bar(image, rectangles, truth[stat])
+    return image
+
+
+# Function to write the synthetic screens of a run and their ground truth to a folder
+def write_screens(folder_path, truth):
+    """Returns {image path: truth}; the truth is also saved as ground_truth.json in the folder."""
+    os.makedirs(folder_path, exist_ok=True)
+    screens = {}
+    for i, screen_truth in enumerate(truth):
+        image_path = os.path.join(folder_path, f"screen_{i:04d}.png")
+        cv2.imwrite(image_path, render_screen(screen_truth))
+        screens[image_path] = screen_truth
+
+    with open(os.path.join(folder_path, "ground_truth.json"), "w") as truth_file:
+        json.dump({os.path.basename(path): screen_truth for path, screen_truth in screens.items()}, truth_file,
+                  indent=2)
+    return screens
+
+
+# Function to summarize latencies in seconds as throughput and percentiles in milliseconds
+def summarize_latencies(latencies):
+    latencies = np.asarray(latencies, dtype=float)
+    if not len(latencies):
+        return {"count": 0}
+    milliseconds = latencies * 1000
+    return {
+        "count": len(latencies),
+        "total_seconds": round(float(latencies.sum()), 4),
+        "per_second": round(float(len(latencies) / latencies.sum()), 2) if latencies.sum() else None,
+        "mean_ms": round(float(milliseconds.mean()), 3),
+        "p50_ms": round(float(np.percentile(milliseconds, 50)), 3),
+        "p90_ms": round(float(np.percentile(milliseconds, 90)), 3),
+        "p99_ms": round(float(np.percentile(milliseconds, 99)), 3),
+        "max_ms": round(float(milliseconds.max()), 3)
+    }
+
+
+# Function to score extracted values against the ground truth
+def score_accuracy(pairs):
+    """pairs lists (extracted, truth) dicts with the same keys; returns the share of matches per key.
+
+    Failed images (extracted is None) count as wrong for every key.
+    """
+    if not pairs:
+        return {}
+    keys = list(pairs[0][1])
+    return {key: round(sum(extracted is not None and extracted[key] == truth[key] for extracted, truth in pairs)
+                       / len(pairs), 4)
+            for key in keys}
+
+
+# Function to run process_image on one screen, timing its stages with the instrumentation hooks
+def time_image_stages(image_path, recognition_only=False):
+    """Returns (process_image result, {stage: seconds}) with "total" the whole call; instrumentation must be on."""
+    instrumentation.collect()
+    start = time.perf_counter()
+    result = process_image(image_path, recognition_only=recognition_only)
+    total = time.perf_counter() - start
+
+    timings, _, _ = instrumentation.collect()
+    stage_seconds = {stage: seconds for stage, (_, seconds, _) in timings.items()}
+    stage_seconds["total"] = total
+    return result, stage_seconds
+
+
+# Function to benchmark the stages of process_image one screen at a time
+def benchmark_process_image(screens, recognition_only=False):
+    # The first call creates the OCR reader, which would dominate every percentile
+    process_image(next(iter(screens)), recognition_only=recognition_only)
+
+    stage_latencies = {}
+    pairs = []
+    instrumentation.enable()
+    try:
+        for image_path, truth in screens.items():
+            result, timings = time_image_stages(image_path, recognition_only)
+            for stage, seconds in timings.items():
+                stage_latencies.setdefault(stage, []).append(seconds)
+            extracted = None
+            if 'error' not in result:
+                extracted = {
+                    "name": result["ocr_specific"]["Name"],
+                    "cp": result["ocr_specific"]["CP"],
+                    "attack": result["attack_value"],
+                    "defense": result["defense_value"],
+                    "hp": result["hp_value"],
+                    "is_shadow": result["is_shadow"]
+                }
+            pairs.append((extracted, {key: truth[key] for key in ("name", "cp", "attack", "defense", "hp", "is_shadow")}))
+    finally:
+        instrumentation.disable()
+
+    return {
+        "stages": {stage: summarize_latencies(latencies) for stage, latencies in stage_latencies.items()},
+        "accuracy": score_accuracy(pairs)
+    }
+
+
+# Function to benchmark Main.process_folder end to end, scoring the records of its JSON Lines output
+def benchmark_process_folder(folder_path, screens, batch_size=None, recognition_only=False, workers=1,
+                             pipelined=False):
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_path = os.path.join(output_dir, "results.jsonl")
+        start = time.perf_counter()
+        Main.process_folder(folder_path, batch_size, recognition_only, workers, pipelined, cache=False,
+                            output_paths=[output_path])
+        elapsed = time.perf_counter() - start
+        with open(output_path, encoding="utf-8") as results_file:
+            records = {record["image"]: record for record in map(json.loads, results_file)}
+
+    pairs = []
+    for image_path, truth in screens.items():
+        record = records.get(image_path)
+        extracted = None
+        if record is not None and record["error"] is None:
+            extracted = {
+                "name": record["name"],
+                "matched_name": record["matched_name"],
+                "cp": record["cp"],
+                "level": truth["level"] in (record["levels"] or []),
+                "attack": record["iv_attack"],
+                "defense": record["iv_defense"],
+                "hp": record["iv_stamina"],
+                "is_shadow": record["is_shadow"]
+            }
+        pairs.append((extracted, {"name": truth["name"], "matched_name": truth["name"], "cp": truth["cp"],
+                                  "level": True, "attack": truth["attack"], "defense": truth["defense"],
+                                  "hp": truth["hp"], "is_shadow": truth["is_shadow"]}))
+
+    return {
+        "settings": {"batch_size": batch_size, "recognition_only": recognition_only, "workers": workers,
+                     "pipelined": pipelined},
+        "images": len(screens),
+        "seconds": round(elapsed, 4),
+        "per_second": round(len(screens) / elapsed, 2),
+        "errors": sum(record["error"] is not None for record in records.values()),
+        "accuracy": score_accuracy(pairs)
+    }
+
+
+# Function to benchmark the league build from scratch on a copy of its input tables
+def benchmark_league_build(db_path=Main.DB_PATH, workers=1, bulk=False, sample_size=LEAGUE_SAMPLE_SIZE):
+    with tempfile.TemporaryDirectory() as build_dir:
+        build_db = os.path.join(build_dir, "league_build.db")
+        with sqlite3.connect(build_db) as conn:
+            conn.execute("ATTACH DATABASE ? AS source", (db_path,))
+            for table in BUILD_INPUT_TABLES:
+                conn.execute(f"CREATE TABLE {table} AS SELECT * FROM source.{table}")
+            conn.commit()
+            conn.execute("DETACH DATABASE source")
+            pokemon_stats, ivs_combinations, cp_multipliers = load_build_inputs(conn.cursor())
+        conn.close()
+
+        # Latency of ranking one species in every league, without the writes
+        latencies = []
+        for pokemon in pokemon_stats[:sample_size]:
+            start = time.perf_counter()
+            rank_pokemon(pokemon, ivs_combinations, cp_multipliers, list(LEAGUES))
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        build_leagues(build_db, workers=workers, full=True, bulk=bulk)
+        elapsed = time.perf_counter() - start
+
+        with sqlite3.connect(build_db) as conn:
+            rows = conn.execute("SELECT COUNT(*) FROM league_rankings").fetchone()[0]
+        conn.close()
+
+    return {
+        "settings": {"workers": workers, "bulk": bulk},
+        "species": len(pokemon_stats),
+        "rows": rows,
+        "seconds": round(elapsed, 4),
+        "species_per_second": round(len(pokemon_stats) / elapsed, 2),
+        "rows_per_second": round(rows / elapsed, 2),
+        "rank_pokemon": summarize_latencies(latencies)
+    }
+
+
+# Function to describe the code and machine a run was measured on
+def run_metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__
+    }
+
+
+# Function to flatten nested results into {"a.b.c": number} for comparisons
+def flatten_metrics(results, prefix=""):
+    metrics = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            metrics.update(flatten_metrics(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[f"{prefix}{key}"] = value
+    return metrics
+
+
+# Function to print how every metric changed between two result files
+def compare_results(previous, current):
+    print(f"Compared with {previous['metadata']['git_commit'] or 'an unknown commit'} ({previous['metadata']['timestamp']}):")
+    previous_metrics = flatten_metrics(previous["results"])
+    for key, value in flatten_metrics(current["results"]).items():
+        if key in previous_metrics and previous_metrics[key] != value:
+            ratio = f" (x{value / previous_metrics[key]:.2f})" if previous_metrics[key] else ""
+            print(f"  {key}: {previous_metrics[key]} -> {value}{ratio}")
+
+
+# Main function to render the synthetic screens, run the benchmarks and save their results
+def run_benchmarks(benchmarks=BENCHMARKS, count=BENCHMARK_SCREENS, seed=BENCHMARK_SEED, screens_dir=None,
+                   batch_size=None, recognition_only=False, workers=1, pipelined=False, bulk=False):
+    """Returns {"metadata", "settings", "results"}; screens_dir keeps the rendered screens (default: temporary)."""
+    results = {}
+    folder_path = screens_dir or tempfile.mkdtemp(prefix="pogo_benchmark_")
+    try:
+        if 'process_image' in benchmarks or 'process_folder' in benchmarks:
+            screens = write_screens(folder_path, generate_ground_truth(count, seed))
+            if 'process_image' in benchmarks:
+                results["process_image"] = benchmark_process_image(screens, recognition_only)
+            if 'process_folder' in benchmarks:
+                results["process_folder"] = benchmark_process_folder(folder_path, screens, batch_size,
+                                                                     recognition_only, workers, pipelined)
+        if 'league_build' in benchmarks:
+            results["league_build"] = benchmark_league_build(workers=workers, bulk=bulk)
+    finally:
+        if screens_dir is None:
+            shutil.rmtree(folder_path, ignore_errors=True)
+
+    return {
+        "metadata": run_metadata(),
+        "settings": {"screens": count, "seed": seed},
+        "results": results
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the OCR and league build on synthetic appraisal screens.")
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS),
+                        help="Benchmarks to run (default: all)")
+    parser.add_argument("--screens", type=int, default=BENCHMARK_SCREENS, help="Number of synthetic screens")
+    parser.add_argument("--seed", type=int, default=BENCHMARK_SEED, help="Seed of the synthetic screens")
+    parser.add_argument("--screens-dir", help="Keep the rendered screens and ground_truth.json in this folder")
+    parser.add_argument("--batch-size", type=int, help="Name/CP crops per OCR batch in process_folder")
+    parser.add_argument("--recognition-only", action="store_true", help="Skip EasyOCR's text detector")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for process_folder and the league build (0 = one per CPU core)")
+    parser.add_argument("--pipelined", action="store_true", help="Run process_folder as a threaded pipeline")
+    parser.add_argument("--bulk", action="store_true", help="Build the leagues in bulk-load mode")
+    parser.add_argument("--output", default=BENCHMARK_PATH, help="JSON file the results are written to")
+    parser.add_argument("--compare", metavar="PATH", help="Earlier results file to compare this run with")
+    args = parser.parse_args()
+
+    run = run_benchmarks(args.benchmarks, args.screens, args.seed, args.screens_dir, args.batch_size,
+                         args.recognition_only, args.workers, args.pipelined, args.bulk)
+    with open(args.output, "w") as output_file:
+        json.dump(run, output_file, indent=2)
+    print(json.dumps(run["results"], indent=2))
+    print(f"Results saved to {args.output}.")
+
+    if args.compare:
+        with open(args.compare) as previous_file:
+            compare_results(json.load(previous_file), run)
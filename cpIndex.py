@@ -0,0 +1,90 @@
+import argparse
+from functools import lru_cache
+
+import numpy as np
+
+import customRankings
+import instrumentation
+from cpMultiplier import cp_multiplier_data
+from customRankings import IV_COMBINATIONS, load_inputs
+from leagueBuild import DB_PATH
+from rankEngine import compute_species_grid
+
+# Number of species whose reverse index is kept in memory
+CP_INDEX_CACHE_SIZE = 128
+
+# Lowest CP the game shows; weaker Pokémon are displayed with CP 10
+MIN_CP = 10
+
+
+class CpIndex:
+    """Reverse index of one species from CP to the (level, IV) combinations that have it."""
+
+    def __init__(self, stat_attack, stat_defense, stat_stamina, cp_multipliers=cp_multiplier_data):
+        grid = compute_species_grid(stat_attack, stat_defense, stat_stamina, IV_COMBINATIONS, cp_multipliers)
+        self.levels = grid['levels']
+        self.cp_grid = np.maximum(grid['cp_grid'], MIN_CP)
+
+        # Grid cells sorted by CP; the cells with CP c are order[starts[c]:starts[c + 1]]
+        flat_cp = self.cp_grid.ravel()
+        self._order = np.argsort(flat_cp, kind='stable').astype(np.int32)
+        self._starts = np.searchsorted(flat_cp[self._order], np.arange(flat_cp.max() + 2))
+
+    def combinations(self, cp):
+        """Returns [(level, iv_attack, iv_defense, iv_stamina)] of every combination with this CP, by level."""
+        if not MIN_CP <= cp < len(self._starts) - 1:
+            return []
+        iv_index, level_index = np.divmod(self._order[self._starts[cp]:self._starts[cp + 1]], len(self.levels))
+        return sorted(zip(self.levels[level_index].tolist(), (iv_index // 256).tolist(),
+                          (iv_index // 16 % 16).tolist(), (iv_index % 16).tolist()))
+
+    def levels_for(self, cp, iv_attack, iv_defense, iv_stamina):
+        """Returns the levels (lowest first) at which these IVs have exactly this CP; empty if none does."""
+        row = self.cp_grid[iv_attack * 256 + iv_defense * 16 + iv_stamina]
+        return sorted(self.levels[row == cp].tolist())
+
+
+# Function to build the reverse CP index of a species once and cache it
+@lru_cache(maxsize=CP_INDEX_CACHE_SIZE)
+def get_cp_index(pokemon_id, db_path=DB_PATH):
+    """Returns the CpIndex of a species, or None for an unknown pokemon_id."""
+    pokemon_stats, _ = load_inputs(db_path)
+    if pokemon_id not in pokemon_stats:
+        return None
+    _, stat_attack, stat_defense, stat_stamina = pokemon_stats[pokemon_id]
+    return CpIndex(stat_attack, stat_defense, stat_stamina)
+
+
+instrumentation.register_cache("cp_index", get_cp_index)
+
+
+# Function to drop every cached reverse index and the base stats, e.g. after statScraping.py reloaded them
+def clear_caches():
+    get_cp_index.cache_clear()
+    customRankings.clear_caches()
+
+
+# Function to check an extracted CP against the IVs and find the Pokémon's level
+def find_levels(pokemon_id, cp, iv_attack, iv_defense, iv_stamina, db_path=DB_PATH):
+    """Returns the possible levels (an empty list means CP and IVs cannot both be right), or None for an unknown species."""
+    cp_index = get_cp_index(pokemon_id, db_path)
+    if cp_index is None:
+        return None
+    return cp_index.levels_for(cp, iv_attack, iv_defense, iv_stamina)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List the (level, IV) combinations of a species with a given CP.")
+    parser.add_argument("pokemon_id", type=int)
+    parser.add_argument("cp", type=int)
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database")
+    args = parser.parse_args()
+
+    cp_index = get_cp_index(args.pokemon_id, args.db)
+    if cp_index is None:
+        print(f"No base stats found for pokemon_id {args.pokemon_id}.")
+    else:
+        combinations = cp_index.combinations(args.cp)
+        print(f"{len(combinations)} combinations with CP {args.cp}:")
+        for level, iv_attack, iv_defense, iv_stamina in combinations:
+            print(f"  Level {level}: {iv_attack}/{iv_defense}/{iv_stamina}")
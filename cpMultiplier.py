@@ -25,28 +25,35 @@ cp_multiplier_data = [
     (51, 0.84529999)
 ]
 
-# Connect to the database and create table with context manager
-with sqlite3.connect('pokemon.db') as connection:
-    cursor = connection.cursor()
+# Function to store the CP multiplier table in the database
+def store_cp_multipliers(db_path='pokemon.db'):
+    # Connect to the database and create table with context manager
+    with sqlite3.connect(db_path) as connection:
+        cursor = connection.cursor()
 
-    # Create cp_multiplier table if not exists
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS cp_multiplier (
-        level REAL PRIMARY KEY,
-        multiplier REAL
-    )
-    ''')
+        # Create cp_multiplier table if not exists
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cp_multiplier (
+            level REAL PRIMARY KEY,
+            multiplier REAL
+        )
+        ''')
 
-    # Use a transaction with error handling
-    try:
-        cursor.executemany('''
-            INSERT OR IGNORE INTO cp_multiplier (level, multiplier)
-            VALUES (?, ?)
-        ''', cp_multiplier_data)
-        print("CP multiplier data has been successfully inserted into the cp_multiplier table.")
+        # Use a transaction with error handling
+        try:
+            cursor.executemany('''
+                INSERT OR IGNORE INTO cp_multiplier (level, multiplier)
+                VALUES (?, ?)
+            ''', cp_multiplier_data)
+            print("CP multiplier data has been successfully inserted into the cp_multiplier table.")
 
-    except sqlite3.Error as e:
-        print(f"An error occurred while inserting data: {e}")
-        connection.rollback()  # Rollback transaction if any error occurs
-    else:
-        connection.commit()  # Commit transaction if everything is successful
+        except sqlite3.Error as e:
+            print(f"An error occurred while inserting data: {e}")
+            connection.rollback()  # Rollback transaction if any error occurs
+        else:
+            connection.commit()  # Commit transaction if everything is successful
+
+
+# Importing this module only provides cp_multiplier_data; running it fills the cp_multiplier table
+if __name__ == "__main__":
+    store_cp_multipliers()
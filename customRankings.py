@@ -0,0 +1,100 @@
+import itertools
+import sqlite3
+from functools import lru_cache
+
+import numpy as np
+
+import instrumentation
+from leagueBuild import DB_PATH
+from rankEngine import compute_species_grid, rank_league
+
+# Number of (species, CP cap, level cap) rankings kept in memory
+RANKING_CACHE_SIZE = 512
+
+# All IV combinations, in the same order as the pokemon_ivs table
+IV_COMBINATIONS = list(itertools.product(range(16), range(16), range(16)))
+
+
+# Function to load the base stats and CPM table once per process
+@lru_cache(maxsize=None)
+def load_inputs(db_path=DB_PATH):
+    """Returns ({pokemon_id: (pokemon_name, stat_attack, stat_defense, stat_stamina)}, cp_multipliers)."""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT pokemon_id, pokemon_name, stat_attack, stat_defense, stat_stamina FROM pokemon_stats")
+        pokemon_stats = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        cursor.execute("SELECT level, multiplier FROM cp_multiplier ORDER BY level DESC")
+        cp_multipliers = cursor.fetchall()
+
+    return pokemon_stats, cp_multipliers
+
+
+# Function to rank a species for any CP cap and level cap, computed on demand and cached
+@lru_cache(maxsize=RANKING_CACHE_SIZE)
+def get_custom_ranking(pokemon_id, cp_cap=None, max_level=None, db_path=DB_PATH):
+    """Returns the rank_league arrays of a species for a CP cap (None = no cap) and level cap.
+
+    Use max_level 40/41 for Pokémon without XL candy, 50/51 with XL candy (51 = best buddy).
+    The result also holds 'position', mapping iv_attack * 256 + iv_defense * 16 + iv_stamina
+    to the row of that IV combination (-1 if it has no valid level). The arrays are shared
+    through the cache and therefore read-only. Returns None for an unknown pokemon_id and
+    raises ValueError for a max_level below the lowest level of the cp_multiplier table.
+    """
+    pokemon_stats, cp_multipliers = load_inputs(db_path)
+    if pokemon_id not in pokemon_stats:
+        return None
+
+    # Only the levels allowed by the level cap are computed
+    if max_level is not None:
+        allowed = [(level, multiplier) for level, multiplier in cp_multipliers if level <= max_level]
+        if not allowed:
+            lowest = min(level for level, _ in cp_multipliers)
+            raise ValueError(f"max_level must be at least {lowest:g}, got {max_level}")
+        cp_multipliers = allowed
+
+    _, stat_attack, stat_defense, stat_stamina = pokemon_stats[pokemon_id]
+    grid = compute_species_grid(stat_attack, stat_defense, stat_stamina, IV_COMBINATIONS, cp_multipliers)
+    ranking = rank_league(grid, cp_cap)
+
+    position = np.full(len(IV_COMBINATIONS), -1, dtype=np.int64)
+    iv_index = ranking['iv_attack'] * 256 + ranking['iv_defense'] * 16 + ranking['iv_stamina']
+    position[iv_index] = np.arange(len(iv_index))
+    ranking['position'] = position
+
+    for values in ranking.values():
+        values.setflags(write=False)
+    return ranking
+
+
+instrumentation.register_cache("custom_rankings", get_custom_ranking)
+
+
+# Function to look up the ranking of one IV combination for a custom CP cap and level cap
+def get_custom_rank(pokemon_id, iv_attack, iv_defense, iv_stamina, cp_cap=None, max_level=None, db_path=DB_PATH):
+    """Returns a ranking dict shaped like the Main.get_rankings entries, or None if there is none.
+
+    Like the sp column of league_rankings, a whole Stat Product comes back as an int.
+    """
+    ranking = get_custom_ranking(pokemon_id, cp_cap, max_level, db_path)
+    if ranking is None:
+        return None
+
+    row = ranking['position'][iv_attack * 256 + iv_defense * 16 + iv_stamina]
+    if row < 0:
+        return None
+
+    stat_product = float(ranking['sp'][row])
+    return {
+        "rank": int(ranking['rank'][row]),
+        "stat_product": int(stat_product) if stat_product.is_integer() else stat_product,
+        "combat_power": int(ranking['cp'][row]),
+        "level": float(ranking['level'][row]),
+        "percentage": float(ranking['percentage'][row])
+    }
+
+
+# Function to drop every cached input and ranking, e.g. after statScraping.py reloaded the stats
+def clear_caches():
+    load_inputs.cache_clear()
+    get_custom_ranking.cache_clear()
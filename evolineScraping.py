@@ -2,6 +2,8 @@ import requests
 from bs4 import BeautifulSoup
 import sqlite3
 
+from evolutionGraph import bump_evoline_version
+
 # Define the URL
 url = "https://bulbapedia.bulbagarden.net/wiki/List_of_Pok%C3%A9mon_by_evolutionary_line_in_Pok%C3%A9mon_GO"
 
@@ -65,6 +67,9 @@ if response.status_code == 200:
         VALUES (?, ?, ?, ?)
     ''', data)
 
+    # Bump the table's version so running lookups rebuild their in-memory evolution graph
+    bump_evoline_version(cursor)
+
     # Commit changes and close the connection
     conn.commit()
     conn.close()
@@ -0,0 +1,46 @@
+from tableVersions import bump_table_version
+
+
+class EvolutionGraph:
+    """Evolution families from pokemon_evoline, including branching ones, with precomputed descendants."""
+
+    def __init__(self, rows):
+        # Name -> Pokémon it evolves into directly, in table order
+        self.evolutions = {}
+        for row in rows:
+            stages = [stage for stage in row if stage]
+            for name in stages:
+                self.evolutions.setdefault(name, [])
+            for name, evolution in zip(stages, stages[1:]):
+                if evolution not in self.evolutions[name]:
+                    self.evolutions[name].append(evolution)
+
+        # Name -> itself followed by every later stage of each branch
+        self.descendants = {name: self._collect_descendants(name) for name in self.evolutions}
+
+    def _collect_descendants(self, name):
+        descendants = []
+        stack = [name]
+        while stack:
+            current = stack.pop()
+            if current in descendants:
+                continue
+            descendants.append(current)
+            # Reversed, so the first branch in the table is listed first
+            stack.extend(reversed(self.evolutions[current]))
+        return descendants
+
+    def relevant_evolutions(self, pokemon_name):
+        """Returns the Pokémon itself and everything it can evolve into, or [] if it is not in the table."""
+        return self.descendants.get(pokemon_name, [])
+
+
+# Function to load the evolution graph from the pokemon_evoline table
+def load_evolution_graph(cursor):
+    cursor.execute("SELECT basic, stage2, stage3 FROM pokemon_evoline ORDER BY id")
+    return EvolutionGraph(cursor.fetchall())
+
+
+# Function to record that the pokemon_evoline table was refreshed, so loaded graphs are rebuilt
+def bump_evoline_version(cursor):
+    bump_table_version(cursor, 'pokemon_evoline')
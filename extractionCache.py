@@ -0,0 +1,231 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import instrumentation
+import videoFrames
+from instrumentation import instrumented
+from jsonEncoding import json_default
+from pkmOCR import (HSV_RANGES, OCR_ALLOWLISTS, OCR_AREAS, OCR_BATCH_SIZE, RECTANGLES, iter_source_frames,
+                    process_sources_parallel)
+
+# SQLite file holding the cached extraction results (Main.process_folder keeps it next to Main.DB_PATH)
+EXTRACTION_CACHE_PATH = 'extraction_cache.db'
+
+# Total size of the cached results above which the least recently used ones are evicted
+EXTRACTION_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Bump whenever the extraction code changes in a way the settings hashed by pipeline_version do not show
+EXTRACTION_VERSION = 1
+
+# Bytes read at a time while hashing a file
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+# Function to fingerprint everything an extraction result depends on apart from the file content
+def pipeline_version(debug_ocr=False, recognition_only=False):
+    settings = (
+        EXTRACTION_VERSION, RECTANGLES, OCR_AREAS, HSV_RANGES, debug_ocr, recognition_only,
+        OCR_ALLOWLISTS if recognition_only else None,
+        videoFrames.SCREEN_SIZE, videoFrames.VIDEO_SAMPLE_FPS, videoFrames.VIDEO_MOTION_THRESHOLD,
+        videoFrames.VIDEO_STABLE_SECONDS, videoFrames.VIDEO_CHANGE_THRESHOLD
+    )
+    return hashlib.sha1(repr(settings).encode()).hexdigest()
+
+
+# Function to hash the content of a file without decoding it
+@instrumented("cache.hash")
+def content_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as source_file:
+        for block in iter(lambda: source_file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Extraction results of files, keyed by content hash and pipeline version, evicted least recently used first."""
+
+    def __init__(self, cache_path=EXTRACTION_CACHE_PATH, max_bytes=EXTRACTION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Shared by the cache and extract stages of ocrPipeline, so every call holds the lock
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS extractions (
+                content_hash TEXT,
+                pipeline_version TEXT,
+                results TEXT,
+                size INTEGER,
+                last_used REAL,
+                PRIMARY KEY (content_hash, pipeline_version)
+            )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS extractions_last_used ON extractions (last_used)")
+        self.conn.commit()
+
+    def get(self, content_hash, version, path):
+        """Returns the cached results of a file as if path had just been processed, or None."""
+        with self._lock:
+            row = self.conn.execute("SELECT results FROM extractions WHERE content_hash = ? AND pipeline_version = ?",
+                                    (content_hash, version)).fetchone()
+            if row is None:
+                self.misses += 1
+                instrumentation.record_cache("extraction_cache", False)
+                return None
+
+            self.hits += 1
+            instrumentation.record_cache("extraction_cache", True)
+            self.conn.execute("UPDATE extractions SET last_used = ? WHERE content_hash = ? AND pipeline_version = ?",
+                              (time.time(), content_hash, version))
+        results = json.loads(row[0])
+        # Results are stored with "image" relative to the file (e.g. "#frame=12" for recordings)
+        for result in results:
+            result["image"] = path + result["image"]
+        return results
+
+    def put(self, content_hash, version, path, results):
+        stored = [dict(result, image=result["image"][len(path):]) for result in results]
+        data = json.dumps(stored, default=json_default)
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?, ?)",
+                              (content_hash, version, data, len(data), time.time()))
+
+    # Function to commit pending changes and evict the least recently used results above max_bytes
+    def commit(self):
+        with self._lock:
+            total, = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()
+            if total > self.max_bytes:
+                evict = []
+                for row in self.conn.execute(
+                        "SELECT content_hash, pipeline_version, size FROM extractions ORDER BY last_used"):
+                    if total <= self.max_bytes:
+                        break
+                    evict.append(row[:2])
+                    total -= row[2]
+                self.conn.executemany("DELETE FROM extractions WHERE content_hash = ? AND pipeline_version = ?",
+                                      evict)
+            self.conn.commit()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+# Process screenshots and screen recordings, reusing cached results of files seen before
+def process_sources_cached(paths, cache, workers=1, batch_size=OCR_BATCH_SIZE, debug_ocr=False,
+                           recognition_only=False):
+    """Yields the same results as process_sources_parallel, in path order.
+
+    Files are only read and hashed; cache hits are never decoded. The misses of each chunk
+    go through process_sources_parallel and are stored unless one of their results is an error.
+    """
+    version = pipeline_version(debug_ocr, recognition_only)
+    chunk_size = batch_size * (workers or os.cpu_count() or 1)
+    paths = list(paths)
+
+    for start in range(0, len(paths), chunk_size):
+        chunk = paths[start:start + chunk_size]
+        hashes = {}
+        cached = {}
+        for path in chunk:
+            try:
+                hashes[path] = content_hash(path)
+            except OSError:
+                # Unreadable files are left to the pipeline, which reports the error
+                continue
+            cached[path] = cache.get(hashes[path], version, path)
+
+        misses = [path for path in chunk if cached.get(path) is None]
+        extracted = {path: [] for path in misses}
+        for result in process_sources_parallel(misses, workers, batch_size, debug_ocr, recognition_only):
+            source = result["image"]
+            extracted[source if source in extracted else source.rsplit('#frame=', 1)[0]].append(result)
+
+        for path in misses:
+            if path in hashes and not any('error' in result for result in extracted[path]):
+                cache.put(hashes[path], version, path, extracted[path])
+        cache.commit()
+
+        for path in chunk:
+            yield from cached[path] if cached.get(path) is not None else extracted[path]
+
+
+# Function to look up each file in the cache, as the first stage of ocrPipeline
+def iter_cache_lookups(paths, cache, version, pending):
+    """Yields (path, cached results or None) in path order.
+
+    Before each file is yielded, (path, content hash) is appended to the pending deque for
+    store_extracted; the hash is None for hits and unreadable files, which are not stored.
+    """
+    for path in paths:
+        try:
+            path_hash = content_hash(path)
+        except OSError:
+            # Unreadable files are left to the decode stage, which reports the error
+            pending.append((path, None))
+            yield path, None
+            continue
+        results = cache.get(path_hash, version, path)
+        pending.append((path, path_hash if results is None else None))
+        yield path, results
+
+
+# Function to decode only the cache misses, as (source, image) pairs for process_frames
+def iter_cached_frames(lookups):
+    """Passes hits on as (path, cached results), which process_frames forwards without any OCR."""
+    for path, results in lookups:
+        if results is not None:
+            yield path, results
+        else:
+            yield from iter_source_frames([path])
+
+
+# Function to store the results of cache misses as they come out of process_frames
+def store_extracted(results, cache, version, pending, commit_size=OCR_BATCH_SIZE):
+    """Yields results unchanged, storing each file's results once they are complete.
+
+    pending is the deque filled by iter_cache_lookups. Results arrive in path order, so a file
+    is complete once a result of a later file arrives; files without any result (e.g. a
+    recording without an appraisal) are stored as such when the results end. Files with an
+    error result are not stored. Commits every commit_size stored files. A copy of each result
+    is taken before it is yielded, so fields added downstream (e.g. the lookup stage's
+    name_match, levels and evolutions) never reach the cache.
+    """
+    current = None
+    collected = []
+    stored = 0
+    for result in results:
+        image = result["image"]
+        while current is None or (image != current[0] and not image.startswith(current[0] + '#frame=')):
+            if current is not None:
+                stored += _store_file(cache, version, current, collected)
+            current = pending.popleft()
+            collected = []
+        collected.append(copy.deepcopy(result))
+        yield result
+
+        if stored >= commit_size:
+            cache.commit()
+            stored = 0
+
+    if current is not None:
+        _store_file(cache, version, current, collected)
+    while pending:
+        _store_file(cache, version, pending.popleft(), [])
+    cache.commit()
+
+
+# Function to store the results of one file, unless it was a hit or one of its results is an error
+def _store_file(cache, version, path_hash, results):
+    path, file_hash = path_hash
+    if file_hash is None or any('error' in result for result in results):
+        return 0
+    cache.put(file_hash, version, path, results)
+    return 1
@@ -0,0 +1,265 @@
+import cProfile
+import threading
+import time
+import tracemalloc
+from functools import wraps
+
+# Number of allocation sites listed in the summary of a run with memory tracing
+MEMORY_TOP_ALLOCATIONS = 10
+
+# Whether stages are timed; everything below is a cheap no-op while this is False
+_enabled = False
+
+# Stage -> [calls, total seconds, max seconds]; counter -> value; cache -> [hits, misses]
+_timings = {}
+_counters = {}
+_caches = {}
+
+# Name -> (lru_cache-wrapped function, its cache_info() when the run started), see register_cache
+_lru_caches = {}
+
+# Pipeline stages and lookups run in threads, so updates are serialized
+_lock = threading.Lock()
+
+# (start time, cProfile.Profile or None, profile path, memory path) of the current run
+_run = None
+
+
+class _NullTimer:
+    """Context manager returned by timed while instrumentation is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    """Context manager adding the wall time of its block to a stage."""
+
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        add_time(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+# Function to check whether instrumentation is on
+def enabled():
+    return _enabled
+
+
+# Function to time a block of code as one call of a stage
+def timed(stage):
+    """Use as "with timed('decode'):"; returns a shared no-op context manager while instrumentation is off."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(stage)
+
+
+# Function to decorate a function so that every call is timed as a stage
+def instrumented(stage):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                add_time(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+# Function to add one call of a stage
+def add_time(stage, seconds):
+    with _lock:
+        timing = _timings.get(stage)
+        if timing is None:
+            _timings[stage] = [1, seconds, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+
+# Function to increase a counter
+def count(name, amount=1):
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+
+# Function to record a hit or miss of a cache that keeps its own bookkeeping (e.g. extractionCache)
+def record_cache(name, hit):
+    if _enabled:
+        with _lock:
+            _caches.setdefault(name, [0, 0])[0 if hit else 1] += 1
+
+
+# Function to report the hit rate of an lru_cache-wrapped function in every run summary
+def register_cache(name, function):
+    """Registering a new function under an existing name (e.g. a rebuilt index) replaces the old one."""
+    _lru_caches[name] = (function, function.cache_info())
+
+
+# Function to take the statistics recorded so far and start over, e.g. in a worker process
+def collect():
+    """Returns (timings, counters, caches) for merge, or None while instrumentation is off."""
+    global _timings, _counters, _caches
+    if not _enabled:
+        return None
+    with _lock:
+        collected = (_timings, _counters, _caches)
+        _timings, _counters, _caches = {}, {}, {}
+    return collected
+
+
+# Function to add the statistics collected in another process to this one
+def merge(collected):
+    if collected is None:
+        return
+    timings, counters, caches = collected
+    with _lock:
+        for stage, (calls, total, longest) in timings.items():
+            timing = _timings.setdefault(stage, [0, 0.0, 0.0])
+            timing[0] += calls
+            timing[1] += total
+            timing[2] = max(timing[2], longest)
+        for name, value in counters.items():
+            _counters[name] = _counters.get(name, 0) + value
+        for name, (hits, misses) in caches.items():
+            counts = _caches.setdefault(name, [0, 0])
+            counts[0] += hits
+            counts[1] += misses
+
+
+# Function to turn instrumentation on outside a run (in a worker process or a benchmark), without profiling
+def enable():
+    """Starts from empty statistics and a new lock, since forked workers inherit the parent's."""
+    global _enabled, _lock, _timings, _counters, _caches
+    _lock = threading.Lock()
+    _timings, _counters, _caches = {}, {}, {}
+    _enabled = True
+
+
+# Function to turn instrumentation off again without a summary, e.g. after a benchmark
+def disable():
+    global _enabled
+    _enabled = False
+
+
+# Function to start recording a run
+def start_run(profile_path=None, memory_path=None):
+    """Resets the statistics and turns instrumentation on.
+
+    profile_path dumps a cProfile of the run there (only the calling thread is profiled, so
+    use pipelined=False for a complete profile); memory_path traces allocations with
+    tracemalloc and dumps the final snapshot there. Both slow the run down noticeably.
+    """
+    global _run, _timings, _counters, _caches, _enabled
+    with _lock:
+        _timings, _counters, _caches = {}, {}, {}
+    for name, (function, _) in list(_lru_caches.items()):
+        _lru_caches[name] = (function, function.cache_info())
+
+    profiler = None
+    if profile_path:
+        profiler = cProfile.Profile()
+    if memory_path:
+        tracemalloc.start()
+    _enabled = True
+    _run = (time.perf_counter(), profiler, profile_path, memory_path)
+    if profiler is not None:
+        profiler.enable()
+
+
+# Function to stop recording a run and print its summary
+def finish_run():
+    """Turns instrumentation off, writes the profile/memory dumps and returns the summary dict."""
+    global _run, _enabled
+    if _run is None:
+        return None
+    start, profiler, profile_path, memory_path = _run
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+    elapsed = time.perf_counter() - start
+    _enabled = False
+    _run = None
+
+    summary = snapshot(elapsed)
+    if memory_path:
+        current, peak = tracemalloc.get_traced_memory()
+        memory_snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        memory_snapshot.dump(memory_path)
+        summary["memory"] = {
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "top_allocations": [(str(stat.traceback), stat.size, stat.count)
+                                for stat in memory_snapshot.statistics('lineno')[:MEMORY_TOP_ALLOCATIONS]]
+        }
+
+    print(format_summary(summary))
+    if profile_path:
+        print(f"  cProfile written to {profile_path} (python -m pstats {profile_path})")
+    if memory_path:
+        print(f"  tracemalloc snapshot written to {memory_path} (tracemalloc.Snapshot.load)")
+    return summary
+
+
+# Function to return the statistics of the current run as a plain dict
+def snapshot(elapsed):
+    with _lock:
+        timings = {stage: {"calls": calls, "total_seconds": total, "mean_ms": total / calls * 1000,
+                           "max_ms": longest * 1000}
+                   for stage, (calls, total, longest) in sorted(_timings.items())}
+        counters = dict(sorted(_counters.items()))
+        caches = {name: {"hits": hits, "misses": misses} for name, (hits, misses) in _caches.items()}
+
+    for name, (function, start_info) in _lru_caches.items():
+        info = function.cache_info()
+        hits, misses = info.hits - start_info.hits, info.misses - start_info.misses
+        if hits or misses:
+            caches[name] = {"hits": hits, "misses": misses}
+    for counts in caches.values():
+        counts["hit_rate"] = counts["hits"] / (counts["hits"] + counts["misses"])
+
+    return {"elapsed_seconds": elapsed, "stages": timings, "counters": counters, "caches": dict(sorted(caches.items()))}
+
+
+# Function to format a run summary as a table
+def format_summary(summary):
+    elapsed = summary["elapsed_seconds"]
+    lines = [f"Instrumentation summary ({elapsed:.2f}s wall time; nested stages are included in their parents):",
+             f"  {'stage':<24}{'calls':>8}{'total s':>10}{'mean ms':>10}{'max ms':>10}{'share':>8}"]
+    for stage, timing in summary["stages"].items():
+        share = timing["total_seconds"] / elapsed if elapsed else 0
+        lines.append(f"  {stage:<24}{timing['calls']:>8}{timing['total_seconds']:>10.3f}{timing['mean_ms']:>10.2f}"
+                     f"{timing['max_ms']:>10.2f}{share:>8.1%}")
+    if summary["counters"]:
+        lines.append("  counters: " + ", ".join(f"{name} {value}" for name, value in summary["counters"].items()))
+    for name, counts in summary["caches"].items():
+        lines.append(f"  cache {name}: {counts['hits']} hits, {counts['misses']} misses "
+                     f"({counts['hit_rate']:.1%} hit rate)")
+    if "memory" in summary:
+        memory = summary["memory"]
+        lines.append(f"  traced memory: {memory['peak_bytes'] / 2 ** 20:.1f} MiB peak, "
+                     f"{memory['current_bytes'] / 2 ** 20:.1f} MiB at the end; largest allocation sites:")
+        for location, size, blocks in memory["top_allocations"]:
+            lines.append(f"    {location}: {size / 2 ** 10:.1f} KiB in {blocks} blocks")
+    return "\n".join(lines)
@@ -0,0 +1,9 @@
+# Shared by extractionCache.py and resultSinks.py; kept free of OCR imports so both stay cheap to import
+
+
+# Function to let json.dumps store numpy scalars (e.g. the IV values) as plain JSON numbers
+def json_default(value):
+    """Pass as json.dumps(..., default=json_default)."""
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,409 @@
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from rankEngine import compute_species_grid, rank_league, ranking_rows
+from tableVersions import bump_table_version
+
+# Database path
+DB_PATH = 'pokemon.db'
+
+# League definitions: league code -> display name, CP cap and level cap
+# Adding a league only costs one extra rank_league call per species on the shared CP grid.
+LEAGUES = {
+    "LC": {"name": "Little Cup", "cp_cap": 500, "max_level": None},
+    "GL": {"name": "Great League", "cp_cap": 1500, "max_level": None},
+    "UL": {"name": "Ultra League", "cp_cap": 2500, "max_level": None},
+    "ML": {"name": "Master League", "cp_cap": None, "max_level": 50}
+}
+
+# Legacy per-species league tables replaced by league_rankings
+LEGACY_TABLE_PATTERN = re.compile(r"^(LC|GL|UL|ML)_(\d+)_stats$")
+
+# Species submitted to the process pool per worker ahead of the writer; finished species wait
+# for the writer as scratch databases (about 0.8 MB each), so this bounds their disk space
+RANKING_WINDOW_PER_WORKER = 2
+
+# Number of Pokémon written per transaction in bulk-load mode
+BULK_COMMIT_SIZE = 50
+
+# Write-tuned SQLite settings applied only while a bulk build runs
+BULK_PRAGMAS = {
+    "synchronous": "OFF",
+    "journal_mode": "MEMORY",
+    "temp_store": "MEMORY",
+    "cache_size": -262144  # 256 MiB
+}
+
+
+# Function to fetch the shared inputs of every league build
+def load_build_inputs(cursor):
+    """Returns (pokemon_stats, ivs_combinations, cp_multipliers) read once from the database."""
+    cursor.execute("SELECT pokemon_id, pokemon_name, stat_attack, stat_defense, stat_stamina FROM pokemon_stats")
+    pokemon_stats = cursor.fetchall()
+
+    cursor.execute("SELECT iv_attack, iv_defense, iv_stamina FROM pokemon_ivs")
+    ivs_combinations = cursor.fetchall()
+
+    cursor.execute("SELECT level, multiplier FROM cp_multiplier ORDER BY level DESC")
+    cp_multipliers = cursor.fetchall()
+
+    return pokemon_stats, ivs_combinations, cp_multipliers
+
+
+# Function to rank one Pokémon in every requested league from a single CP grid
+def rank_pokemon(pokemon, ivs_combinations, cp_multipliers, leagues):
+    """Returns {league_code: ranking} with the rank_league arrays for each league."""
+    pokemon_id, pokemon_name, stat_attack, stat_defense, stat_stamina = pokemon
+    grid = compute_species_grid(stat_attack, stat_defense, stat_stamina, ivs_combinations, cp_multipliers)
+
+    return {league: rank_league(grid, LEAGUES[league]["cp_cap"], LEAGUES[league]["max_level"])
+            for league in leagues}
+
+
+# Inputs shared by every task of a worker process, set once by _init_worker
+_worker_inputs = None
+
+
+# Function to store the shared build inputs and the scratch folder in a worker process
+def _init_worker(ivs_combinations, cp_multipliers, scratch_dir):
+    global _worker_inputs
+    _worker_inputs = (ivs_combinations, cp_multipliers, scratch_dir)
+
+
+# Function run by the worker processes for each Pokémon
+def _rank_pokemon_worker(task):
+    pokemon, leagues = task
+    ivs_combinations, cp_multipliers, scratch_dir = _worker_inputs
+    scratch_path = os.path.join(scratch_dir, f"{pokemon[0]}.db")
+    write_scratch_rankings(scratch_path, pokemon[0], rank_pokemon(pokemon, ivs_combinations, cp_multipliers, leagues))
+    return pokemon, leagues, scratch_path
+
+
+# Function to yield (pokemon, league rankings) in order, ranked in this process
+def iter_rankings(tasks, ivs_combinations, cp_multipliers):
+    """tasks is a list of (pokemon, leagues) pairs naming the leagues to rank for each Pokémon."""
+    for pokemon, leagues in tasks:
+        yield pokemon, rank_pokemon(pokemon, ivs_combinations, cp_multipliers, leagues)
+
+
+# Function to yield (pokemon, leagues, scratch database) in order, ranked and written by a process pool
+def iter_scratch_rankings(tasks, ivs_combinations, cp_multipliers, scratch_dir, workers):
+    """Each worker ranks a Pokémon and writes its rows into a scratch database in scratch_dir
+    (see write_scratch_rankings), so the writer only copies them over with copy_scratch_rankings.
+
+    At most RANKING_WINDOW_PER_WORKER * workers species are in flight or waiting for the
+    writer at any time, however far the pool gets ahead of it.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(ivs_combinations, cp_multipliers, scratch_dir)) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_rank_pokemon_worker, task))
+            if len(pending) >= workers * RANKING_WINDOW_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# Function to hash the inputs shared by every species (IV combinations and the CPM table)
+def shared_inputs_digest(ivs_combinations, cp_multipliers):
+    return hashlib.sha1(repr((ivs_combinations, cp_multipliers)).encode()).hexdigest()
+
+
+# Function to fingerprint everything the league ranking of one Pokémon is computed from
+def league_fingerprint(pokemon, league, shared_digest):
+    settings = (LEAGUES[league]["cp_cap"], LEAGUES[league]["max_level"])
+    return hashlib.sha1(repr((tuple(pokemon), league, settings, shared_digest)).encode()).hexdigest()
+
+
+# Function to read the fingerprints recorded by previous builds
+def load_fingerprints(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS league_build_state (
+            league TEXT,
+            pokemon_id INTEGER,
+            fingerprint TEXT,
+            PRIMARY KEY (league, pokemon_id)
+        )
+    ''')
+    cursor.execute("SELECT league, pokemon_id, fingerprint FROM league_build_state")
+    return {(league, pokemon_id): fingerprint for league, pokemon_id, fingerprint in cursor.fetchall()}
+
+
+# Function to check whether league_rankings holds any row of one Pokémon in one league
+def has_rankings(cursor, league, pokemon_id):
+    cursor.execute("SELECT 1 FROM league_rankings WHERE league = ? AND pokemon_id = ? LIMIT 1", (league, pokemon_id))
+    return cursor.fetchone() is not None
+
+
+# Function to work out which league rankings are missing or out of date
+def plan_build(cursor, pokemon_stats, leagues, shared_digest, full=False):
+    """Returns (tasks, fingerprints, stale) for build_leagues.
+
+    tasks lists (pokemon, leagues_to_build) for every Pokémon with at least one outdated ranking,
+    fingerprints maps (league, pokemon_id) to the new fingerprint and stale lists the
+    (league, pokemon_id) rankings of Pokémon no longer in pokemon_stats. A ranking with an
+    up-to-date fingerprint but no rows (e.g. league_rankings was dropped) is outdated too.
+    """
+    previous = load_fingerprints(cursor)
+
+    tasks = []
+    fingerprints = {}
+    for pokemon in pokemon_stats:
+        pokemon_id = pokemon[0]
+        outdated = []
+        for league in leagues:
+            fingerprint = league_fingerprint(pokemon, league, shared_digest)
+            fingerprints[(league, pokemon_id)] = fingerprint
+            if (full or previous.get((league, pokemon_id)) != fingerprint
+                    or not has_rankings(cursor, league, pokemon_id)):
+                outdated.append(league)
+        if outdated:
+            tasks.append((pokemon, outdated))
+
+    current_ids = {pokemon[0] for pokemon in pokemon_stats}
+    stale = [(league, pokemon_id) for league, pokemon_id in previous
+             if league in leagues and pokemon_id not in current_ids]
+    return tasks, fingerprints, stale
+
+
+# Function to create the consolidated rankings table
+def create_rankings_table(cursor):
+    """Creates league_rankings, keyed by (league, pokemon_id, iv_attack, iv_defense, iv_stamina).
+
+    As a WITHOUT ROWID table the primary key is a clustered index that holds every column, so a
+    ranking lookup is a single covering index seek. sp keeps the INTEGER affinity of the old
+    per-species tables so lookups return the same values.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS league_rankings (
+            league TEXT,
+            pokemon_id INTEGER,
+            iv_attack INTEGER,
+            iv_defense INTEGER,
+            iv_stamina INTEGER,
+            rank INTEGER,
+            sp INTEGER,
+            cp INTEGER,
+            level REAL,
+            percentage REAL,
+            PRIMARY KEY (league, pokemon_id, iv_attack, iv_defense, iv_stamina)
+        ) WITHOUT ROWID
+    ''')
+
+
+# Function to replace the rankings of one Pokémon in one league
+def write_league_rankings(cursor, league, pokemon_id, rows):
+    # Delete any previous build so re-running does not duplicate rows
+    cursor.execute("DELETE FROM league_rankings WHERE league = ? AND pokemon_id = ?", (league, pokemon_id))
+    cursor.executemany('''
+        INSERT INTO league_rankings (league, pokemon_id, iv_attack, iv_defense, iv_stamina,
+                                     rank, sp, cp, level, percentage)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    return cursor.rowcount
+
+
+# Function to write the rows of one ranked Pokémon into a scratch database of its own, in a worker process
+def write_scratch_rankings(scratch_path, pokemon_id, rankings):
+    """Building the row tuples and binding them to the INSERT is most of the writing; doing it
+    here leaves the single writer one INSERT ... SELECT in SQLite per Pokémon."""
+    with sqlite3.connect(scratch_path) as conn:
+        # The scratch file is thrown away if anything fails
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        cursor = conn.cursor()
+        create_rankings_table(cursor)
+        for league, ranking in rankings.items():
+            write_league_rankings(cursor, league, pokemon_id, ranking_rows(ranking, league, pokemon_id))
+    conn.close()
+
+
+# Function to replace the rankings of one Pokémon with the rows of its scratch database
+def copy_scratch_rankings(cursor, leagues, pokemon_id, scratch_path):
+    """Returns the number of rows copied. The scratch database stays attached as "scratch" until
+    the transaction is committed (SQLite cannot detach it before), see detach_scratch_rankings."""
+    cursor.execute("ATTACH DATABASE ? AS scratch", (scratch_path,))
+    for league in leagues:
+        cursor.execute("DELETE FROM league_rankings WHERE league = ? AND pokemon_id = ?", (league, pokemon_id))
+    cursor.execute("INSERT INTO main.league_rankings SELECT * FROM scratch.league_rankings")
+    return cursor.rowcount
+
+
+# Function to detach and delete a scratch database copied by copy_scratch_rankings, after the commit
+def detach_scratch_rankings(cursor, scratch_path):
+    cursor.execute("DETACH DATABASE scratch")
+    os.remove(scratch_path)
+
+
+# Function to move the legacy {league}_{pokemon_id}_stats tables into league_rankings
+def migrate_legacy_tables(db_path=DB_PATH, vacuum=True):
+    """Copies every legacy per-species table into league_rankings, then drops it.
+
+    If a legacy table holds duplicate rows (the old scripts appended on every run), the row with
+    the best rank is kept, which is the one Main.get_rankings used to return.
+    """
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        create_rankings_table(cursor)
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        legacy_tables = [name for name, in cursor.fetchall() if LEGACY_TABLE_PATTERN.match(name)]
+        if legacy_tables:
+            bump_table_version(cursor, 'league_rankings')
+            conn.commit()
+
+        for table_name in legacy_tables:
+            league, pokemon_id = LEGACY_TABLE_PATTERN.match(table_name).groups()
+            cursor.execute(f'''
+                INSERT OR IGNORE INTO league_rankings (league, pokemon_id, iv_attack, iv_defense, iv_stamina,
+                                                       rank, sp, cp, level, percentage)
+                SELECT ?, ?, iv_attack, iv_defense, iv_stamina, rank, sp, cp, level, percentage
+                FROM {table_name}
+                ORDER BY rank ASC
+            ''', (league, int(pokemon_id)))
+            cursor.execute(f"DROP TABLE {table_name}")
+
+            # Commit after each table
+            conn.commit()
+
+    # Reclaim the space of the dropped tables
+    if vacuum:
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("VACUUM")
+
+    print(f"Migrated {len(legacy_tables)} legacy league tables into league_rankings.")
+
+
+# Context manager applying BULK_PRAGMAS for the duration of a build and restoring the previous values
+@contextmanager
+def bulk_load_pragmas(conn, enabled=True):
+    if not enabled:
+        yield
+        return
+
+    previous = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in BULK_PRAGMAS}
+    for name, value in BULK_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    try:
+        yield
+    finally:
+        # A failed build keeps only its committed batches; journal_mode cannot change inside a transaction
+        conn.rollback()
+        for name, value in previous.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+
+# Main function to build the league rankings for every Pokémon in one pass
+def build_leagues(db_path=DB_PATH, leagues=None, workers=1, full=False, bulk=False):
+    """Builds the league_rankings rows for the given league codes (all by default).
+
+    Only rankings whose base stats, CPM table or league settings changed since the last build are
+    recomputed, unless full is True. With workers > 1 a process pool ranks the species and writes
+    their rows into scratch databases, and this process, the single SQLite writer, copies them
+    into league_rankings; workers=0 uses one worker per CPU core. That copy still bounds the
+    speed-up (see README).
+    Each Pokémon is committed together with its fingerprints, so an interrupted build resumes
+    where it stopped. bulk=True applies BULK_PRAGMAS during the build and, in a serial build,
+    commits every BULK_COMMIT_SIZE Pokémon (a parallel build commits each copied Pokémon).
+    """
+    leagues = list(leagues or LEAGUES)
+    workers = workers or os.cpu_count() or 1
+    commit_size = BULK_COMMIT_SIZE if bulk and workers <= 1 else 1
+    start = time.perf_counter()
+    rows_written = 0
+    write_time = 0.0
+
+    with sqlite3.connect(db_path) as conn, bulk_load_pragmas(conn, bulk), \
+            tempfile.TemporaryDirectory(prefix="league_build_") as scratch_dir:
+        cursor = conn.cursor()
+        create_rankings_table(cursor)
+        pokemon_stats, ivs_combinations, cp_multipliers = load_build_inputs(cursor)
+        shared_digest = shared_inputs_digest(ivs_combinations, cp_multipliers)
+        tasks, fingerprints, stale = plan_build(cursor, pokemon_stats, leagues, shared_digest, full)
+
+        # Mark exported rank indexes as stale before the first row changes
+        if tasks or stale:
+            bump_table_version(cursor, 'league_rankings')
+
+        # Remove the rankings of Pokémon that were removed from pokemon_stats
+        for league, pokemon_id in stale:
+            cursor.execute("DELETE FROM league_rankings WHERE league = ? AND pokemon_id = ?", (league, pokemon_id))
+            cursor.execute("DELETE FROM league_build_state WHERE league = ? AND pokemon_id = ?", (league, pokemon_id))
+        conn.commit()
+
+        # (pokemon, leagues, rankings): the ranking arrays by league in a serial build, the path of the
+        # scratch database holding the rows in a parallel one
+        if workers <= 1:
+            ranked = ((pokemon, list(rankings), rankings)
+                      for pokemon, rankings in iter_rankings(tasks, ivs_combinations, cp_multipliers))
+        else:
+            ranked = iter_scratch_rankings(tasks, ivs_combinations, cp_multipliers, scratch_dir, workers)
+
+        # Closing ranked stops the pool before the scratch folder is removed, also when writing fails
+        try:
+            for count, (pokemon, ranked_leagues, rankings) in enumerate(ranked, 1):
+                write_start = time.perf_counter()
+                pokemon_id = pokemon[0]
+                if workers <= 1:
+                    for league, ranking in rankings.items():
+                        rows_written += write_league_rankings(cursor, league, pokemon_id,
+                                                              ranking_rows(ranking, league, pokemon_id))
+                else:
+                    rows_written += copy_scratch_rankings(cursor, ranked_leagues, pokemon_id, rankings)
+                for league in ranked_leagues:
+                    cursor.execute("INSERT OR REPLACE INTO league_build_state (league, pokemon_id, fingerprint) "
+                                   "VALUES (?, ?, ?)", (league, pokemon_id, fingerprints[(league, pokemon_id)]))
+
+                # Commit after each Pokémon (every BULK_COMMIT_SIZE Pokémon in a serial bulk build)
+                if count % commit_size == 0:
+                    conn.commit()
+                if workers > 1:
+                    detach_scratch_rankings(cursor, rankings)
+                write_time += time.perf_counter() - write_start
+        finally:
+            ranked.close()
+        conn.commit()
+
+    elapsed = time.perf_counter() - start
+    rebuilt = sum(len(outdated) for _, outdated in tasks)
+    print(f"Rebuilt {rebuilt} of {len(fingerprints)} league rankings ({len(tasks)} Pokémon changed, "
+          f"{len(stale)} stale rankings removed) in {elapsed:.1f}s using {workers} worker(s).")
+    if rows_written:
+        print(f"Wrote {rows_written} rows in {write_time:.1f}s ({rows_written / write_time:,.0f} rows/s"
+              f"{', bulk load' if bulk else ''}).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the league_rankings table in a single pass.")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database")
+    parser.add_argument("--leagues", nargs="+", choices=list(LEAGUES), default=list(LEAGUES),
+                        help="League codes to build (default: all)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes ranking species in parallel (0 = one per CPU core)")
+    parser.add_argument("--full", action="store_true",
+                        help="Rebuild every ranking instead of only those whose inputs changed")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Use write-tuned SQLite settings and batched commits while building")
+    parser.add_argument("--migrate", action="store_true",
+                        help="Move the legacy per-species league tables into league_rankings and exit")
+    parser.add_argument("--export-index", metavar="PATH",
+                        help="After building, export the packed rank index used by Main (see rankIndex.py)")
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate_legacy_tables(args.db)
+    else:
+        build_leagues(args.db, args.leagues, args.workers, args.full, args.bulk)
+
+    if args.export_index:
+        from rankIndex import export_rank_index
+        export_rank_index(args.db, args.export_index)
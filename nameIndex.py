@@ -0,0 +1,111 @@
+import argparse
+import sqlite3
+from functools import lru_cache
+
+# Path to database
+DB_PATH = 'pokemon.db'
+
+# Largest edit distance accepted between an OCR'd name and a known name
+MAX_NAME_DISTANCE = 2
+
+# Number of distinct OCR'd names whose match is remembered
+NAME_CACHE_SIZE = 4096
+
+
+# Function to normalize a name before it is indexed or looked up
+def normalize_name(name):
+    return " ".join(name.split()).casefold()
+
+
+# Function to compute the Levenshtein distance between two strings
+def edit_distance(first, second):
+    if len(first) < len(second):
+        first, second = second, first
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (first_char != second_char)))
+        previous = current
+    return previous[-1]
+
+
+# Function to list every string left after deleting up to max_deletions characters of a key
+def deletion_variants(key, max_deletions):
+    variants = {key}
+    frontier = {key}
+    for _ in range(max_deletions):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+class NameIndex:
+    """Symmetric-deletion index over the known Pokémon names, for bounded edit-distance lookups.
+
+    Two names within edit distance d always share a string left after deleting at most d
+    characters from each, so a lookup only computes the exact distance to the few names
+    sharing a deletion variant with the OCR'd name, instead of scanning every name.
+    """
+
+    def __init__(self, names, max_distance=MAX_NAME_DISTANCE):
+        self.max_distance = max_distance
+
+        # Normalized name -> name as stored in the database (the first spelling wins)
+        self.names = {}
+        for name in names:
+            if name:
+                self.names.setdefault(normalize_name(name), name)
+
+        # Deletion variant -> normalized names it was derived from
+        self._variants = {}
+        for key in self.names:
+            for variant in deletion_variants(key, max_distance):
+                self._variants.setdefault(variant, []).append(key)
+
+        self.lookup = lru_cache(maxsize=NAME_CACHE_SIZE)(self._lookup)
+
+    def _lookup(self, name):
+        """Returns (known name, edit distance) of the closest known name, or None if none is close enough.
+
+        Short names accept fewer edits (at most a third of their length), so that e.g. "Mew" does
+        not match "Muk". Ties go to the alphabetically first name.
+        """
+        key = normalize_name(name)
+        if key in self.names:
+            return self.names[key], 0
+
+        max_distance = min(self.max_distance, max(1, len(key) // 3))
+        candidates = {candidate for variant in deletion_variants(key, max_distance)
+                      for candidate in self._variants.get(variant, ())}
+
+        best = min(((edit_distance(key, candidate), candidate) for candidate in candidates), default=None)
+        if best is None or best[0] > max_distance:
+            return None
+        return self.names[best[1]], best[0]
+
+
+# Function to build the name index from every name in pokemon_stats and pokemon_evoline
+def build_name_index(db_path=DB_PATH):
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT pokemon_name FROM pokemon_stats
+            UNION SELECT basic FROM pokemon_evoline
+            UNION SELECT stage2 FROM pokemon_evoline
+            UNION SELECT stage3 FROM pokemon_evoline
+        """)
+        names = sorted(name for name, in cursor.fetchall() if name)
+    return NameIndex(names)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the known Pokémon names closest to OCR'd names.")
+    parser.add_argument("names", nargs="+", help="Names as read by OCR")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database")
+    args = parser.parse_args()
+
+    name_index = build_name_index(args.db)
+    for name in args.names:
+        match = name_index.lookup(name)
+        print(f"{name}: {f'{match[0]} (distance {match[1]})' if match else 'no match'}")
@@ -0,0 +1,203 @@
+import queue
+import threading
+import time
+from collections import deque
+
+from extractionCache import (iter_cache_lookups, iter_cached_frames, pipeline_version, process_sources_cached,
+                             store_extracted)
+from pkmOCR import OCR_BATCH_SIZE, iter_source_frames, process_frames, process_sources_parallel
+
+# Maximum number of items waiting between two stages; a full queue blocks the stage feeding it
+PIPELINE_QUEUE_SIZE = 8
+
+# Marks the end of a stage's output
+_DONE = object()
+
+# Seconds a blocked stage waits before checking whether the pipeline was stopped
+_POLL_INTERVAL = 0.1
+
+
+class StageStats:
+    """Item count, busy time and output queue depth of one pipeline stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+        self.depth_total = 0
+        self.depth_max = 0
+
+    # Function to record one item put on the stage's output queue
+    def record_depth(self, depth):
+        self.depth_total += depth
+        self.depth_max = max(self.depth_max, depth)
+
+    def summary(self, elapsed):
+        rate = self.items / self.busy if self.busy else 0.0
+        depth = f", output queue avg {self.depth_total / self.items:.1f} / max {self.depth_max}" \
+            if self.items and self.depth_max else ""
+        return (f"{self.name:<8} {self.items} items in {self.busy:.2f}s busy "
+                f"({rate:.1f}/s busy, {self.items / elapsed if elapsed else 0.0:.1f}/s overall){depth}")
+
+
+class _StageFailure:
+    """Carries an exception from a stage thread to the stages after it."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+# Function to consume a stage's input queue, adding the time spent waiting for items to stats
+def _iter_queue(input_queue, stats, stop):
+    while True:
+        start = time.perf_counter()
+        try:
+            item = input_queue.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            item = _DONE if stop.is_set() else None
+        stats.waiting += time.perf_counter() - start
+        if item is None:
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, _StageFailure):
+            raise item.error
+        yield item
+
+
+# Function to consume a stage's input queue as lists of the items already waiting (at most max_items)
+def _iter_queue_batches(input_queue, stats, stop, max_items):
+    for item in _iter_queue(input_queue, stats, stop):
+        batch = [item]
+        while len(batch) < max_items:
+            try:
+                item = input_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                yield batch
+                return
+            if isinstance(item, _StageFailure):
+                yield batch
+                raise item.error
+            batch.append(item)
+        yield batch
+
+
+# Function to put an item on a bounded queue, giving up once the pipeline is stopped
+def _put(output_queue, item, stop):
+    while not stop.is_set():
+        try:
+            output_queue.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+# Function run by each stage thread: drive the stage's iterator and feed its output queue
+def _run_stage(items, output_queue, stats, stop):
+    iterator = iter(items)
+    try:
+        while not stop.is_set():
+            start = time.perf_counter()
+            waiting = stats.waiting
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            # Time blocked on the input queue is waiting, not work
+            stats.busy += time.perf_counter() - start - (stats.waiting - waiting)
+            stats.items += 1
+
+            if not _put(output_queue, item, stop):
+                return
+            stats.record_depth(output_queue.qsize())
+    except BaseException as e:
+        _put(output_queue, _StageFailure(e), stop)
+    finally:
+        # Stopping early also closes generator stages, e.g. shutting down the process pool
+        if hasattr(iterator, 'close'):
+            iterator.close()
+        _put(output_queue, _DONE, stop)
+
+
+# Function to process screenshots and recordings with every stage running concurrently
+def run_pipeline(paths, lookup_batch, write, batch_size=OCR_BATCH_SIZE, recognition_only=False, workers=1,
+                 queue_size=PIPELINE_QUEUE_SIZE, cache=None):
+    """Runs decode -> extract -> lookup in threads and calls write((extracted_data, lookup result)) here.
+
+    lookup_batch maps a list of results to their lookup results; it gets whatever results are
+    already waiting (up to batch_size), so lookups are batched without holding any result back.
+
+    The stages are connected by queues of queue_size items, so a slow stage holds back the ones
+    before it and memory stays flat however many files there are. Disk reads, SQLite lookups
+    and writing overlap with the OCR, as OpenCV and torch release the GIL. With workers != 1
+    the extract stage is the process pool of process_sources_parallel, which decodes the files
+    itself. Results are written in path order. Prints and returns the StageStats of every stage.
+
+    With an extractionCache.ExtractionCache as cache, a cache stage hashes each file first:
+    hits skip decoding and OCR, misses go through the decode and extract stages as usual and
+    are stored as they come out. With workers != 1 the pool stage is process_sources_cached.
+    """
+    stages = []
+    threads = []
+    stop = threading.Event()
+
+    # Function to start a stage thread and return its output queue
+    def start_stage(name, items_factory):
+        stats = StageStats(name)
+        output_queue = queue.Queue(maxsize=queue_size)
+        thread = threading.Thread(target=_run_stage, args=(items_factory(stats), output_queue, stats, stop),
+                                  name=f"pipeline-{name}", daemon=True)
+        stages.append(stats)
+        threads.append(thread)
+        return output_queue
+
+    start = time.perf_counter()
+    if cache is not None and workers == 1:
+        version = pipeline_version(recognition_only=recognition_only)
+        # (path, content hash) of every looked-up file, in path order, for store_extracted
+        pending = deque()
+        cache_lookups = start_stage("cache", lambda stats: iter_cache_lookups(paths, cache, version, pending))
+        decoded = start_stage("decode", lambda stats: iter_cached_frames(_iter_queue(cache_lookups, stats, stop)))
+        extracted = start_stage("extract", lambda stats: store_extracted(process_frames(
+            _iter_queue(decoded, stats, stop), batch_size, recognition_only=recognition_only),
+            cache, version, pending, batch_size))
+    elif cache is not None:
+        extracted = start_stage("extract", lambda stats: process_sources_cached(
+            paths, cache, workers, batch_size, recognition_only=recognition_only))
+    elif workers == 1:
+        decoded = start_stage("decode", lambda stats: iter_source_frames(paths))
+        extracted = start_stage("extract", lambda stats: process_frames(
+            _iter_queue(decoded, stats, stop), batch_size, recognition_only=recognition_only))
+    else:
+        extracted = start_stage("extract", lambda stats: process_sources_parallel(
+            paths, workers, batch_size, recognition_only=recognition_only))
+    looked_up = start_stage("lookup", lambda stats: (
+        item for extracted_batch in _iter_queue_batches(extracted, stats, stop, batch_size)
+        for item in zip(extracted_batch, lookup_batch(extracted_batch))))
+
+    for thread in threads:
+        thread.start()
+
+    write_stats = StageStats("write")
+    stages.append(write_stats)
+    try:
+        for item in _iter_queue(looked_up, write_stats, stop):
+            item_start = time.perf_counter()
+            write(item)
+            write_stats.busy += time.perf_counter() - item_start
+            write_stats.items += 1
+    finally:
+        # Lets every stage thread exit, also when writing failed or was interrupted
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    elapsed = time.perf_counter() - start
+    print(f"Pipeline processed {write_stats.items} results in {elapsed:.2f}s:")
+    for stats in stages:
+        print("  " + stats.summary(elapsed))
+    return stages
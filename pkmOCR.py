@@ -1,13 +1,17 @@
 import cv2
 import numpy as np
-import easyocr
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import instrumentation
+from instrumentation import instrumented, timed
 
 # Path to database
 DB_PATH = 'pokemon.db'
 
-# Initialize the EasyOCR reader (using GPU if available)
-reader = easyocr.Reader(['en'], gpu=True)  # GPU support for faster processing if available
+# EasyOCR reader, created by get_reader on first OCR use (importing easyocr loads torch and the model weights)
+_reader = None
 
 # Define rectangle positions for IV detection (configurable)
 RECTANGLES = {
@@ -34,6 +38,26 @@ OCR_AREAS = {
     "CP": ((345, 106), (760, 260))  # Replace with actual coordinates
 }
 
+# Region whose background colors is_shadow_pokemon checks
+SHADOW_ROI = ((7, 14), (1161, 958))
+
+# Number of Name/CP crops recognized per batch by process_images
+OCR_BATCH_SIZE = 16
+
+# CPU threads each worker of process_sources_parallel gives OpenCV and torch (the workers already use every core)
+OCR_WORKER_THREADS = 1
+
+# Options shared by every task of a worker process, set once by _init_ocr_worker
+_worker_options = None
+
+# Characters allowed per area in recognition-only mode
+# The CP crop also shows the "CP" label, so C and P stay allowed and clean_ocr_text strips them.
+# Names need digits and ♀♂é as well (Porygon2, Nidoran♀/♂, Flabébé).
+OCR_ALLOWLISTS = {
+    "Name": "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 .'-:♀♂é",
+    "CP": "CP0123456789"
+}
+
 # HSV color ranges for detecting specific colors
 HSV_RANGES = {
     "orange": ([10, 100, 100], [25, 255, 255]),
@@ -42,7 +66,18 @@ HSV_RANGES = {
 }
 
 
+# Initialize the EasyOCR reader once per process (using GPU if available)
+def get_reader():
+    global _reader
+    if _reader is None:
+        with timed("ocr.reader_init"):
+            import easyocr
+            _reader = easyocr.Reader(['en'], gpu=True)  # GPU support for faster processing if available
+    return _reader
+
+
 # Load image from path with error handling
+@instrumented("decode")
 def load_image(image_path):
     image = cv2.imread(image_path)
     if image is None:
@@ -51,9 +86,16 @@ def load_image(image_path):
 
 
 # Perform OCR on an image with optional allowlist
-def perform_ocr_on_image(image, allowlist=None):
+# recognition_only=True treats the whole image as one text box and skips the CRAFT text detector.
+def perform_ocr_on_image(image, allowlist=None, recognition_only=False):
     gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    result = reader.readtext(gray_image, detail=0, allowlist=allowlist)
+    reader = get_reader()
+    instrumentation.count("ocr.crops")
+    with timed("ocr"):
+        if recognition_only:
+            result = reader.recognize(gray_image, detail=0, allowlist=allowlist)
+        else:
+            result = reader.readtext(gray_image, detail=0, allowlist=allowlist)
     return ' '.join(result).strip()
 
 
@@ -69,7 +111,9 @@ def create_color_masks(hsv_image, hsv_ranges):
 
 
 # Process rectangles for IV detection and color checks
-def process_rectangles(rectangles, hsv_image, original_image, color_masks):
+# The IV value comes from the color masks alone; per-segment OCR only runs with debug_ocr=True.
+@instrumented("process_rectangles")
+def process_rectangles(rectangles, hsv_image, original_image, color_masks, debug_ocr=False):
     orange_count = 0
     red_detected = False
     ocr_results = []
@@ -96,30 +140,185 @@ def process_rectangles(rectangles, hsv_image, original_image, color_masks):
             elif np.count_nonzero(mask_orange) > 0.5 * mask_orange.size:
                 orange_count += 1
 
-            # Perform OCR on sub-image
-            ocr_text = perform_ocr_on_image(sub_image_bgr)
-            ocr_results.append(ocr_text)
+            # Perform OCR on sub-image (debug only, it is not needed for the IV value)
+            if debug_ocr:
+                ocr_text = perform_ocr_on_image(sub_image_bgr)
+                ocr_results.append(ocr_text)
 
     final_value = 15 if red_detected else (orange_count if orange_count > 0 else 0)
     return final_value, ocr_results
 
 
+# Build the pixel layout of the IV bar segments once, for read_iv_bars
+def build_iv_bar_layout(rectangles, divisions=5):
+    """Precomputes the IV bar rows and a (stat, segment, pixels) gather index into them.
+
+    Segments are split exactly like process_rectangles does. They differ slightly in size, so
+    the pixel axis is padded and a validity mask marks the real pixels of each segment.
+    """
+    segments = []
+    for stat_rectangles in rectangles.values():
+        stat_segments = []
+        for (top_left, bottom_right) in stat_rectangles:
+            division_width = (bottom_right[0] - top_left[0]) // divisions
+            for j in range(divisions):
+                x_start = top_left[0] + j * division_width
+                stat_segments.append((x_start, x_start + division_width, top_left[1], bottom_right[1]))
+        segments.append(stat_segments)
+
+    x0 = min(x_start for stat in segments for x_start, _, _, _ in stat)
+    x1 = max(x_end for stat in segments for _, x_end, _, _ in stat)
+    roi_width = x1 - x0
+
+    # Only the image rows covered by a bar are converted, stacked into one small region
+    rows = sorted({y for stat in segments for _, _, y_start, y_end in stat for y in range(y_start, y_end)})
+    row_position = {y: i for i, y in enumerate(rows)}
+
+    max_pixels = max((x_end - x_start) * (y_end - y_start)
+                     for stat in segments for x_start, x_end, y_start, y_end in stat)
+    index = np.zeros((len(segments), len(segments[0]), max_pixels), dtype=np.intp)
+    valid = np.zeros(index.shape, dtype=bool)
+    for s, stat in enumerate(segments):
+        for g, (x_start, x_end, y_start, y_end) in enumerate(stat):
+            ys = np.array([row_position[y] for y in range(y_start, y_end)])
+            flat = (ys[:, None] * roi_width + np.arange(x_start - x0, x_end - x0)[None, :]).ravel()
+            index[s, g, :len(flat)] = flat
+            valid[s, g, :len(flat)] = True
+
+    return {
+        "stats": list(rectangles),
+        "rows": np.array(rows),
+        "columns": (x0, x1),
+        "index": index,
+        "valid": valid,
+        "half_size": 0.5 * valid.sum(axis=2)
+    }
+
+
+IV_BAR_LAYOUT = build_iv_bar_layout(RECTANGLES)
+
+
+# Read all three IV bars from the color masks of the bar region only
+@instrumented("iv_bars")
+def read_iv_bars(image, layout=IV_BAR_LAYOUT):
+    """Returns ({stat: iv_value}, {stat: [confidence per segment]}).
+
+    Gives the same values as process_rectangles: a stat is 15 if any segment is mostly red,
+    otherwise the number of mostly orange segments. A segment's confidence is how far its red
+    and orange fill fractions are from the 50% threshold (1.0 = clearly filled or clearly empty).
+    """
+    x0, x1 = layout["columns"]
+    with timed("iv_bars.hsv"):
+        hsv_roi = cv2.cvtColor(image[layout["rows"], x0:x1], cv2.COLOR_BGR2HSV)
+        color_masks = create_color_masks(hsv_roi, HSV_RANGES)
+
+    index, valid, half_size = layout["index"], layout["valid"], layout["half_size"]
+    red_counts = np.count_nonzero(color_masks['red'].ravel()[index] & valid, axis=2)
+    orange_counts = np.count_nonzero(color_masks['orange'].ravel()[index] & valid, axis=2)
+
+    red_segments = red_counts > half_size
+    orange_segments = ~red_segments & (orange_counts > half_size)
+    values = np.where(red_segments.any(axis=1), 15, orange_segments.sum(axis=1))
+
+    confidence = np.minimum(np.abs(red_counts / half_size - 1), np.abs(orange_counts / half_size - 1))
+
+    stats = layout["stats"]
+    return ({stat: int(values[i]) for i, stat in enumerate(stats)},
+            {stat: confidence[i].round(3).tolist() for i, stat in enumerate(stats)})
+
+
+# Perform OCR on a batch of images with one batched EasyOCR call per image size
+# readtext_batched and recognize_stacked_images need same-sized images, and the crops of a
+# screenshot at another resolution are smaller, so they are recognized in a group of their own.
+def perform_ocr_on_images(images, allowlist=None, batch_size=OCR_BATCH_SIZE, recognition_only=False):
+    gray_images = [cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) for image in images]
+    instrumentation.count("ocr.crops", len(gray_images))
+    groups = {}
+    for index, gray_image in enumerate(gray_images):
+        groups.setdefault(gray_image.shape, []).append(index)
+
+    texts = [None] * len(gray_images)
+    for indexes in groups.values():
+        group = [gray_images[index] for index in indexes]
+        if recognition_only:
+            group_texts = recognize_stacked_images(group, allowlist, batch_size)
+        else:
+            reader = get_reader()
+            with timed("ocr"):
+                results = reader.readtext_batched(group, detail=0, allowlist=allowlist, batch_size=batch_size)
+            group_texts = [' '.join(result).strip() for result in results]
+        for index, text in zip(indexes, group_texts):
+            texts[index] = text
+    return texts
+
+
+# Recognize same-sized grayscale crops without text detection, as boxes of one stacked image
+def recognize_stacked_images(gray_images, allowlist=None, batch_size=OCR_BATCH_SIZE):
+    """Stacks the crops vertically and passes each one as a known box to reader.recognize."""
+    if not gray_images:
+        return []
+    if len({gray_image.shape for gray_image in gray_images}) > 1:
+        raise ValueError("recognize_stacked_images needs crops of one size")
+
+    height, width = gray_images[0].shape[:2]
+    stacked = np.vstack(gray_images)
+    boxes = [[0, width, i * height, (i + 1) * height] for i in range(len(gray_images))]
+    reader = get_reader()
+    with timed("ocr"):
+        results = reader.recognize(stacked, horizontal_list=boxes, free_list=[], detail=1,
+                                   allowlist=allowlist, batch_size=batch_size)
+
+    # Map every recognized box back to its crop by the vertical center of the box
+    texts = [[] for _ in gray_images]
+    for box, text, _ in results:
+        center = (box[0][1] + box[2][1]) / 2
+        texts[min(max(int(center // height), 0), len(texts) - 1)].append(text)
+    return [' '.join(image_texts).strip() for image_texts in texts]
+
+
+# Crop an OCR area out of an image
+def crop_area(image, area):
+    top_left, bottom_right = area
+    return image[top_left[1]:bottom_right[1], top_left[0]:bottom_right[0]]
+
+
+# Clean up the OCR text of an area
+def clean_ocr_text(area_name, ocr_text):
+    # Remove "CP" prefix for CP area
+    if area_name == "CP":
+        ocr_text = re.sub(r'^\D*', '', ocr_text, flags=re.IGNORECASE)
+    return ocr_text
+
+
 # Perform OCR on specific areas (Name and CP)
-def perform_ocr_on_specific_areas(image, areas):
+# In recognition-only mode the fixed crops go straight to the recognizer with OCR_ALLOWLISTS.
+def perform_ocr_on_specific_areas(image, areas, recognition_only=False):
     ocr_results = {}
-    for area_name, (top_left, bottom_right) in areas.items():
-        roi = image[top_left[1]:bottom_right[1], top_left[0]:bottom_right[0]]
-        ocr_text = perform_ocr_on_image(roi)
+    for area_name, area in areas.items():
+        allowlist = OCR_ALLOWLISTS.get(area_name) if recognition_only else None
+        ocr_text = perform_ocr_on_image(crop_area(image, area), allowlist, recognition_only)
+        ocr_results[area_name] = clean_ocr_text(area_name, ocr_text)
+    return ocr_results
 
-        # Remove "CP" prefix for CP area
-        if area_name == "CP":
-            ocr_text = re.sub(r'^\D*', '', ocr_text, flags=re.IGNORECASE)
 
-        ocr_results[area_name] = ocr_text
+# Perform OCR on the Name/CP crops of many images, one batched call per area
+def perform_ocr_on_area_crops(crops, batch_size=OCR_BATCH_SIZE, recognition_only=False):
+    """crops is a list of {area_name: crop} dicts; returns the matching list of {area_name: text} dicts."""
+    ocr_results = [{} for _ in crops]
+    if not crops:
+        return ocr_results
+
+    for area_name in crops[0]:
+        allowlist = OCR_ALLOWLISTS.get(area_name) if recognition_only else None
+        texts = perform_ocr_on_images([image_crops[area_name] for image_crops in crops], allowlist,
+                                      batch_size, recognition_only)
+        for image_results, ocr_text in zip(ocr_results, texts):
+            image_results[area_name] = clean_ocr_text(area_name, ocr_text)
     return ocr_results
 
 
 # Detect if a Pokémon is a shadow Pokémon
+@instrumented("shadow")
 def is_shadow_pokemon(image, roi):
     top_left, bottom_right = roi
     region = image[top_left[1]:bottom_right[1], top_left[0]:bottom_right[0]]
@@ -144,27 +343,188 @@ def is_shadow_pokemon(image, roi):
     return purple_count >= 3 and blue_count >= 3
 
 
+# Extract everything except the Name/CP OCR from a decoded image
+def extract_image_features(image, image_path, debug_ocr=False):
+    iv_values, iv_confidence = read_iv_bars(image)
+    is_shadow = is_shadow_pokemon(image, SHADOW_ROI)
+
+    result = {
+        "image": image_path,
+        "attack_value": iv_values["attack"],
+        "defense_value": iv_values["defense"],
+        "hp_value": iv_values["hp"],
+        "iv_confidence": iv_confidence,
+        "is_shadow": is_shadow
+    }
+    if debug_ocr:
+        with timed("hsv"):
+            hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+            color_masks = create_color_masks(hsv_image, HSV_RANGES)
+        result["segment_ocr"] = {
+            stat: process_rectangles(RECTANGLES[stat], hsv_image, image, color_masks, debug_ocr=True)[1]
+            for stat in RECTANGLES
+        }
+    return result
+
+
 # Process a single image and extract required information
-def process_image(image_path):
+# With debug_ocr=True every IV bar segment is also OCR'd and returned under "segment_ocr" (slow).
+# With recognition_only=True the Name/CP crops skip text detection (see perform_ocr_on_image).
+# IVs are read by read_iv_bars; process_rectangles is the per-segment reference kept for debugging.
+def process_image(image_path, debug_ocr=False, recognition_only=False):
     try:
         image = load_image(image_path)
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        color_masks = create_color_masks(hsv_image, HSV_RANGES)
-
-        attack_value, _ = process_rectangles(RECTANGLES["attack"], hsv_image, image, color_masks)
-        defense_value, _ = process_rectangles(RECTANGLES["defense"], hsv_image, image, color_masks)
-        hp_value, _ = process_rectangles(RECTANGLES["hp"], hsv_image, image, color_masks)
-
-        ocr_specific_areas_results = perform_ocr_on_specific_areas(image, OCR_AREAS)
-        is_shadow = is_shadow_pokemon(image, ((7, 14), (1161, 958)))
-
-        return {
-            "image": image_path,
-            "attack_value": attack_value,
-            "defense_value": defense_value,
-            "hp_value": hp_value,
-            "ocr_specific": ocr_specific_areas_results,
-            "is_shadow": is_shadow
-        }
+        result = extract_image_features(image, image_path, debug_ocr)
+        result["ocr_specific"] = perform_ocr_on_specific_areas(image, OCR_AREAS, recognition_only)
+        return result
     except Exception as e:
-        return {"image": image_path, "error": str(e)}
\ No newline at end of file
+        return {"image": image_path, "error": str(e)}
+
+
+# Process decoded frames, recognizing their Name and CP areas in cross-image batches
+def process_frames(frames, batch_size=OCR_BATCH_SIZE, debug_ocr=False, recognition_only=False):
+    """Yields one process_image-style result per (source, image) pair of frames, in order.
+
+    image may also be the exception raised while loading the source, which is reported as that
+    source's error, or a list of results extracted earlier (extractionCache hits), which are
+    passed on in order without any OCR. Each frame is reduced to its IV/shadow results and
+    Name/CP crops right away, so only the small crops of one batch are held in memory while it
+    is recognized.
+    """
+    results = []
+    crops = []
+    pending = []
+
+    for source, image in frames:
+        if isinstance(image, list):
+            results.extend(image)
+            # Nothing waits for OCR, so earlier results need not wait for the batch to fill
+            if not pending:
+                yield from results
+                results = []
+            continue
+
+        try:
+            if isinstance(image, Exception):
+                raise image
+            result = extract_image_features(image, source, debug_ocr)
+            crops.append({area_name: crop_area(image, area).copy() for area_name, area in OCR_AREAS.items()})
+            pending.append(result)
+        except Exception as e:
+            result = {"image": source, "error": str(e)}
+            instrumentation.count("errors")
+        instrumentation.count("images")
+        results.append(result)
+
+        if len(results) >= batch_size:
+            yield from _recognize_batch(results, crops, pending, batch_size, recognition_only)
+            results, crops, pending = [], [], []
+
+    yield from _recognize_batch(results, crops, pending, batch_size, recognition_only)
+
+
+# Function to add the batched Name/CP OCR to the pending results of a batch
+def _recognize_batch(results, crops, pending, batch_size, recognition_only):
+    """If the batched OCR fails, the images are recognized one at a time, so only those that fail get an error."""
+    try:
+        ocr_batch = perform_ocr_on_area_crops(crops, batch_size, recognition_only)
+    except Exception:
+        ocr_batch = []
+        for image_crops in crops:
+            try:
+                ocr_batch.extend(perform_ocr_on_area_crops([image_crops], batch_size, recognition_only))
+            except Exception as e:
+                ocr_batch.append(e)
+
+    for result, ocr_results in zip(pending, ocr_batch):
+        if isinstance(ocr_results, Exception):
+            instrumentation.count("errors")
+            image_path = result["image"]
+            result.clear()
+            result.update({"image": image_path, "error": str(ocr_results)})
+        else:
+            result["ocr_specific"] = ocr_results
+    return results
+
+
+# Load images lazily as (image_path, image or exception) pairs for process_frames
+def iter_image_frames(image_paths):
+    for image_path in image_paths:
+        try:
+            yield image_path, load_image(image_path)
+        except Exception as e:
+            yield image_path, e
+
+
+# Load screenshots and screen recordings as (source, image or exception) pairs for process_frames
+def iter_source_frames(paths):
+    """Yields screenshots as they are and, for video files, only their distinct stable appraisal frames."""
+    from videoFrames import VIDEO_EXTENSIONS, iter_appraisal_frames
+
+    for path in paths:
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            try:
+                yield from iter_appraisal_frames(path)
+            except Exception as e:
+                yield path, e
+        else:
+            yield from iter_image_frames([path])
+
+
+# Process many images, recognizing their Name and CP areas in cross-image batches
+def process_images(image_paths, batch_size=OCR_BATCH_SIZE, debug_ocr=False, recognition_only=False):
+    """Yields one process_image-style result per path, in order."""
+    return process_frames(iter_image_frames(image_paths), batch_size, debug_ocr, recognition_only)
+
+
+# Process screenshots and screen recordings; video frames are reported as "<video path>#frame=<index>"
+def process_sources(paths, batch_size=OCR_BATCH_SIZE, debug_ocr=False, recognition_only=False):
+    return process_frames(iter_source_frames(paths), batch_size, debug_ocr, recognition_only)
+
+
+# Function to configure a process_sources_parallel worker; its OCR reader is created on first use
+def _init_ocr_worker(batch_size, debug_ocr, recognition_only, instrument=False):
+    global _worker_options
+    _worker_options = (batch_size, debug_ocr, recognition_only)
+    if instrument:
+        instrumentation.enable()
+    # torch reads this when easyocr is first imported by get_reader
+    os.environ.setdefault("OMP_NUM_THREADS", str(OCR_WORKER_THREADS))
+    cv2.setNumThreads(OCR_WORKER_THREADS)
+
+
+# Function run by the worker processes for each chunk of paths
+def _process_sources_worker(paths):
+    """Returns the results of the chunk and the instrumentation statistics recorded for it (None when off)."""
+    return list(process_sources(paths, *_worker_options)), instrumentation.collect()
+
+
+# Process screenshots and screen recordings in a pool of worker processes
+def process_sources_parallel(paths, workers=0, batch_size=OCR_BATCH_SIZE, debug_ocr=False,
+                             recognition_only=False, ordered=True):
+    """Yields the process_sources results of paths, computed by workers processes (0 = one per CPU core).
+
+    Workers receive chunks of batch_size paths and decode them themselves, so no pixels are
+    pickled; each worker holds its own OCR reader. With ordered=False results are yielded
+    chunk by chunk as soon as a worker finishes, instead of in path order.
+    """
+    workers = workers or os.cpu_count() or 1
+    paths = list(paths)
+    if workers <= 1:
+        yield from process_sources(paths, batch_size, debug_ocr, recognition_only)
+        return
+
+    chunks = [paths[start:start + batch_size] for start in range(0, len(paths), batch_size)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)) or 1, initializer=_init_ocr_worker,
+                             initargs=(batch_size, debug_ocr, recognition_only,
+                                       instrumentation.enabled())) as executor:
+        if ordered:
+            for results, collected in executor.map(_process_sources_worker, chunks):
+                instrumentation.merge(collected)
+                yield from results
+        else:
+            futures = [executor.submit(_process_sources_worker, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                results, collected = future.result()
+                instrumentation.merge(collected)
+                yield from results
@@ -0,0 +1,151 @@
+import numpy as np
+
+
+# Function to turn (level, multiplier) rows into arrays ordered from the highest level down
+def prepare_multipliers(cp_multipliers):
+    """Returns (levels, multipliers) arrays sorted by level in descending order."""
+    ordered = sorted(cp_multipliers, key=lambda row: row[0], reverse=True)
+    levels = np.array([level for level, _ in ordered], dtype=np.float64)
+    multipliers = np.array([multiplier for _, multiplier in ordered], dtype=np.float64)
+    return levels, multipliers
+
+
+# Function to round an array exactly like Python's round(value, ndigits)
+def round_half_even(values, ndigits):
+    """Vectorized equivalent of [round(value, ndigits) for value in values].
+
+    np.round can differ from round() when value * 10**ndigits lands on (or next to) a .5 tie,
+    so only those few values go through Python's round(); the rest use np.rint.
+    """
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    rounded = np.rint(scaled) / scale
+    near_tie = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for index in near_tie.tolist():
+        rounded[index] = round(float(values[index]), ndigits)
+    return rounded
+
+
+# Function to calculate CP for every IV combination at every level at once
+def calculate_cp_grid(calc_attack, calc_defense, calc_stamina, multipliers):
+    """Returns an (n_ivs, n_levels) integer array of CP values.
+
+    Mirrors calculate_cp in the league scripts term by term, so the floating point
+    results (and therefore the floored CP) are identical.
+    """
+    stat_term = calc_attack * (calc_defense ** 0.5) * (calc_stamina ** 0.5)
+    return np.floor((stat_term[:, None] * (multipliers ** 2)[None, :]) / 10).astype(np.int64)
+
+
+# Function to calculate the CP-by-level table of a species once for all leagues
+def compute_species_grid(stat_attack, stat_defense, stat_stamina, ivs, cp_multipliers):
+    """Computes the per-species data every league ranking is derived from.
+
+    ivs is a sequence of (iv_attack, iv_defense, iv_stamina) rows and cp_multipliers a
+    sequence of (level, multiplier) rows. The returned dict holds the IVs, the base stats
+    with IVs and the (n_ivs, n_levels) CP grid with levels in descending order.
+    """
+    ivs = np.asarray(ivs, dtype=np.int64).reshape(-1, 3)
+    levels, multipliers = prepare_multipliers(cp_multipliers)
+
+    # Calculate base attack, defense, stamina with IVs
+    calc_attack = (stat_attack + ivs[:, 0]).astype(np.float64)
+    calc_defense = (stat_defense + ivs[:, 1]).astype(np.float64)
+    calc_stamina = (stat_stamina + ivs[:, 2]).astype(np.float64)
+
+    return {
+        'ivs': ivs,
+        'calc_attack': calc_attack,
+        'calc_defense': calc_defense,
+        'calc_stamina': calc_stamina,
+        'levels': levels,
+        'multipliers': multipliers,
+        'cp_grid': calculate_cp_grid(calc_attack, calc_defense, calc_stamina, multipliers)
+    }
+
+
+# Function to rank a species' IV combinations for one league from its CP grid
+def rank_league(grid, cp_cap=None, max_level=None):
+    """Ranks all IV combinations for a CP cap and level cap.
+
+    For every IV combination the highest level <= max_level whose CP is <= cp_cap is used
+    (no limit when either is None); combinations with no valid level are dropped, just like
+    the original per-row loop. The returned arrays are ordered by rank: Stat Product
+    descending, then CP descending, then the input order.
+    """
+    cp_grid = grid['cp_grid']
+    eligible = np.ones(cp_grid.shape, dtype=bool)
+    if max_level is not None:
+        eligible &= (grid['levels'] <= max_level)[None, :]
+    if cp_cap is not None:
+        eligible &= cp_grid <= cp_cap
+
+    # Pick the first (highest) eligible level for each IV combination
+    valid = eligible.any(axis=1)
+    level_index = eligible.argmax(axis=1)
+
+    return _rank_rows(grid['ivs'], grid['calc_attack'], grid['calc_defense'], grid['calc_stamina'], cp_grid,
+                      grid['levels'], grid['multipliers'], level_index, valid)
+
+
+# Function to rank all IV combinations of a species for one CP cap
+def rank_species(stat_attack, stat_defense, stat_stamina, ivs, cp_multipliers, cp_cap=None, max_level=None):
+    """Computes CP, Stat Product, level, rank and percentage for all IV combinations.
+
+    Shortcut for compute_species_grid followed by rank_league when only one league is needed.
+    """
+    grid = compute_species_grid(stat_attack, stat_defense, stat_stamina, ivs, cp_multipliers)
+    return rank_league(grid, cp_cap, max_level)
+
+
+# Function to calculate stats, Stat Product, rank and percentage for the chosen levels
+def _rank_rows(ivs, calc_attack, calc_defense, calc_stamina, cp_grid, levels, multipliers,
+               level_index, valid):
+    rows = np.flatnonzero(valid)
+    level_index = level_index[rows]
+    multiplier = multipliers[level_index]
+
+    # Calculate actual stats with the correct multiplier
+    actual_attack = calc_attack[rows] * multiplier
+    actual_defense = calc_defense[rows] * multiplier
+    actual_stamina = np.floor(calc_stamina[rows] * multiplier)
+
+    # Calculate the Stat Product (SP), rounded up to one decimal
+    sp = np.ceil(((actual_attack * actual_defense * actual_stamina) / 1000) * 10) / 10
+    cp = cp_grid[rows, level_index]
+
+    # Sort by SP descending, then CP descending; lexsort is stable so ties keep input order
+    order = np.lexsort((-cp, -sp))
+    sp = sp[order]
+
+    # Calculate percentage of the best Stat Product
+    max_sp = sp[0] if len(sp) else 1
+    percentage = round_half_even((sp / max_sp) * 100, 2)
+
+    return {
+        'rank': np.arange(1, len(order) + 1),
+        'iv_attack': ivs[rows, 0][order],
+        'iv_defense': ivs[rows, 1][order],
+        'iv_stamina': ivs[rows, 2][order],
+        'actual_attack': actual_attack[order],
+        'actual_defense': actual_defense[order],
+        'actual_stamina': actual_stamina[order].astype(np.int64),
+        'sp': sp,
+        'cp': cp[order],
+        'level': levels[level_index][order],
+        'percentage': percentage
+    }
+
+
+# Function to turn the ranking arrays into rows for the league_rankings table
+def ranking_rows(ranking, league, pokemon_id):
+    """Yields (league, pokemon_id, iv_attack, iv_defense, iv_stamina, rank, sp, cp, level, percentage)
+    tuples in IV order, so they are appended to the table's primary key in sequence."""
+    order = np.lexsort((ranking['iv_stamina'], ranking['iv_defense'], ranking['iv_attack']))
+    columns = zip(
+        ranking['iv_attack'][order].tolist(), ranking['iv_defense'][order].tolist(),
+        ranking['iv_stamina'][order].tolist(), ranking['rank'][order].tolist(), ranking['sp'][order].tolist(),
+        ranking['cp'][order].tolist(), ranking['level'][order].tolist(), ranking['percentage'][order].tolist()
+    )
+    for iv_attack, iv_defense, iv_stamina, rank, sp, cp, level, percentage in columns:
+        yield league, pokemon_id, iv_attack, iv_defense, iv_stamina, rank, sp, cp, level, percentage
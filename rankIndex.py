@@ -0,0 +1,142 @@
+import argparse
+import mmap
+import os
+import sqlite3
+import struct
+
+import numpy as np
+
+from leagueBuild import DB_PATH, LEAGUES
+from tableVersions import get_table_version
+
+# Default path of the packed rank index
+INDEX_PATH = 'pokemon_ranks.bin'
+
+# File layout (little endian):
+#   header   magic, version, league count, pokemon id count, record size, league_rankings version
+#   leagues  2-byte league code per league
+#   slots    int32 per pokemon_id (0 .. id count - 1): species slot, or -1 if not indexed
+#   records  per slot, per league, per IV combination (iv_attack * 256 + iv_defense * 16 + iv_stamina)
+HEADER = struct.Struct('<4sHHIHI')
+MAGIC = b'PGRI'
+VERSION = 2
+IV_COMBINATIONS = 16 * 16 * 16
+
+# One record: rank (0 = no data), CP, level * 2, padding, percentage * 100, Stat Product * 10
+RECORD = struct.Struct('<HHBxHI')
+RECORD_DTYPE = np.dtype([('rank', '<u2'), ('cp', '<u2'), ('level2', 'u1'), ('pad', 'u1'),
+                         ('percentage100', '<u2'), ('sp10', '<u4')])
+
+
+# Function to export the league_rankings table into the packed binary index
+def export_rank_index(db_path=DB_PATH, index_path=INDEX_PATH):
+    """Writes every league ranking into a fixed-layout file that RankIndex can mmap.
+
+    Rankings are read one species and league at a time in file order and written as they come,
+    so memory stays flat however many species are exported. The file is written next to the
+    target and renamed over it, so readers that already have the old index mapped keep a
+    consistent view. The header records the league_rankings version the rows were read at.
+    """
+    leagues = list(LEAGUES)
+    temp_path = index_path + '.tmp'
+
+    with sqlite3.connect(db_path) as conn, open(temp_path, 'wb') as index_file:
+        cursor = conn.cursor()
+        # One read transaction, so the version and every row come from the same snapshot
+        cursor.execute("BEGIN")
+        rankings_version = get_table_version(cursor, 'league_rankings')
+        cursor.execute("SELECT DISTINCT pokemon_id FROM league_rankings ORDER BY pokemon_id")
+        pokemon_ids = [pokemon_id for pokemon_id, in cursor.fetchall()]
+        id_count = (max(pokemon_ids) + 1) if pokemon_ids else 0
+
+        slots = np.full(id_count, -1, dtype='<i4')
+        slots[pokemon_ids] = np.arange(len(pokemon_ids), dtype='<i4')
+
+        index_file.write(HEADER.pack(MAGIC, VERSION, len(leagues), id_count, RECORD.size, rankings_version))
+        index_file.write(''.join(leagues).encode('ascii'))
+        index_file.write(slots.tobytes())
+
+        # Records of one species in one league, reused for every block
+        records = np.zeros(IV_COMBINATIONS, dtype=RECORD_DTYPE)
+        for pokemon_id in pokemon_ids:
+            for league in leagues:
+                cursor.execute("""
+                    SELECT iv_attack, iv_defense, iv_stamina, rank, sp, cp, level, percentage
+                    FROM league_rankings WHERE league = ? AND pokemon_id = ?
+                """, (league, pokemon_id))
+                rows = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 8)
+
+                records.fill(0)
+                iv_index = (rows[:, 0] * 256 + rows[:, 1] * 16 + rows[:, 2]).astype(np.int64)
+                records['rank'][iv_index] = rows[:, 3]
+                records['sp10'][iv_index] = np.rint(rows[:, 4] * 10)
+                records['cp'][iv_index] = rows[:, 5]
+                records['level2'][iv_index] = np.rint(rows[:, 6] * 2)
+                records['percentage100'][iv_index] = np.rint(rows[:, 7] * 100)
+                index_file.write(records.tobytes())
+    os.replace(temp_path, index_path)
+
+    print(f"Exported {len(pokemon_ids)} Pokémon x {len(leagues)} leagues to {index_path} "
+          f"({os.path.getsize(index_path) / 1e6:.1f} MB).")
+
+
+class RankIndex:
+    """Read-only view of a packed rank index, memory-mapped so processes share it via the page cache."""
+
+    def __init__(self, index_path=INDEX_PATH):
+        with open(index_path, 'rb') as index_file:
+            self._mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, league_count, id_count, record_size, rankings_version = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"Unsupported rank index file: {index_path}")
+
+        # Version of league_rankings the index was exported from (see tableVersions)
+        self.rankings_version = rankings_version
+
+        codes = self._mmap[HEADER.size:HEADER.size + 2 * league_count].decode('ascii')
+        self.leagues = [codes[i:i + 2] for i in range(0, len(codes), 2)]
+        self._id_count = id_count
+        self._slots_offset = HEADER.size + 2 * league_count
+        self._records_offset = self._slots_offset + 4 * id_count
+
+    # Function to find the record slot of a Pokémon, or -1 if it is not in the index
+    def _slot(self, pokemon_id):
+        if not 0 <= pokemon_id < self._id_count:
+            return -1
+        return struct.unpack_from('<i', self._mmap, self._slots_offset + 4 * pokemon_id)[0]
+
+    def get_rankings(self, pokemon_id, iv_attack, iv_defense, iv_stamina):
+        """Returns the same {league name: ranking or message} dict as Main.get_rankings."""
+        rankings = {LEAGUES[league]["name"]: "No ranking data found." for league in self.leagues}
+        slot = self._slot(pokemon_id)
+        if slot < 0:
+            return rankings
+
+        iv_index = iv_attack * 256 + iv_defense * 16 + iv_stamina
+        for league_index, league in enumerate(self.leagues):
+            offset = self._records_offset + RECORD.size * (
+                (slot * len(self.leagues) + league_index) * IV_COMBINATIONS + iv_index)
+            rank, cp, level2, percentage100, sp10 = RECORD.unpack_from(self._mmap, offset)
+            if rank:
+                rankings[LEAGUES[league]["name"]] = {
+                    "rank": rank,
+                    # Whole Stat Products come back as int, like the INTEGER sp column
+                    "stat_product": sp10 // 10 if sp10 % 10 == 0 else sp10 / 10,
+                    "combat_power": cp,
+                    "level": level2 / 2,
+                    "percentage": percentage100 / 100
+                }
+        return rankings
+
+    def close(self):
+        self._mmap.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export league_rankings into a memory-mapped rank index.")
+    parser.add_argument("--db", default=DB_PATH, help="Path to the SQLite database")
+    parser.add_argument("--output", default=INDEX_PATH, help="Path of the rank index file to write")
+    args = parser.parse_args()
+
+    export_rank_index(args.db, args.output)
@@ -0,0 +1,20 @@
+import argparse
+import sys
+
+import Main
+
+# Query-only entry point: ranking lookups without importing OpenCV, EasyOCR or torch
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up league rankings for a Pokémon and its evolutions.")
+    parser.add_argument("name", help="Pokémon name; small typos are matched to the closest known name")
+    parser.add_argument("iv_attack", type=int)
+    parser.add_argument("iv_defense", type=int)
+    parser.add_argument("iv_stamina", type=int)
+    parser.add_argument("--db", default=Main.DB_PATH, help="Path to the SQLite database")
+    args = parser.parse_args()
+
+    Main.DB_PATH = args.db
+    pokemon_name, distance = Main.resolve_pokemon_name(args.name)
+    if distance:
+        print(f"Matched {args.name} to {pokemon_name} (edit distance {distance}).")
+    Main.write_evolution_rankings(sys.stdout, pokemon_name, args.iv_attack, args.iv_defense, args.iv_stamina)
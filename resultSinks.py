@@ -0,0 +1,211 @@
+import csv
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from Main import write_extracted_data
+from jsonEncoding import json_default
+
+# Records buffered by SqliteSink before they are inserted with one executemany and committed
+SINK_BATCH_SIZE = 500
+
+# Buffer size of the file-based sinks, so records are written to disk in large blocks
+SINK_BUFFER_SIZE = 1024 * 1024
+
+# Columns of CsvSink: the extraction fields, then one evolution/league ranking per row
+CSV_COLUMNS = ['image', 'error', 'name', 'matched_name', 'name_distance', 'cp', 'levels', 'iv_attack',
+               'iv_defense', 'iv_stamina', 'is_shadow', 'evolution', 'league', 'rank', 'stat_product',
+               'combat_power', 'level', 'percentage', 'note']
+
+# Fields of a record that CsvSink and SqliteSink store per image
+RESULT_FIELDS = CSV_COLUMNS[:11]
+
+
+# Function to turn one extracted image and its looked-up rankings into a plain, JSON-ready record
+def build_record(extracted_data, evolution_rankings):
+    """Returns a dict with the extraction, the matched name, the level check and the rankings of each evolution.
+
+    "evolutions" is None when no evolutionary data was found; an evolution missing from the
+    database has "rankings" None. Failed images only carry "image" and "error".
+    """
+    record = dict.fromkeys(RESULT_FIELDS)
+    record.update({"image": extracted_data["image"], "iv_confidence": None, "evolutions": None})
+    if 'error' in extracted_data:
+        record["error"] = extracted_data["error"]
+        return record
+
+    name_match = extracted_data.get("name_match") or {}
+    levels = extracted_data.get("levels")
+    record.update({
+        "name": extracted_data["ocr_specific"]["Name"],
+        "matched_name": name_match.get("name"),
+        "name_distance": name_match.get("distance"),
+        "cp": extracted_data["ocr_specific"]["CP"],
+        "levels": None if levels is None else [float(level) for level in levels],
+        "iv_attack": int(extracted_data["attack_value"]),
+        "iv_defense": int(extracted_data["defense_value"]),
+        "iv_stamina": int(extracted_data["hp_value"]),
+        "is_shadow": bool(extracted_data["is_shadow"]),
+        "iv_confidence": extracted_data.get("iv_confidence")
+    })
+    if evolution_rankings is not None:
+        record["evolutions"] = [{"name": evo_name, "rankings": rankings} for evo_name, rankings in evolution_rankings]
+    return record
+
+
+# Function to pick the per-image fields of a record, with the levels list stored as JSON text
+def result_fields(record):
+    fields = [record[field] for field in RESULT_FIELDS]
+    if record["levels"] is not None:
+        fields[RESULT_FIELDS.index("levels")] = json.dumps(record["levels"])
+    return fields
+
+
+# Function to flatten the rankings of a record into (evolution, league, rank, sp, cp, level, percentage, note) rows
+def ranking_rows(record):
+    if record["evolutions"] is None:
+        return
+    for evolution in record["evolutions"]:
+        if evolution["rankings"] is None:
+            yield (evolution["name"], None, None, None, None, None, None, "Not found in the database.")
+            continue
+        for league, result in evolution["rankings"].items():
+            if isinstance(result, dict):
+                yield (evolution["name"], league, result["rank"], result["stat_product"], result["combat_power"],
+                       result["level"], result["percentage"], None)
+            else:
+                yield (evolution["name"], league, None, None, None, None, None, result)
+
+
+class TextSink:
+    """The hand-readable pokemon_rankings.txt report."""
+
+    def __init__(self, path, append=False):
+        self.output_file = open(path, "a" if append else "w", buffering=SINK_BUFFER_SIZE)
+
+    def write(self, extracted_data, evolution_rankings):
+        write_extracted_data(self.output_file, extracted_data, evolution_rankings)
+
+    def flush(self):
+        self.output_file.flush()
+        os.fsync(self.output_file.fileno())
+
+    def close(self):
+        self.output_file.close()
+
+
+class JsonlSink:
+    """One build_record JSON object per line."""
+
+    def __init__(self, path, append=False):
+        self.output_file = open(path, "a" if append else "w", buffering=SINK_BUFFER_SIZE, encoding="utf-8")
+
+    def write(self, extracted_data, evolution_rankings):
+        self.output_file.write(json.dumps(build_record(extracted_data, evolution_rankings), ensure_ascii=False,
+                                          default=json_default))
+        self.output_file.write("\n")
+
+    def flush(self):
+        self.output_file.flush()
+        os.fsync(self.output_file.fileno())
+
+    def close(self):
+        self.output_file.close()
+
+
+class CsvSink:
+    """CSV_COLUMNS rows: one per image, evolution and league (a single row for images without rankings)."""
+
+    def __init__(self, path, append=False):
+        write_header = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        self.output_file = open(path, "a" if append else "w", buffering=SINK_BUFFER_SIZE, newline="",
+                                encoding="utf-8")
+        self.writer = csv.writer(self.output_file)
+        if write_header:
+            self.writer.writerow(CSV_COLUMNS)
+
+    def write(self, extracted_data, evolution_rankings):
+        record = build_record(extracted_data, evolution_rankings)
+        fields = result_fields(record)
+        rows = [fields + list(row) for row in ranking_rows(record)]
+        self.writer.writerows(rows or [fields + [None] * (len(CSV_COLUMNS) - len(RESULT_FIELDS))])
+
+    def flush(self):
+        self.output_file.flush()
+        os.fsync(self.output_file.fileno())
+
+    def close(self):
+        self.output_file.close()
+
+
+class SqliteSink:
+    """ocr_results (one row per image) and ocr_result_rankings tables, keyed by run and image."""
+
+    def __init__(self, path, append=False):
+        # Every run gets its own run_id; append only matters for the file-based sinks
+        self.run_id = datetime.now().isoformat(timespec="microseconds")
+        self.results = []
+        self.rankings = []
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS ocr_results (
+                run_id TEXT,
+                {", ".join(RESULT_FIELDS)},
+                PRIMARY KEY (run_id, image)
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS ocr_result_rankings (
+                run_id TEXT,
+                image TEXT,
+                evolution TEXT,
+                league TEXT,
+                rank INTEGER,
+                stat_product REAL,
+                combat_power INTEGER,
+                level REAL,
+                percentage REAL,
+                note TEXT
+            )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ocr_result_rankings_image ON ocr_result_rankings (run_id, image)")
+        self.conn.commit()
+
+    def write(self, extracted_data, evolution_rankings):
+        record = build_record(extracted_data, evolution_rankings)
+        self.results.append((self.run_id, *result_fields(record)))
+        self.rankings.extend((self.run_id, record["image"], *row) for row in ranking_rows(record))
+        if len(self.results) >= SINK_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        with self.conn:
+            self.conn.executemany(f"INSERT OR REPLACE INTO ocr_results VALUES ({', '.join('?' * (len(RESULT_FIELDS) + 1))})",
+                                  self.results)
+            self.conn.executemany("INSERT INTO ocr_result_rankings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  self.rankings)
+        self.results = []
+        self.rankings = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+# Output file extensions and the sink writing them
+SINKS = {
+    '.txt': TextSink,
+    '.jsonl': JsonlSink,
+    '.csv': CsvSink,
+    '.db': SqliteSink,
+    '.sqlite': SqliteSink
+}
+
+
+# Function to open the sink matching an output file's extension
+def open_sink(path, append=False):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SINKS:
+        raise ValueError(f"Unsupported output file {path}; use one of {', '.join(SINKS)}")
+    return SINKS[extension](path, append)
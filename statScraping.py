@@ -2,6 +2,8 @@ from bs4 import BeautifulSoup
 import requests
 import sqlite3
 
+from tableVersions import bump_table_version
+
 # Fetch the web page with error handling
 url = "https://bulbapedia.bulbagarden.net/wiki/List_of_Pok%C3%A9mon_by_base_stats_in_Pok%C3%A9mon_GO"
 
@@ -61,5 +63,8 @@ with sqlite3.connect('pokemon.db') as conn:
         VALUES (?, ?, ?, ?, ?)
     ''', pokemon_data)
 
+    # Record the refresh, so running lookups rebuild their name index and CP index
+    bump_table_version(cursor, 'pokemon_stats')
+
     # Commit the transaction (done automatically by the context manager)
     print("Data has been successfully saved to the pokemon.db database.")
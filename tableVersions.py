@@ -0,0 +1,22 @@
+import sqlite3
+
+# Table of per-table version numbers, bumped whenever a table that other processes keep in memory
+# (or export, like rankIndex.py) is rewritten
+VERSION_TABLE = 'table_versions'
+
+
+# Function to read the version of a table (0 before a refresh of it was recorded)
+def get_table_version(cursor, table_name):
+    try:
+        cursor.execute(f"SELECT version FROM {VERSION_TABLE} WHERE table_name = ?", (table_name,))
+    except sqlite3.OperationalError:
+        return 0
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+# Function to record that a table was rewritten, so loaded copies and exports of it are refreshed
+def bump_table_version(cursor, table_name):
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (table_name TEXT PRIMARY KEY, version INTEGER)")
+    cursor.execute(f"INSERT OR IGNORE INTO {VERSION_TABLE} (table_name, version) VALUES (?, 0)", (table_name,))
+    cursor.execute(f"UPDATE {VERSION_TABLE} SET version = version + 1 WHERE table_name = ?", (table_name,))
@@ -0,0 +1,178 @@
+import itertools
+import os
+import shutil
+import sqlite3
+import sys
+
+import numpy as np
+import pytest
+
+# The modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cpMultiplier import cp_multiplier_data
+from pkmOCR import OCR_AREAS
+
+# (pokemon_id, pokemon_name, stat_attack, stat_defense, stat_stamina) of the species in the test databases
+SPECIES = [
+    (1, "Bulbasaur", 118, 111, 128),
+    (2, "Ivysaur", 151, 143, 155),
+    (3, "Venusaur", 198, 189, 190),
+    (29, "Nidoran♀", 86, 89, 146),
+    (133, "Eevee", 104, 114, 146),
+    (134, "Vaporeon", 205, 161, 277),
+    (135, "Jolteon", 232, 182, 163),
+    (233, "Porygon2", 198, 180, 198),
+    (150, "Mewtwo", 300, 182, 214),
+]
+
+# (familyline, basic, stage2, stage3) rows of pokemon_evoline, including Eevee's branches
+EVOLINES = [
+    ("Bulbasaur", "Bulbasaur", "Ivysaur", "Venusaur"),
+    ("Nidoran♀", "Nidoran♀", None, None),
+    ("Eevee", "Eevee", "Vaporeon", None),
+    ("Eevee", "Eevee", "Jolteon", None),
+]
+
+
+# Function to create the tables the scraping scripts and ivCombinations.py fill
+def create_source_tables(db_path, species=SPECIES):
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE pokemon_stats (
+                pokemon_id INTEGER PRIMARY KEY,
+                pokemon_name TEXT,
+                stat_attack INTEGER,
+                stat_defense INTEGER,
+                stat_stamina INTEGER
+            )
+        ''')
+        cursor.executemany("INSERT INTO pokemon_stats VALUES (?, ?, ?, ?, ?)", species)
+
+        cursor.execute('''
+            CREATE TABLE pokemon_ivs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                iv_attack INTEGER,
+                iv_defense INTEGER,
+                iv_stamina INTEGER
+            )
+        ''')
+        cursor.executemany("INSERT INTO pokemon_ivs (iv_attack, iv_defense, iv_stamina) VALUES (?, ?, ?)",
+                           itertools.product(range(16), range(16), range(16)))
+
+        cursor.execute("CREATE TABLE cp_multiplier (level REAL PRIMARY KEY, multiplier REAL)")
+        cursor.executemany("INSERT INTO cp_multiplier VALUES (?, ?)", cp_multiplier_data)
+
+        cursor.execute('''
+            CREATE TABLE pokemon_evoline (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                familyline TEXT,
+                basic TEXT,
+                stage2 TEXT,
+                stage3 TEXT
+            )
+        ''')
+        cursor.executemany("INSERT INTO pokemon_evoline (familyline, basic, stage2, stage3) VALUES (?, ?, ?, ?)",
+                           EVOLINES)
+
+
+@pytest.fixture
+def source_db(tmp_path):
+    """A database with only the scraped source tables."""
+    db_path = str(tmp_path / "pokemon.db")
+    create_source_tables(db_path)
+    return db_path
+
+
+@pytest.fixture(scope="session")
+def _built_db(tmp_path_factory):
+    from leagueBuild import build_leagues
+
+    db_path = str(tmp_path_factory.mktemp("built") / "pokemon.db")
+    create_source_tables(db_path)
+    build_leagues(db_path)
+    return db_path
+
+
+@pytest.fixture
+def built_db(_built_db, tmp_path):
+    """A copy of a database with every league built, safe to modify."""
+    db_path = str(tmp_path / "pokemon.db")
+    shutil.copyfile(_built_db, db_path)
+    return db_path
+
+
+# Size of a screenshot in the RECTANGLES/OCR_AREAS layout
+SCREEN_SHAPE = (2532, 1170, 3)
+
+
+# Function to draw a screen whose Name and CP areas have the given gray values
+def screen(name_value, cp_value, width=SCREEN_SHAPE[1]):
+    image = np.full(SCREEN_SHAPE[:1] + (width, 3), 255, dtype=np.uint8)
+    for area_name, value in (("Name", name_value), ("CP", cp_value)):
+        (x_min, y_min), (x_max, y_max) = OCR_AREAS[area_name]
+        image[y_min:y_max, x_min:x_max] = value
+    return image
+
+
+# Function to save screens with the given Name values (and CP values 100 higher) as numbered PNG files
+def write_screens(folder, name_values):
+    import cv2
+
+    paths = []
+    for index, name_value in enumerate(name_values):
+        paths.append(str(folder / f"{index:03d}.png"))
+        cv2.imwrite(paths[-1], screen(name_value, name_value + 100))
+    return paths
+
+
+class StubReader:
+    """Stands in for easyocr.Reader: the text of an image is the mean of its pixels, e.g. "42".
+
+    Every call fails if one of its images has the mean FAILING_VALUE, like a crop EasyOCR rejects.
+    calls records (method, number of images or boxes) per call, allowlists the allowlist of each call.
+    """
+
+    FAILING_VALUE = 13
+
+    def __init__(self):
+        self.calls = []
+        self.allowlists = []
+
+    def text(self, image):
+        value = int(round(float(image.mean())))
+        if value == self.FAILING_VALUE:
+            raise RuntimeError("unreadable crop")
+        return str(value)
+
+    def readtext(self, image, detail=0, allowlist=None):
+        self.calls.append(("readtext", 1))
+        self.allowlists.append(allowlist)
+        return [self.text(image)]
+
+    def readtext_batched(self, images, detail=0, allowlist=None, batch_size=1):
+        self.calls.append(("readtext_batched", len(images)))
+        self.allowlists.append(allowlist)
+        if len({image.shape for image in images}) > 1:
+            raise ValueError("readtext_batched needs images of one size without n_width/n_height")
+        return [[self.text(image)] for image in images]
+
+    def recognize(self, image, horizontal_list=None, free_list=None, detail=1, allowlist=None, batch_size=1):
+        boxes = horizontal_list or [[0, image.shape[1], 0, image.shape[0]]]
+        self.calls.append(("recognize", len(boxes)))
+        self.allowlists.append(allowlist)
+        results = [([[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]],
+                    self.text(image[y_min:y_max, x_min:x_max]), 0.9)
+                   for x_min, x_max, y_min, y_max in boxes]
+        return results if detail else [text for _, text, _ in results]
+
+
+@pytest.fixture
+def stub_reader(monkeypatch):
+    """A StubReader used by pkmOCR instead of EasyOCR (also by forked worker processes)."""
+    import pkmOCR
+
+    reader = StubReader()
+    monkeypatch.setattr(pkmOCR, "_reader", reader)
+    return reader
@@ -0,0 +1,27 @@
+import json
+import os
+
+import pytest
+
+import Main
+from conftest import StubReader, write_screens
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_parallel_folder_reports_every_image_in_order(tmp_path, built_db, stub_reader, monkeypatch, pipelined):
+    monkeypatch.setattr(Main, "DB_PATH", built_db)
+    folder = tmp_path / "screens"
+    folder.mkdir()
+    write_screens(folder, [20, 30, StubReader.FAILING_VALUE, 40, 50, 60])
+    (folder / "broken.png").write_bytes(b"not an image")
+    report_path = str(tmp_path / "report.jsonl")
+
+    Main.process_folder(str(folder), batch_size=2, workers=2, pipelined=pipelined, output_paths=[report_path])
+
+    with open(report_path, encoding="utf-8") as report:
+        records = [json.loads(line) for line in report]
+    # Files are processed in the order the folder lists them
+    assert [record["image"] for record in records] == [str(folder / name) for name in os.listdir(folder)]
+    failed = {os.path.basename(record["image"]) for record in records if record["error"]}
+    assert failed == {"002.png", "broken.png"}
+    assert all(record["cp"] == str(int(record["name"]) + 100) for record in records if not record["error"])
@@ -0,0 +1,31 @@
+import instrumentation
+from benchmark import benchmark_process_image, time_image_stages
+
+
+def test_stage_times_come_from_the_real_process_image(tmp_path):
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+
+    instrumentation.enable()
+    try:
+        result, timings = time_image_stages(str(broken))
+    finally:
+        instrumentation.disable()
+
+    assert "error" in result
+    # process_image stops after the decode stage for an unreadable file
+    assert set(timings) == {"decode", "total"}
+    assert 0 <= timings["decode"] <= timings["total"]
+
+
+def test_failed_images_score_as_wrong_and_instrumentation_is_turned_off(tmp_path):
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+    truth = {"name": "Eevee", "cp": 512, "attack": 15, "defense": 14, "hp": 13, "is_shadow": False}
+
+    results = benchmark_process_image({str(broken): truth})
+
+    assert set(results["stages"]) == {"decode", "total"}
+    assert results["stages"]["decode"]["count"] == 1
+    assert set(results["accuracy"].values()) == {0.0}
+    assert not instrumentation.enabled()
@@ -0,0 +1,65 @@
+import math
+import sqlite3
+
+import pytest
+
+import cpIndex
+from conftest import SPECIES
+from cpIndex import MIN_CP, CpIndex, find_levels, get_cp_index
+from cpMultiplier import cp_multiplier_data
+
+
+@pytest.fixture(autouse=True)
+def clear_cp_caches():
+    cpIndex.clear_caches()
+    yield
+    cpIndex.clear_caches()
+
+
+# Function to list {cp: [(level, iv_attack, iv_defense, iv_stamina)]} by computing every CP one at a time
+def brute_force_combinations(stat_attack, stat_defense, stat_stamina):
+    combinations = {}
+    for level, multiplier in cp_multiplier_data:
+        for iv_attack in range(16):
+            for iv_defense in range(16):
+                for iv_stamina in range(16):
+                    cp = math.floor((stat_attack + iv_attack) * ((stat_defense + iv_defense) ** 0.5)
+                                    * ((stat_stamina + iv_stamina) ** 0.5) * (multiplier ** 2) / 10)
+                    combinations.setdefault(max(cp, MIN_CP), []).append((level, iv_attack, iv_defense, iv_stamina))
+    return {cp: sorted(found) for cp, found in combinations.items()}
+
+
+@pytest.mark.parametrize("species", [SPECIES[0], SPECIES[3], SPECIES[8]], ids=lambda species: species[1])
+def test_combinations_match_brute_force(species):
+    _, _, stat_attack, stat_defense, stat_stamina = species
+    expected = brute_force_combinations(stat_attack, stat_defense, stat_stamina)
+    cp_index = CpIndex(stat_attack, stat_defense, stat_stamina)
+
+    for cp in range(max(expected) + 2):
+        assert cp_index.combinations(cp) == expected.get(cp, [])
+
+    for cp, found in list(expected.items())[::50]:
+        levels_by_ivs = {}
+        for level, *ivs in found:
+            levels_by_ivs.setdefault(tuple(ivs), []).append(level)
+        for ivs, levels in levels_by_ivs.items():
+            assert cp_index.levels_for(cp, *ivs) == sorted(levels)
+
+
+def test_find_levels(built_db):
+    # A level 20 Mewtwo with 15/15/15 has CP 2387 (see the brute force formula above)
+    assert find_levels(150, 2387, 15, 15, 15, built_db) == [20.0]
+    assert find_levels(150, 2388, 15, 15, 15, built_db) == []
+    assert find_levels(9999, 2387, 15, 15, 15, built_db) is None
+
+
+def test_clear_caches_picks_up_new_base_stats(built_db):
+    before = get_cp_index(150, built_db)
+    with sqlite3.connect(built_db) as conn:
+        conn.execute("UPDATE pokemon_stats SET stat_attack = 100 WHERE pokemon_id = 150")
+
+    assert get_cp_index(150, built_db) is before
+    cpIndex.clear_caches()
+    after = get_cp_index(150, built_db)
+    assert after is not before
+    assert after.cp_grid.max() < before.cp_grid.max()
@@ -0,0 +1,48 @@
+import sqlite3
+
+import pytest
+
+import customRankings
+from customRankings import get_custom_rank, get_custom_ranking
+from leagueBuild import LEAGUES
+
+
+@pytest.fixture(autouse=True)
+def clear_custom_caches():
+    customRankings.clear_caches()
+    yield
+    customRankings.clear_caches()
+
+
+@pytest.mark.parametrize("league", sorted(LEAGUES))
+def test_custom_rank_matches_built_league(built_db, league):
+    settings = LEAGUES[league]
+    with sqlite3.connect(built_db) as conn:
+        rows = conn.execute('''
+            SELECT pokemon_id, iv_attack, iv_defense, iv_stamina, rank, sp, cp, level, percentage
+            FROM league_rankings WHERE league = ? AND iv_defense = 15
+        ''', (league,)).fetchall()
+
+    assert rows
+    for pokemon_id, iv_attack, iv_defense, iv_stamina, rank, sp, cp, level, percentage in rows:
+        result = get_custom_rank(pokemon_id, iv_attack, iv_defense, iv_stamina, settings["cp_cap"],
+                                 settings["max_level"], built_db)
+        assert result == {"rank": rank, "stat_product": sp, "combat_power": cp, "level": level,
+                          "percentage": percentage}
+        assert type(result["stat_product"]) is type(sp)
+
+
+def test_unknown_species_has_no_ranking(built_db):
+    assert get_custom_ranking(9999, 1500, None, built_db) is None
+    assert get_custom_rank(9999, 15, 15, 15, 1500, None, built_db) is None
+
+
+def test_max_level_below_lowest_level_is_rejected(built_db):
+    with pytest.raises(ValueError, match="max_level"):
+        get_custom_ranking(1, None, 0.5, built_db)
+
+
+def test_level_cap_limits_the_level(built_db):
+    result = get_custom_rank(150, 15, 15, 15, None, 40, built_db)
+    assert result["level"] == 40.0
+    assert result["rank"] == 1
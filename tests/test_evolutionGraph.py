@@ -0,0 +1,55 @@
+import sqlite3
+
+import Main
+from evolutionGraph import EvolutionGraph, bump_evoline_version
+
+# (basic, stage2, stage3) rows with linear, single-stage and branching families
+ROWS = [
+    ("Bulbasaur", "Ivysaur", "Venusaur"),
+    ("Nidoran♀", None, None),
+    ("Eevee", "Vaporeon", None),
+    ("Eevee", "Jolteon", None),
+    ("Oddish", "Gloom", "Vileplume"),
+    ("Oddish", "Gloom", "Bellossom"),
+    ("Wurmple", "Silcoon", "Beautifly"),
+    ("Wurmple", "Cascoon", "Dustox"),
+]
+
+
+def test_linear_lines_keep_the_later_stages():
+    graph = EvolutionGraph(ROWS)
+    assert graph.relevant_evolutions("Bulbasaur") == ["Bulbasaur", "Ivysaur", "Venusaur"]
+    assert graph.relevant_evolutions("Ivysaur") == ["Ivysaur", "Venusaur"]
+    assert graph.relevant_evolutions("Venusaur") == ["Venusaur"]
+    assert graph.relevant_evolutions("Nidoran♀") == ["Nidoran♀"]
+    assert graph.relevant_evolutions("Pikachu") == []
+
+
+def test_branches_are_listed_in_table_order():
+    graph = EvolutionGraph(ROWS)
+    assert graph.relevant_evolutions("Eevee") == ["Eevee", "Vaporeon", "Jolteon"]
+    assert graph.relevant_evolutions("Oddish") == ["Oddish", "Gloom", "Vileplume", "Bellossom"]
+    assert graph.relevant_evolutions("Gloom") == ["Gloom", "Vileplume", "Bellossom"]
+    assert graph.relevant_evolutions("Wurmple") == ["Wurmple", "Silcoon", "Beautifly", "Cascoon", "Dustox"]
+    assert graph.relevant_evolutions("Cascoon") == ["Cascoon", "Dustox"]
+    assert graph.evolutions["Eevee"] == ["Vaporeon", "Jolteon"]
+
+
+def test_repeated_rows_add_nothing():
+    assert EvolutionGraph(ROWS + ROWS[:4]).descendants == EvolutionGraph(ROWS).descendants
+
+
+def test_main_reloads_the_graph_after_a_refresh(built_db, monkeypatch):
+    monkeypatch.setattr(Main, "DB_PATH", built_db)
+    Main.refresh_table_versions()
+    assert Main.get_relevant_evolutions("Eevee") == ["Eevee", "Vaporeon", "Jolteon"]
+    assert Main.get_relevant_evolutions_batch(["Ivysaur", "Mewtwo"]) == {"Ivysaur": ["Ivysaur", "Venusaur"]}
+
+    with sqlite3.connect(built_db) as conn:
+        conn.execute("INSERT INTO pokemon_evoline (familyline, basic, stage2, stage3) "
+                     "VALUES ('Eevee', 'Eevee', 'Flareon', NULL)")
+        bump_evoline_version(conn.cursor())
+
+    # The new branch is picked up by the next lookup batch
+    Main.refresh_table_versions()
+    assert Main.get_relevant_evolutions("Eevee") == ["Eevee", "Vaporeon", "Jolteon", "Flareon"]
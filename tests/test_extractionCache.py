@@ -0,0 +1,120 @@
+import os
+from collections import deque
+
+import pytest
+
+import Main
+from extractionCache import (EXTRACTION_CACHE_PATH, ExtractionCache, content_hash, iter_cache_lookups,
+                             pipeline_version, store_extracted)
+from ocrPipeline import run_pipeline
+
+VERSION = pipeline_version()
+
+
+# Function to write a file and return its path
+def write_file(folder, name, content):
+    path = str(folder / name)
+    with open(path, "wb") as source_file:
+        source_file.write(content)
+    return path
+
+
+# Function to make a result the way process_frames reports it
+def result(image, **fields):
+    return dict({"image": image, "attack_value": 15, "ocr_specific": {"Name": "Eevee", "CP": "512"}}, **fields)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    extraction_cache = ExtractionCache(str(tmp_path / EXTRACTION_CACHE_PATH))
+    yield extraction_cache
+    extraction_cache.close()
+
+
+def test_results_are_reused_under_another_path(tmp_path, cache):
+    path = write_file(tmp_path, "a.mp4", b"recording")
+    cache.put(content_hash(path), VERSION, path, [result(path + "#frame=3"), result(path + "#frame=40")])
+
+    copy = write_file(tmp_path, "copy.mp4", b"recording")
+    assert [item["image"] for item in cache.get(content_hash(copy), VERSION, copy)] == \
+        [copy + "#frame=3", copy + "#frame=40"]
+    assert cache.get(content_hash(copy), pipeline_version(recognition_only=True), copy) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = ExtractionCache(str(tmp_path / EXTRACTION_CACHE_PATH), max_bytes=150)
+    paths = [write_file(tmp_path, f"{name}.png", name.encode()) for name in "abc"]
+    for path in paths:
+        cache.put(content_hash(path), VERSION, path, [result(path)])
+        cache.commit()
+    assert cache.get(content_hash(paths[0]), VERSION, paths[0]) is None
+    assert cache.get(content_hash(paths[2]), VERSION, paths[2]) is not None
+    cache.close()
+
+
+def test_store_extracted_groups_results_per_file(tmp_path, cache):
+    paths = [write_file(tmp_path, name, name.encode()) for name in ("a.png", "b.mp4", "c.mp4", "d.png", "e.png")]
+    cache.put(content_hash(paths[3]), VERSION, paths[3], [result(paths[3])])
+    pending = deque()
+    lookups = list(iter_cache_lookups(paths, cache, VERSION, pending))
+    assert [cached is not None for _, cached in lookups] == [False, False, False, True, False]
+
+    # c.mp4 has no appraisal frame; e.png could not be read
+    results = [result(paths[0]), result(paths[1] + "#frame=1"), result(paths[1] + "#frame=9"),
+               *lookups[3][1], {"image": paths[4], "error": "Could not read image"}]
+    assert list(store_extracted(iter(results), cache, VERSION, pending)) == results
+    assert not pending
+
+    stored = [cache.get(content_hash(path), VERSION, path) for path in paths]
+    assert stored[0] == [result(paths[0])]
+    assert [item["image"] for item in stored[1]] == [paths[1] + "#frame=1", paths[1] + "#frame=9"]
+    assert stored[2] == []
+    assert stored[4] is None
+
+
+def test_fields_added_downstream_are_not_cached(tmp_path, cache):
+    paths = [write_file(tmp_path, name, name.encode()) for name in ("a.png", "b.png")]
+    pending = deque()
+    list(iter_cache_lookups(paths, cache, VERSION, pending))
+
+    # The lookup stage of the pipeline adds its fields while the file is still being collected
+    for item in store_extracted(iter([result(paths[0]), result(paths[1])]), cache, VERSION, pending):
+        item["ocr_specific"]["Name"] = "Vaporeon"
+        item.update(name_match="Vaporeon", levels=[20.0], evolutions=[])
+
+    assert [cache.get(content_hash(path), VERSION, path) for path in paths] == \
+        [[result(paths[0])], [result(paths[1])]]
+
+
+def test_pipeline_only_decodes_cache_misses(tmp_path, cache):
+    paths = [write_file(tmp_path, f"{name}.png", name.encode() * 10) for name in "abcd"]
+    for path in paths[::2]:
+        cache.put(content_hash(path), VERSION, path, [result(path)])
+
+    written = []
+    stages = run_pipeline(paths, lambda batch: [None] * len(batch), lambda item: written.append(item[0]),
+                          cache=cache)
+
+    assert [item["image"] for item in written] == paths
+    assert written[0] == result(paths[0])
+    # b and d are not images, so decoding them fails and the errors are not cached
+    assert "error" in written[1] and "error" in written[3]
+    assert cache.get(content_hash(paths[1]), VERSION, paths[1]) is None
+    assert {stats.name: stats.items for stats in stages}["decode"] == 4
+
+
+def test_process_folder_cache_is_opt_in_and_next_to_the_database(tmp_path, monkeypatch):
+    folder = tmp_path / "screens"
+    folder.mkdir()
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Main, "DB_PATH", str(data_dir / "pokemon.db"))
+
+    Main.process_folder(str(folder), output_paths=[str(tmp_path / "report.txt")])
+    assert not os.path.exists(EXTRACTION_CACHE_PATH)
+    assert not os.path.exists(data_dir / EXTRACTION_CACHE_PATH)
+
+    Main.process_folder(str(folder), cache=True, output_paths=[str(tmp_path / "report.txt")])
+    assert os.path.exists(data_dir / EXTRACTION_CACHE_PATH)
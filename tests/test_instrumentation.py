@@ -0,0 +1,90 @@
+from functools import lru_cache
+
+import pytest
+
+import instrumentation
+from instrumentation import collect, count, instrumented, merge, record_cache, register_cache, timed
+
+
+@pytest.fixture(autouse=True)
+def instrumentation_off():
+    instrumentation.disable()
+    yield
+    instrumentation.disable()
+
+
+def test_nothing_is_recorded_while_off():
+    assert timed("decode") is timed("ocr")
+    with timed("decode"):
+        count("ocr.crops")
+        record_cache("extraction", True)
+    assert collect() is None
+
+    instrumentation.enable()
+    assert collect() == ({}, {}, {})
+
+
+def test_stages_counters_and_caches_are_collected_and_reset():
+    @instrumented("lookup")
+    def lookup(value):
+        return value * 2
+
+    instrumentation.enable()
+    with timed("decode"):
+        pass
+    assert lookup(21) == 42
+    assert lookup(1) == 2
+    count("ocr.crops", 3)
+    count("ocr.crops")
+    record_cache("extraction", True)
+    record_cache("extraction", False)
+    record_cache("extraction", True)
+
+    timings, counters, caches = collect()
+    assert timings["decode"][0] == 1 and timings["lookup"][0] == 2
+    assert 0 <= timings["lookup"][2] <= timings["lookup"][1]
+    assert counters == {"ocr.crops": 4}
+    assert caches == {"extraction": [2, 1]}
+    assert collect() == ({}, {}, {})
+
+
+def test_merge_adds_statistics_of_another_process():
+    instrumentation.enable()
+    add_time = instrumentation.add_time
+    add_time("ocr", 1.0)
+    count("ocr.crops", 2)
+    worker = collect()
+
+    add_time("ocr", 3.0)
+    record_cache("extraction", False)
+    merge(worker)
+    merge(None)
+
+    timings, counters, caches = collect()
+    assert timings == {"ocr": [2, 4.0, 3.0]}
+    assert counters == {"ocr.crops": 2}
+    assert caches == {"extraction": [0, 1]}
+
+
+def test_run_summary_reports_registered_lru_caches(capsys, monkeypatch):
+    monkeypatch.setattr(instrumentation, "_lru_caches", {})
+
+    @lru_cache(maxsize=None)
+    def square(value):
+        return value * value
+
+    square(1)
+    register_cache("test.square", square)
+
+    instrumentation.start_run()
+    for value in (1, 2, 2, 3):
+        square(value)
+    with timed("decode"):
+        pass
+    summary = instrumentation.finish_run()
+
+    # Only the calls made during the run are counted
+    assert summary["caches"]["test.square"] == {"hits": 2, "misses": 2, "hit_rate": 0.5}
+    assert summary["stages"]["decode"]["calls"] == 1
+    assert not instrumentation.enabled()
+    assert "cache test.square: 2 hits, 2 misses (50.0% hit rate)" in capsys.readouterr().out
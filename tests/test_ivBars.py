@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+import pytest
+
+from pkmOCR import HSV_RANGES, RECTANGLES, create_color_masks, process_rectangles, read_iv_bars
+
+# BGR colors of the bar pixels drawn by the tests
+ORANGE = (0, 140, 255)
+RED = (0, 0, 255)
+GRAY = (220, 220, 220)
+
+
+# Function to read the IV bars of an image with the original per-segment loop
+def reference_iv_values(image):
+    hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    color_masks = create_color_masks(hsv_image, HSV_RANGES)
+    return {stat: process_rectangles(rectangles, hsv_image, image, color_masks)[0]
+            for stat, rectangles in RECTANGLES.items()}
+
+
+# Function to paint every bar segment with a random mix of orange, red and gray pixels
+def random_bars(rng):
+    """Fill shares are drawn around the 50% threshold, so segments on both sides of it are common."""
+    image = np.full((2532, 1170, 3), 255, dtype=np.uint8)
+    for rectangles in RECTANGLES.values():
+        red_share = rng.choice([0.0, 0.45, 0.55], p=[0.8, 0.1, 0.1])
+        for (x0, y0), (x1, y1) in rectangles:
+            division_width = (x1 - x0) // 5
+            for j in range(5):
+                x_start = x0 + j * division_width
+                shape = (y1 - y0, division_width)
+                orange_share = rng.choice([0.0, 0.45, 0.55, 1.0])
+                draw = rng.random(shape)
+                segment = np.empty(shape + (3,), dtype=np.uint8)
+                segment[:] = GRAY
+                segment[draw < orange_share] = ORANGE
+                segment[draw >= 1 - red_share] = RED
+                image[y0:y1, x_start:x_start + division_width] = segment
+    return image
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_process_rectangles_on_random_bars(seed):
+    image = random_bars(np.random.default_rng(seed))
+    values, confidence = read_iv_bars(image)
+    assert values == reference_iv_values(image)
+    assert set(confidence) == set(RECTANGLES)
+
+
+@pytest.mark.parametrize("iv_value", range(16))
+def test_reads_drawn_bars(iv_value):
+    from benchmark import draw_iv_bar
+
+    image = np.full((2532, 1170, 3), 255, dtype=np.uint8)
+    for rectangles in RECTANGLES.values():
+        draw_iv_bar(image, rectangles, iv_value)
+    values, confidence = read_iv_bars(image)
+
+    assert values == {stat: iv_value for stat in RECTANGLES} == reference_iv_values(image)
+    # Solidly drawn segments are clearly filled or clearly empty
+    assert min(min(segments) for segments in confidence.values()) > 0.9
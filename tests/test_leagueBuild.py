@@ -0,0 +1,270 @@
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+import leagueBuild
+from conftest import create_source_tables
+from leagueBuild import build_leagues
+
+
+# Function to read a whole table in primary key order
+def read_table(db_path, table):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3").fetchall()
+
+
+def test_interrupted_build_keeps_whole_species_and_resumes(source_db, _built_db, monkeypatch):
+    write_league_rankings = leagueBuild.write_league_rankings
+    written = []
+
+    def failing_write(cursor, league, pokemon_id, rows):
+        written.append(pokemon_id)
+        if len(set(written)) == 3:
+            raise RuntimeError("disk full")
+        return write_league_rankings(cursor, league, pokemon_id, rows)
+
+    monkeypatch.setattr(leagueBuild, "write_league_rankings", failing_write)
+    with pytest.raises(RuntimeError):
+        build_leagues(source_db)
+
+    # The Pokémon being written when the build failed was rolled back as a whole
+    with sqlite3.connect(source_db) as conn:
+        built = conn.execute("SELECT DISTINCT pokemon_id FROM league_rankings ORDER BY pokemon_id").fetchall()
+        recorded = conn.execute("SELECT DISTINCT pokemon_id FROM league_build_state ORDER BY pokemon_id").fetchall()
+    assert len(built) == 2
+    assert built == recorded
+
+    monkeypatch.setattr(leagueBuild, "write_league_rankings", write_league_rankings)
+    build_leagues(source_db)
+    assert read_table(source_db, "league_rankings") == read_table(_built_db, "league_rankings")
+
+
+def test_dropped_rankings_are_rebuilt_despite_current_fingerprints(built_db, _built_db):
+    with sqlite3.connect(built_db) as conn:
+        conn.execute("DROP TABLE league_rankings")
+    build_leagues(built_db)
+    assert read_table(built_db, "league_rankings") == read_table(_built_db, "league_rankings")
+
+
+def test_deleted_species_rows_are_rebuilt(built_db, _built_db):
+    with sqlite3.connect(built_db) as conn:
+        conn.execute("DELETE FROM league_rankings WHERE league = 'UL' AND pokemon_id = 133")
+        cursor = conn.cursor()
+        pokemon_stats, ivs_combinations, cp_multipliers = leagueBuild.load_build_inputs(cursor)
+        digest = leagueBuild.shared_inputs_digest(ivs_combinations, cp_multipliers)
+        tasks, _, stale = leagueBuild.plan_build(cursor, pokemon_stats, list(leagueBuild.LEAGUES), digest)
+    assert [(pokemon[0], leagues) for pokemon, leagues in tasks] == [(133, ["UL"])]
+    assert stale == []
+
+    build_leagues(built_db)
+    assert read_table(built_db, "league_rankings") == read_table(_built_db, "league_rankings")
+
+
+def test_migrate_legacy_tables(built_db, _built_db):
+    with sqlite3.connect(built_db) as conn:
+        rows = conn.execute("SELECT * FROM league_rankings").fetchall()
+        conn.execute("DROP TABLE league_rankings")
+        for league, pokemon_id in {row[:2] for row in rows}:
+            table_name = f"{league}_{pokemon_id}_stats"
+            conn.execute(f'''
+                CREATE TABLE {table_name} (
+                    rank INTEGER, pokemon_id INTEGER, pokemon_name TEXT, stat_attack INTEGER,
+                    stat_defense INTEGER, stat_stamina INTEGER, iv_attack INTEGER, iv_defense INTEGER,
+                    iv_stamina INTEGER, actual_attack REAL, actual_defense REAL, actual_stamina REAL,
+                    sp INTEGER, cp INTEGER, level REAL, percentage REAL
+                )
+            ''')
+            legacy_rows = [(rank, pokemon_id, "", 0, 0, 0, iv_attack, iv_defense, iv_stamina, 0, 0, 0,
+                            sp, cp, level, percentage)
+                           for row_league, row_id, iv_attack, iv_defense, iv_stamina, rank, sp, cp, level, percentage
+                           in rows if (row_league, row_id) == (league, pokemon_id)]
+            # The old scripts appended on every run, so the rows are there twice
+            conn.executemany(f"INSERT INTO {table_name} VALUES ({', '.join('?' * 16)})", legacy_rows * 2)
+
+    leagueBuild.migrate_legacy_tables(built_db)
+
+    assert read_table(built_db, "league_rankings") == read_table(_built_db, "league_rankings")
+    with sqlite3.connect(built_db) as conn:
+        tables = [name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    assert not any(leagueBuild.LEGACY_TABLE_PATTERN.match(name) for name in tables)
+
+
+def test_parallel_build_matches_serial_build(source_db, _built_db):
+    build_leagues(source_db, workers=2)
+    assert read_table(source_db, "league_rankings") == read_table(_built_db, "league_rankings")
+    assert read_table(source_db, "league_build_state") == read_table(_built_db, "league_build_state")
+
+
+def test_parallel_rankings_stay_within_the_window(source_db, monkeypatch):
+    submitted = []
+
+    class CountingExecutor(leagueBuild.ProcessPoolExecutor):
+        def submit(self, *args, **kwargs):
+            submitted.append(args[1][0][0])
+            return super().submit(*args, **kwargs)
+
+    monkeypatch.setattr(leagueBuild, "ProcessPoolExecutor", CountingExecutor)
+    with sqlite3.connect(source_db) as conn:
+        pokemon_stats, ivs_combinations, cp_multipliers = leagueBuild.load_build_inputs(conn.cursor())
+    tasks = [(pokemon, ["GL"]) for pokemon in pokemon_stats]
+
+    window = 2 * leagueBuild.RANKING_WINDOW_PER_WORKER
+    received = []
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        for pokemon, leagues, scratch_path in leagueBuild.iter_scratch_rankings(tasks, ivs_combinations,
+                                                                                cp_multipliers, scratch_dir, 2):
+            received.append(pokemon[0])
+            assert len(submitted) - len(received) < window
+            assert leagues == ["GL"]
+            with sqlite3.connect(scratch_path) as conn:
+                assert conn.execute("SELECT DISTINCT league, pokemon_id FROM league_rankings").fetchall() == [
+                    ("GL", pokemon[0])]
+            conn.close()
+    assert received == [pokemon[0] for pokemon in pokemon_stats]
+
+
+# Function to count the rows of each Pokémon in league_rankings
+def rows_per_pokemon(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return dict(conn.execute("SELECT pokemon_id, COUNT(*) FROM league_rankings GROUP BY pokemon_id").fetchall())
+
+
+def test_unchanged_database_rebuilds_nothing(built_db, _built_db, capsys):
+    build_leagues(built_db)
+    assert "Rebuilt 0 of" in capsys.readouterr().out
+    assert read_table(built_db, "league_rankings") == read_table(_built_db, "league_rankings")
+
+
+def test_changed_stats_rebuild_only_that_species(built_db, monkeypatch):
+    with sqlite3.connect(built_db) as conn:
+        conn.execute("UPDATE pokemon_stats SET stat_attack = 150 WHERE pokemon_id = 29")
+    rank_pokemon = leagueBuild.rank_pokemon
+    ranked = []
+
+    def recording_rank(pokemon, *args):
+        ranked.append(pokemon[0])
+        return rank_pokemon(pokemon, *args)
+
+    monkeypatch.setattr(leagueBuild, "rank_pokemon", recording_rank)
+    build_leagues(built_db)
+    assert ranked == [29]
+
+    # The new rankings match a build from scratch with the new stats
+    scratch = built_db + ".scratch"
+    with sqlite3.connect(built_db) as conn:
+        species = conn.execute("SELECT * FROM pokemon_stats ORDER BY pokemon_id").fetchall()
+    create_source_tables(scratch, species)
+    monkeypatch.setattr(leagueBuild, "rank_pokemon", rank_pokemon)
+    build_leagues(scratch)
+    assert read_table(built_db, "league_rankings") == read_table(scratch, "league_rankings")
+
+
+def test_removed_species_rankings_are_deleted(built_db):
+    with sqlite3.connect(built_db) as conn:
+        conn.execute("DELETE FROM pokemon_stats WHERE pokemon_id = 150")
+    before = rows_per_pokemon(built_db)
+    build_leagues(built_db)
+    after = rows_per_pokemon(built_db)
+
+    assert 150 in before and 150 not in after
+    assert after == {pokemon_id: rows for pokemon_id, rows in before.items() if pokemon_id != 150}
+    with sqlite3.connect(built_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM league_build_state WHERE pokemon_id = 150").fetchone() == (0,)
+
+
+def test_new_league_only_builds_that_league(built_db, _built_db):
+    with sqlite3.connect(built_db) as conn:
+        conn.execute("DELETE FROM league_rankings WHERE league = 'LC'")
+        conn.execute("DELETE FROM league_build_state WHERE league = 'LC'")
+        cursor = conn.cursor()
+        pokemon_stats, ivs_combinations, cp_multipliers = leagueBuild.load_build_inputs(cursor)
+        digest = leagueBuild.shared_inputs_digest(ivs_combinations, cp_multipliers)
+        tasks, _, stale = leagueBuild.plan_build(cursor, pokemon_stats, list(leagueBuild.LEAGUES), digest)
+    assert {leagues == ["LC"] for _, leagues in tasks} == {True}
+    assert len(tasks) == len(pokemon_stats)
+
+    build_leagues(built_db)
+    assert read_table(built_db, "league_rankings") == read_table(_built_db, "league_rankings")
+
+
+# Function to read the BULK_PRAGMAS settings of a connection
+def read_pragmas(conn):
+    return {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in leagueBuild.BULK_PRAGMAS}
+
+
+def test_bulk_build_matches_and_restores_pragmas(source_db, _built_db):
+    with sqlite3.connect(source_db) as conn:
+        before = read_pragmas(conn)
+        with leagueBuild.bulk_load_pragmas(conn):
+            assert read_pragmas(conn)["synchronous"] == 0
+        assert read_pragmas(conn) == before
+
+    build_leagues(source_db, bulk=True)
+    assert read_table(source_db, "league_rankings") == read_table(_built_db, "league_rankings")
+
+
+def test_interrupted_bulk_build_keeps_committed_batches(source_db, _built_db, monkeypatch):
+    monkeypatch.setattr(leagueBuild, "BULK_COMMIT_SIZE", 2)
+    write_league_rankings = leagueBuild.write_league_rankings
+    written = []
+
+    def failing_write(cursor, league, pokemon_id, rows):
+        written.append(pokemon_id)
+        if len(set(written)) == 4:
+            raise RuntimeError("disk full")
+        return write_league_rankings(cursor, league, pokemon_id, rows)
+
+    monkeypatch.setattr(leagueBuild, "write_league_rankings", failing_write)
+    with pytest.raises(RuntimeError):
+        build_leagues(source_db, bulk=True)
+
+    # Only the first batch of two Pokémon was committed
+    with sqlite3.connect(source_db) as conn:
+        built = conn.execute("SELECT DISTINCT pokemon_id FROM league_rankings ORDER BY pokemon_id").fetchall()
+        recorded = conn.execute("SELECT DISTINCT pokemon_id FROM league_build_state ORDER BY pokemon_id").fetchall()
+    assert len(built) == 2
+    assert built == recorded
+
+    monkeypatch.setattr(leagueBuild, "write_league_rankings", write_league_rankings)
+    build_leagues(source_db, bulk=True)
+    assert read_table(source_db, "league_rankings") == read_table(_built_db, "league_rankings")
+
+
+def test_parallel_incremental_bulk_build_matches(built_db, _built_db, monkeypatch):
+    with sqlite3.connect(built_db) as conn:
+        conn.execute("DELETE FROM league_rankings WHERE league IN ('GL', 'ML') AND pokemon_id IN (1, 133)")
+    scratch_dirs = []
+    temporary_directory = tempfile.TemporaryDirectory
+
+    def recording_directory(*args, **kwargs):
+        scratch_dir = temporary_directory(*args, **kwargs)
+        scratch_dirs.append(scratch_dir.name)
+        return scratch_dir
+
+    monkeypatch.setattr(leagueBuild.tempfile, "TemporaryDirectory", recording_directory)
+    build_leagues(built_db, workers=2, bulk=True)
+    assert read_table(built_db, "league_rankings") == read_table(_built_db, "league_rankings")
+    assert scratch_dirs and not any(os.path.exists(scratch_dir) for scratch_dir in scratch_dirs)
+
+
+def test_failed_parallel_copy_stops_the_pool_and_resumes(source_db, _built_db, monkeypatch):
+    copy_scratch_rankings = leagueBuild.copy_scratch_rankings
+    copied = []
+
+    def failing_copy(cursor, leagues, pokemon_id, scratch_path):
+        copied.append(pokemon_id)
+        if len(copied) == 3:
+            raise RuntimeError("disk full")
+        return copy_scratch_rankings(cursor, leagues, pokemon_id, scratch_path)
+
+    monkeypatch.setattr(leagueBuild, "copy_scratch_rankings", failing_copy)
+    with pytest.raises(RuntimeError):
+        build_leagues(source_db, workers=2)
+    with sqlite3.connect(source_db) as conn:
+        assert len(conn.execute("SELECT DISTINCT pokemon_id FROM league_rankings").fetchall()) == 2
+
+    monkeypatch.setattr(leagueBuild, "copy_scratch_rankings", copy_scratch_rankings)
+    build_leagues(source_db, workers=2)
+    assert read_table(source_db, "league_rankings") == read_table(_built_db, "league_rankings")
@@ -0,0 +1,89 @@
+import random
+import sqlite3
+
+import pytest
+
+import Main
+from nameIndex import NameIndex, edit_distance, normalize_name
+from tableVersions import bump_table_version
+
+NAMES = ["Bulbasaur", "Ivysaur", "Venusaur", "Nidoran♀", "Nidoran♂", "Eevee", "Vaporeon", "Jolteon",
+         "Flareon", "Porygon", "Porygon2", "Porygon-Z", "Mew", "Mewtwo", "Muk", "Mr. Mime", "Flabébé",
+         "Farfetch'd", "Type: Null", "Ho-Oh"]
+
+
+# Function to find the closest name by comparing with every known name
+def brute_force_lookup(name):
+    key = normalize_name(name)
+    max_distance = min(2, max(1, len(key) // 3))
+    distance, closest = min((edit_distance(key, normalize_name(known)), normalize_name(known)) for known in NAMES)
+    if distance > max_distance:
+        return None
+    return next(known for known in NAMES if normalize_name(known) == closest), distance
+
+
+# Function to garble a name the way OCR does: dropped, swapped and inserted characters
+def garble(name, rng):
+    characters = list(name)
+    for _ in range(rng.randrange(4)):
+        position = rng.randrange(len(characters) + 1)
+        operation = rng.choice("dis")
+        if operation == "d" and position < len(characters) and len(characters) > 1:
+            del characters[position]
+        elif operation == "i":
+            characters.insert(position, rng.choice("aeilnorstu1 "))
+        elif position < len(characters):
+            characters[position] = rng.choice("aeilnorstu1")
+    return "".join(characters)
+
+
+def test_lookup_matches_brute_force():
+    name_index = NameIndex(NAMES)
+    rng = random.Random(7)
+    for _ in range(2000):
+        name = garble(rng.choice(NAMES), rng)
+        assert name_index.lookup(name) == brute_force_lookup(name), name
+
+
+def test_exact_and_normalized_names():
+    name_index = NameIndex(NAMES)
+    assert name_index.lookup("Porygon2") == ("Porygon2", 0)
+    assert name_index.lookup("  mr.   MIME ") == ("Mr. Mime", 0)
+    assert name_index.lookup("Mew") == ("Mew", 0)
+    assert name_index.lookup("Xyz") is None
+
+
+@pytest.fixture
+def lookups(built_db, monkeypatch):
+    monkeypatch.setattr(Main, "DB_PATH", built_db)
+    monkeypatch.setattr(Main, "RANK_INDEX_PATH", None)
+    return built_db
+
+
+def test_resolving_names_runs_no_sql(lookups):
+    Main.refresh_table_versions()
+    assert Main.resolve_pokemon_name("Eeveee") == ("Eevee", 1)
+
+    statements = []
+    Main.get_connection().set_trace_callback(statements.append)
+    try:
+        for name in ("Bulbasaur", "Venusaurr", "Porygon2", "Nidoran♀"):
+            Main.resolve_pokemon_name(name)
+    finally:
+        Main.get_connection().set_trace_callback(None)
+    assert statements == []
+
+
+def test_refreshed_tables_are_picked_up_by_the_next_batch(lookups):
+    extracted = {"image": "a.png", "ocr_specific": {"Name": "Flareon", "CP": "1000"},
+                 "attack_value": 15, "defense_value": 15, "hp_value": 15}
+    Main.lookup_extracted_batch([dict(extracted)])
+    assert Main.resolve_pokemon_name("Flareon") == ("Flareon", None)
+
+    with sqlite3.connect(lookups) as conn:
+        conn.execute("INSERT INTO pokemon_stats VALUES (136, 'Flareon', 246, 179, 163)")
+        bump_table_version(conn.cursor(), 'pokemon_stats')
+
+    batch = [dict(extracted)]
+    Main.lookup_extracted_batch(batch)
+    assert batch[0]["name_match"] == {"name": "Flareon", "distance": 0}
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+import ocrPipeline
+from conftest import write_screens
+from ocrPipeline import run_pipeline
+
+# Seconds after which a pipeline that has not returned counts as hung
+PIPELINE_TIMEOUT = 30
+
+
+# Function to run the pipeline in another thread, failing the test instead of hanging it
+def run_with_timeout(*args, **kwargs):
+    outcome = {}
+
+    # Function to run the pipeline and keep what it returned or raised
+    def target():
+        try:
+            outcome["stages"] = run_pipeline(*args, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(PIPELINE_TIMEOUT)
+    assert not thread.is_alive(), "pipeline did not return"
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("pipeline-")]
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["stages"]
+
+
+# Function to look up a batch the way Main.lookup_extracted_batch does, slowly for some batches
+def lookup_names(batch):
+    if len(batch) > 1:
+        time.sleep(0.01)
+    return [result["ocr_specific"]["Name"] for result in batch]
+
+
+def test_results_are_written_in_path_order(tmp_path, stub_reader):
+    name_values = [20, 60, 40, 90, 30, 70, 50]
+    paths = write_screens(tmp_path, name_values)
+    written = []
+
+    stages = run_with_timeout(paths, lookup_names, written.append, batch_size=2, queue_size=1)
+
+    assert [result["image"] for result, _ in written] == paths
+    assert [lookup for _, lookup in written] == [str(value) for value in name_values]
+    assert all(result["ocr_specific"]["CP"] == str(int(lookup) + 100) for result, lookup in written)
+    assert {stats.name: stats.items for stats in stages} == \
+        {"decode": 7, "extract": 7, "lookup": 7, "write": 7}
+
+
+# Function to make a stage's iterator fail once it has produced one item
+def fail_after_first(items):
+    for index, item in enumerate(items):
+        if index:
+            raise RuntimeError("stage failed")
+        yield item
+
+
+# Function to make a callable fail from its second call on
+def fail_after_first_call(function):
+    calls = []
+
+    # Function to call function the first time and fail every time after
+    def wrapper(*args):
+        calls.append(args)
+        if len(calls) > 1:
+            raise RuntimeError("stage failed")
+        return function(*args)
+    return wrapper
+
+
+@pytest.mark.parametrize("stage", ["decode", "extract", "lookup", "write"])
+def test_stage_failure_reaches_the_caller(tmp_path, stub_reader, monkeypatch, stage):
+    paths = write_screens(tmp_path, range(20, 50, 2))
+    lookup_batch = lambda batch: [None] * len(batch)
+    written = []
+    write = written.append
+    if stage == "decode":
+        source_frames = ocrPipeline.iter_source_frames
+        monkeypatch.setattr(ocrPipeline, "iter_source_frames", lambda paths: fail_after_first(source_frames(paths)))
+    elif stage == "extract":
+        frames = ocrPipeline.process_frames
+        monkeypatch.setattr(ocrPipeline, "process_frames",
+                            lambda *args, **kwargs: fail_after_first(frames(*args, **kwargs)))
+    elif stage == "lookup":
+        lookup_batch = fail_after_first_call(lookup_batch)
+    else:
+        write = fail_after_first_call(write)
+
+    with pytest.raises(RuntimeError, match="stage failed"):
+        run_with_timeout(paths, lookup_batch, write, batch_size=2, queue_size=1)
+    assert len(written) <= 2
+
+
+def test_stopping_early_closes_every_stage(tmp_path, stub_reader, monkeypatch):
+    paths = write_screens(tmp_path, range(20, 60, 2))
+    decoded = []
+    closed = []
+
+    # Function to record which frames were decoded and whether decoding was closed before the end
+    def iter_source_frames(paths):
+        try:
+            for path in paths:
+                decoded.append(path)
+                yield from source_frames([path])
+        finally:
+            closed.append(len(decoded) < len(paths))
+
+    source_frames = ocrPipeline.iter_source_frames
+    monkeypatch.setattr(ocrPipeline, "iter_source_frames", iter_source_frames)
+
+    # Function to stop writing after the first result, like a closed report or Ctrl+C
+    def write(item):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        run_with_timeout(paths, lambda batch: [None] * len(batch), write, batch_size=2, queue_size=1)
+    # The bounded queues held decoding back, and stopping closed it instead of draining the paths
+    assert closed == [True]
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+import pkmOCR
+from conftest import StubReader, screen, write_screens
+from pkmOCR import (OCR_ALLOWLISTS, perform_ocr_on_area_crops, process_frames, process_sources_parallel,
+                    recognize_stacked_images)
+
+
+@pytest.mark.parametrize("recognition_only", [False, True])
+def test_mixed_screen_sizes_are_recognized_in_groups(stub_reader, recognition_only):
+    # A narrower screenshot clips the Name and CP crops, so they differ in size from the others
+    frames = [("a.png", screen(20, 120)), ("narrow.png", screen(30, 130, width=800)), ("b.png", screen(40, 140))]
+    results = list(process_frames(frames, batch_size=8, recognition_only=recognition_only))
+
+    assert [result["image"] for result in results] == ["a.png", "narrow.png", "b.png"]
+    assert [result["ocr_specific"] for result in results] == [
+        {"Name": "20", "CP": "120"}, {"Name": "30", "CP": "130"}, {"Name": "40", "CP": "140"}]
+    # One batched call per crop size and area: only the Name area is clipped at 800 pixels
+    assert len(stub_reader.calls) == 3
+
+
+@pytest.mark.parametrize("recognition_only", [False, True])
+def test_failed_image_does_not_fail_its_batch(stub_reader, recognition_only):
+    frames = [("a.png", screen(20, 120)), ("bad.png", screen(StubReader.FAILING_VALUE, 130)),
+              ("b.png", screen(40, 140))]
+    results = list(process_frames(frames, batch_size=8, recognition_only=recognition_only))
+
+    assert [result["image"] for result in results] == ["a.png", "bad.png", "b.png"]
+    assert results[0]["ocr_specific"] == {"Name": "20", "CP": "120"}
+    assert results[1] == {"image": "bad.png", "error": "unreadable crop"}
+    assert results[2]["ocr_specific"] == {"Name": "40", "CP": "140"}
+
+
+def test_recognition_only_maps_stacked_boxes_back_to_their_crops(stub_reader):
+    # Each crop is half dark and half light, so a box off by even a few rows reads another value
+    def crop(height, width, top_value, bottom_value):
+        image = np.full((height, width, 3), bottom_value, dtype=np.uint8)
+        image[:height // 2] = top_value
+        return image
+
+    crops = [{"Name": crop(20, 60, 10 * i, 10 * i + 40), "CP": crop(12, 30, 100 + 10 * i, 140 + 10 * i)}
+             for i in range(4)]
+    results = perform_ocr_on_area_crops(crops, recognition_only=True)
+
+    assert results == [{"Name": str(10 * i + 20), "CP": str(10 * i + 120)} for i in range(4)]
+    # One recognize call per area, with every crop of the area as one box
+    assert stub_reader.calls == [("recognize", 4), ("recognize", 4)]
+    assert stub_reader.allowlists == [OCR_ALLOWLISTS["Name"], OCR_ALLOWLISTS["CP"]]
+
+
+class BoxReader:
+    """Stands in for easyocr.Reader.recognize, returning preset (box, text, confidence) results."""
+
+    def __init__(self, results):
+        self.results = results
+
+    def recognize(self, image, horizontal_list=None, free_list=None, detail=1, allowlist=None, batch_size=1):
+        return self.results
+
+
+# Function to make an easyocr box spanning the given rows of the stacked image
+def box(y_min, y_max, x_min=0, x_max=60):
+    return [[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]]
+
+
+def test_stacked_boxes_are_mapped_by_their_vertical_center(monkeypatch):
+    # Three 40-pixel crops stacked at rows 0, 40 and 80
+    monkeypatch.setattr(pkmOCR, "_reader", BoxReader([
+        (box(0, 40), "first", 0.9),
+        # Boxes starting or ending exactly on a crop boundary
+        (box(40, 80, 0, 30), "second", 0.9),
+        (box(30, 40), "end", 0.9),
+        # Recognized words spilling over into the neighbouring crops
+        (box(36, 84, 30, 60), "word", 0.9),
+        (box(78, 124), "third", 0.9),
+        # Boxes reaching outside the stacked image
+        (box(-6, 4), "top", 0.9),
+        (box(116, 130), "bottom", 0.9),
+    ]))
+    crops = [np.zeros((40, 60), dtype=np.uint8) for _ in range(3)]
+
+    assert recognize_stacked_images(crops) == ["first end top", "second word", "third bottom"]
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_parallel_workers_keep_path_order_and_survive_failed_images(tmp_path, stub_reader, ordered):
+    name_values = [20, 30, StubReader.FAILING_VALUE, 40, 50, 60, 70]
+    paths = write_screens(tmp_path, name_values)
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+    paths.insert(4, str(broken))
+
+    # Chunks of two paths over two worker processes, which inherit the stub reader
+    results = list(process_sources_parallel(paths, workers=2, batch_size=2, ordered=ordered))
+
+    if not ordered:
+        results.sort(key=lambda result: paths.index(result["image"]))
+    assert [result["image"] for result in results] == paths
+    assert results[2] == {"image": paths[2], "error": "unreadable crop"}
+    assert set(results[4]) == {"image", "error"}
+    assert [result["ocr_specific"] for result in results[:2] + results[3:4] + results[5:]] == \
+        [{"Name": str(value), "CP": str(value + 100)} for value in name_values if value != StubReader.FAILING_VALUE]
+    # All OCR ran in the workers
+    assert stub_reader.calls == []
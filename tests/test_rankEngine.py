@@ -0,0 +1,67 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from conftest import SPECIES
+from cpMultiplier import cp_multiplier_data
+from rankEngine import compute_species_grid, rank_league, rank_species, ranking_rows, round_half_even
+
+IVS = list(itertools.product(range(16), range(16), range(16)))
+
+CP_MULTIPLIERS = sorted(cp_multiplier_data, reverse=True)
+
+
+# Function to rank a species with the per-row loop of the original league scripts
+def baseline_rankings(stat_attack, stat_defense, stat_stamina, cp_cap=None, max_level=None):
+    results = []
+    for iv_attack, iv_defense, iv_stamina in IVS:
+        calc_attack = stat_attack + iv_attack
+        calc_defense = stat_defense + iv_defense
+        calc_stamina = stat_stamina + iv_stamina
+        for level, multiplier in CP_MULTIPLIERS:
+            if max_level is not None and level > max_level:
+                continue
+            cp = math.floor((calc_attack * (calc_defense ** 0.5) * (calc_stamina ** 0.5) * (multiplier ** 2)) / 10)
+            if cp_cap is None or cp <= cp_cap:
+                actual_attack = calc_attack * multiplier
+                actual_defense = calc_defense * multiplier
+                actual_stamina = int(calc_stamina * multiplier)
+                sp = math.ceil((actual_attack * actual_defense * actual_stamina) / 1000 * 10) / 10
+                results.append((iv_attack, iv_defense, iv_stamina, sp, cp, level))
+                break
+
+    results.sort(key=lambda result: (result[3], result[4]), reverse=True)
+    max_sp = results[0][3]
+    return [(rank, *result, round((result[3] / max_sp) * 100, 2)) for rank, result in enumerate(results, 1)]
+
+
+@pytest.mark.parametrize("cp_cap, max_level", [(500, None), (1500, None), (2500, None), (None, 50)])
+@pytest.mark.parametrize("species", SPECIES, ids=[species[1] for species in SPECIES])
+def test_rank_species_matches_per_row_baseline(species, cp_cap, max_level):
+    _, _, stat_attack, stat_defense, stat_stamina = species
+    ranking = rank_species(stat_attack, stat_defense, stat_stamina, IVS, cp_multiplier_data, cp_cap, max_level)
+
+    vectorized = list(zip(ranking['rank'].tolist(), ranking['iv_attack'].tolist(), ranking['iv_defense'].tolist(),
+                          ranking['iv_stamina'].tolist(), ranking['sp'].tolist(), ranking['cp'].tolist(),
+                          ranking['level'].tolist(), ranking['percentage'].tolist()))
+    assert vectorized == baseline_rankings(stat_attack, stat_defense, stat_stamina, cp_cap, max_level)
+
+
+def test_rank_league_drops_combinations_without_a_valid_level():
+    grid = compute_species_grid(300, 182, 214, IVS, cp_multiplier_data)
+    ranking = rank_league(grid, cp_cap=10)
+    assert len(ranking['rank']) == 0
+
+
+def test_round_half_even_matches_round():
+    values = np.array([0.125, 0.135, 2.675, 99.995, 100.0, 12.3449999, 1 / 3]) * 100
+    assert round_half_even(values, 2).tolist() == [round(value, 2) for value in values.tolist()]
+
+
+def test_ranking_rows_are_in_iv_order():
+    ranking = rank_species(118, 111, 128, IVS, cp_multiplier_data, 1500)
+    rows = list(ranking_rows(ranking, "GL", 1))
+    assert [row[2:5] for row in rows] == IVS
+    assert all(row[:2] == ("GL", 1) for row in rows)
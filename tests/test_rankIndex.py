@@ -0,0 +1,120 @@
+import itertools
+import os
+import sqlite3
+
+import pytest
+
+import Main
+from leagueBuild import build_leagues
+from rankIndex import RankIndex, export_rank_index
+
+
+@pytest.fixture
+def lookups(built_db, tmp_path, monkeypatch):
+    """Main pointed at a built database, with the rank index path in tmp_path (not yet exported)."""
+    index_path = str(tmp_path / "pokemon_ranks.bin")
+    monkeypatch.setattr(Main, "DB_PATH", built_db)
+    monkeypatch.setattr(Main, "RANK_INDEX_PATH", index_path)
+    monkeypatch.setattr(Main, "_rank_index", None)
+    return built_db, index_path
+
+
+# Function to look every request up through SQLite, ignoring the rank index
+def sqlite_rankings(requests, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(Main, "RANK_INDEX_PATH", None)
+        return Main.get_rankings_batch(requests)
+
+
+def test_rank_index_matches_sqlite(lookups, monkeypatch):
+    db_path, index_path = lookups
+    export_rank_index(db_path, index_path)
+    rank_index = RankIndex(index_path)
+
+    with sqlite3.connect(db_path) as conn:
+        pokemon_ids = [pokemon_id for pokemon_id, in conn.execute("SELECT pokemon_id FROM pokemon_stats")]
+    # Every IV combination of every species, plus ids the index does not hold
+    requests = [(pokemon_id, *ivs) for pokemon_id in pokemon_ids + [0, 4, 100000]
+                for ivs in itertools.product(range(16), range(16), range(16))]
+
+    expected = sqlite_rankings(requests, monkeypatch)
+    assert [rank_index.get_rankings(*request) for request in requests] == expected
+    for result in expected[:4096]:
+        for ranking in result.values():
+            assert type(ranking["stat_product"]) in (int, float)
+    rank_index.close()
+
+
+def test_stale_rank_index_falls_back_to_sqlite(lookups, monkeypatch):
+    db_path, index_path = lookups
+    export_rank_index(db_path, index_path)
+    request = (133, 15, 15, 15)
+    assert Main.get_rank_index() is not None
+
+    # New base stats for Eevee change its rankings; the exported index no longer matches
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE pokemon_stats SET stat_attack = stat_attack + 20 WHERE pokemon_id = 133")
+    build_leagues(db_path)
+
+    # Checked once per lookup batch
+    assert Main.get_rank_index() is not None
+    Main.refresh_table_versions()
+    assert Main.get_rank_index() is None
+    assert Main.get_rankings(*request) == sqlite_rankings([request], monkeypatch)[0]
+
+    # A re-export is picked up without restarting
+    export_rank_index(db_path, index_path)
+    Main.refresh_table_versions()
+    assert Main.get_rank_index() is not None
+    assert Main.get_rankings(*request) == sqlite_rankings([request], monkeypatch)[0]
+
+
+def test_unchanged_build_keeps_the_index_current(lookups):
+    db_path, index_path = lookups
+    export_rank_index(db_path, index_path)
+    build_leagues(db_path)
+    Main.refresh_table_versions()
+    assert Main.get_rank_index() is not None
+
+
+def test_unsupported_or_missing_index_is_ignored(lookups):
+    _, index_path = lookups
+    assert Main.get_rank_index() is None
+
+    with open(index_path, "wb") as index_file:
+        index_file.write(b"not an index" * 10)
+    Main.refresh_table_versions()
+    assert Main.get_rank_index() is None
+
+    os.remove(index_path)
+    Main.refresh_table_versions()
+    assert Main.get_rank_index() is None
+
+
+def test_lookups_run_no_sql_or_stat_between_batches(lookups, monkeypatch):
+    db_path, index_path = lookups
+    export_rank_index(db_path, index_path)
+    Main.refresh_table_versions()
+
+    statements = []
+    stats = []
+    stat = os.stat
+    Main.get_connection().set_trace_callback(statements.append)
+    monkeypatch.setattr(os, "stat", lambda *args, **kwargs: stats.append(args) or stat(*args, **kwargs))
+    try:
+        for ivs in itertools.product(range(4), repeat=3):
+            assert isinstance(Main.get_rankings(133, *ivs)["Great League"], dict)
+        Main.get_rankings_batch([(1, 15, 15, 15), (150, 0, 0, 0)])
+    finally:
+        Main.get_connection().set_trace_callback(None)
+    assert statements == [] and stats == []
+
+    # The next lookup batch checks the index once
+    Main.lookup_evolution_rankings_batch([("Eevee", 15, 15, 15)])
+    assert len(stats) == 1
+
+    # So does a batch of extracted images, which also checks the CP levels
+    extracted = {"ocr_specific": {"Name": "Eevee", "CP": "10"}, "attack_value": 15, "defense_value": 15,
+                 "hp_value": 15}
+    Main.lookup_extracted_batch([dict(extracted, image=str(index)) for index in range(3)])
+    assert len(stats) == 2
@@ -0,0 +1,107 @@
+import csv
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from jsonEncoding import json_default
+import resultSinks
+from resultSinks import CSV_COLUMNS, RESULT_FIELDS, build_record, open_sink
+
+EXTRACTED = {
+    "image": "/screens/eevee.png",
+    "ocr_specific": {"Name": "Eevee", "CP": "512"},
+    "name_match": {"name": "Eevee", "distance": 0},
+    "levels": [np.float64(20.0)],
+    "attack_value": np.int64(15),
+    "defense_value": np.int64(14),
+    "hp_value": np.int64(13),
+    "is_shadow": np.bool_(False),
+}
+
+EVOLUTION_RANKINGS = [
+    ("Eevee", {"GL": {"rank": 12, "stat_product": 1450, "combat_power": 1490, "level": 40.0, "percentage": 98.5},
+               "UL": "No data found."}),
+    ("Vaporeon", None),
+]
+
+FAILED = {"image": "/screens/broken.png", "error": "Could not read image"}
+
+
+def test_build_record_is_plain_json():
+    record = build_record(EXTRACTED, EVOLUTION_RANKINGS)
+    assert json.loads(json.dumps(record)) == record
+    assert record["iv_attack"] == 15 and type(record["iv_attack"]) is int
+    assert record["evolutions"][1] == {"name": "Vaporeon", "rankings": None}
+    assert build_record(FAILED, None)["error"] == "Could not read image"
+
+
+def test_json_default_converts_numpy_scalars_only():
+    assert json.dumps([np.int64(3), np.float32(0.5)], default=json_default) == "[3, 0.5]"
+    with pytest.raises(TypeError):
+        json.dumps(object(), default=json_default)
+
+
+def test_result_sinks_do_not_import_the_ocr_stack():
+    code = "import sys, resultSinks; print('pkmOCR' in sys.modules or 'cv2' in sys.modules)"
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(resultSinks.__file__)), text=True)
+    assert output.strip() == "False"
+
+
+def test_jsonl_sink(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    sink = open_sink(path)
+    sink.write(EXTRACTED, EVOLUTION_RANKINGS)
+    sink.write(FAILED, None)
+    sink.close()
+
+    with open(path, encoding="utf-8") as results:
+        records = [json.loads(line) for line in results]
+    assert records == [build_record(EXTRACTED, EVOLUTION_RANKINGS), build_record(FAILED, None)]
+
+
+def test_csv_sink_appends_without_repeating_the_header(tmp_path):
+    path = str(tmp_path / "results.csv")
+    for append in (False, True):
+        sink = open_sink(path, append)
+        sink.write(EXTRACTED, EVOLUTION_RANKINGS)
+        sink.close()
+
+    with open(path, newline="", encoding="utf-8") as results:
+        rows = list(csv.reader(results))
+    assert rows[0] == CSV_COLUMNS
+    # Eevee GL, Eevee UL and Vaporeon, twice
+    assert len(rows) == 7
+    assert rows[1][CSV_COLUMNS.index("levels")] == "[20.0]"
+    assert rows[3][CSV_COLUMNS.index("note")] == "Not found in the database."
+
+
+def test_sqlite_sink(tmp_path):
+    path = str(tmp_path / "results.db")
+    sink = open_sink(path)
+    sink.write(EXTRACTED, EVOLUTION_RANKINGS)
+    sink.write(FAILED, None)
+    sink.close()
+
+    with sqlite3.connect(path) as conn:
+        results = conn.execute(f"SELECT {', '.join(RESULT_FIELDS)} FROM ocr_results ORDER BY image").fetchall()
+        rankings = conn.execute("SELECT evolution, league, rank, note FROM ocr_result_rankings").fetchall()
+    assert [row[0] for row in results] == ["/screens/broken.png", "/screens/eevee.png"]
+    assert rankings == [("Eevee", "GL", 12, None), ("Eevee", "UL", None, "No data found."),
+                        ("Vaporeon", None, None, "Not found in the database.")]
+
+
+def test_text_sink_and_unknown_extension(tmp_path):
+    path = str(tmp_path / "report.txt")
+    sink = open_sink(path)
+    sink.write(FAILED, None)
+    sink.close()
+    with open(path) as report:
+        assert "Error processing image: Could not read image" in report.read()
+
+    with pytest.raises(ValueError):
+        open_sink(str(tmp_path / "report.xml"))
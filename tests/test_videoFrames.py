@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+import pytest
+
+from pkmOCR import OCR_AREAS, iter_source_frames
+from videoFrames import SCREEN_SIZE, VIDEO_SAMPLE_FPS, VIDEO_STABLE_SECONDS, iter_appraisal_frames
+
+# Size the synthetic recordings are written at; iter_appraisal_frames scales them back to SCREEN_SIZE
+RECORDING_SIZE = (SCREEN_SIZE[0] // 3, SCREEN_SIZE[1] // 3)
+
+# Sampled frames of the recording: appraisal A, a swipe, appraisal B, a swipe back to the same
+# appraisal B (a duplicate hold), another swipe and appraisal A shown again
+TIMELINE = ["A"] * 5 + ["swipe"] * 3 + ["B"] * 5 + ["swipe"] * 3 + ["B"] * 5 + ["swipe"] * 3 + ["A"] * 5
+
+# Sampled frames at which A, B and the re-shown A have been still for VIDEO_STABLE_SECONDS
+EXPECTED_SAMPLES = [2, 10, 26]
+
+# Seconds into the recording at which A, B and the re-shown A appear
+SHOWN_SECONDS = [0.0, 0.8, 2.4]
+
+
+# Function to draw an appraisal screen whose Name and CP areas have the given gray values
+def appraisal(name_value, cp_value):
+    image = np.full((SCREEN_SIZE[1], SCREEN_SIZE[0], 3), 255, dtype=np.uint8)
+    for area_name, value in (("Name", name_value), ("CP", cp_value)):
+        (x_min, y_min), (x_max, y_max) = OCR_AREAS[area_name]
+        image[y_min:y_max, x_min:x_max] = value
+    return cv2.resize(image, RECORDING_SIZE, interpolation=cv2.INTER_AREA)
+
+
+# Function to write TIMELINE as a recording where each sampled frame is held for repeat frames
+def write_recording(path, fps, repeat):
+    screens = {"A": appraisal(60, 120), "B": appraisal(160, 40)}
+    random = np.random.default_rng(0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, RECORDING_SIZE)
+    assert writer.isOpened()
+    for name in TIMELINE:
+        # Every frame of a swipe differs from the one before
+        frames = [screens[name]] * repeat if name != "swipe" else \
+            [random.integers(0, 256, RECORDING_SIZE[::-1] + (3,), dtype=np.uint8) for _ in range(repeat)]
+        for frame in frames:
+            writer.write(frame)
+    writer.release()
+
+
+@pytest.mark.parametrize("fps", [VIDEO_SAMPLE_FPS, 3 * VIDEO_SAMPLE_FPS])
+def test_each_new_appraisal_is_extracted_once(tmp_path, fps):
+    path = str(tmp_path / "recording.avi")
+    repeat = fps // VIDEO_SAMPLE_FPS
+    write_recording(path, fps, repeat)
+
+    frames = list(iter_appraisal_frames(path))
+
+    # Only the last frame of every repeat is sampled, and labels hold the index in the whole recording
+    indexes = [sample * repeat + repeat - 1 for sample in EXPECTED_SAMPLES]
+    assert [label for label, _ in frames] == [f"{path}#frame={index}" for index in indexes]
+
+    # Each appraisal is extracted at the first sample after it has been still for VIDEO_STABLE_SECONDS
+    seconds = [int(label.rsplit("#frame=", 1)[1]) / fps for label, _ in frames]
+    for second, shown in zip(seconds, SHOWN_SECONDS):
+        assert shown + VIDEO_STABLE_SECONDS <= second + 1e-9 < shown + VIDEO_STABLE_SECONDS + 1 / VIDEO_SAMPLE_FPS
+    assert all(frame.shape == (SCREEN_SIZE[1], SCREEN_SIZE[0], 3) for _, frame in frames)
+
+    # The re-shown appraisal is the same screen as the first one
+    name_area = OCR_AREAS["Name"]
+    centers = [frame[(name_area[0][1] + name_area[1][1]) // 2, (name_area[0][0] + name_area[1][0]) // 2, 0]
+               for _, frame in frames]
+    assert np.allclose(centers, [60, 160, 60], atol=5)
+
+
+def test_source_frames_mix_screenshots_and_recordings(tmp_path):
+    recording = str(tmp_path / "recording.avi")
+    write_recording(recording, VIDEO_SAMPLE_FPS, 1)
+    screenshot = str(tmp_path / "screenshot.png")
+    cv2.imwrite(screenshot, appraisal(60, 120))
+    missing = str(tmp_path / "missing.mp4")
+
+    sources = list(iter_source_frames([screenshot, recording, missing]))
+
+    assert [source for source, _ in sources] == \
+        [screenshot] + [f"{recording}#frame={sample}" for sample in EXPECTED_SAMPLES] + [missing]
+    assert isinstance(sources[-1][1], FileNotFoundError)
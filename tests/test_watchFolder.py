@@ -0,0 +1,76 @@
+import json
+import os
+import sqlite3
+
+import Main
+from watchFolder import load_checkpoint, open_checkpoint, scan_new_files, watch_folder
+
+# Modification time of the test files, well before any settle window
+OLD_MTIME_NS = 1_600_000_000 * 10 ** 9
+
+
+# Function to write a file that cannot be decoded, so processing it needs no OCR
+def write_broken_image(path, content=b"not an image", mtime_ns=OLD_MTIME_NS):
+    path.write_bytes(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return os.path.abspath(path)
+
+
+# Function to read the images of a JSON lines report
+def report_images(report_path):
+    with open(report_path, encoding="utf-8") as report:
+        return [json.loads(line)["image"] for line in report]
+
+
+def test_scan_skips_processed_unsettled_and_other_files(tmp_path):
+    first = write_broken_image(tmp_path / "b.png", mtime_ns=OLD_MTIME_NS)
+    second = write_broken_image(tmp_path / "a.jpg", mtime_ns=OLD_MTIME_NS + 1)
+    write_broken_image(tmp_path / "notes.txt")
+    (tmp_path / "folder.png").mkdir()
+    (tmp_path / "fresh.png").write_bytes(b"still being copied")
+
+    new_files = scan_new_files(str(tmp_path), {})
+    assert [path for path, _, _ in new_files] == [first, second]
+
+    processed = {first: (new_files[0][1], new_files[0][2])}
+    assert [path for path, _, _ in scan_new_files(str(tmp_path), processed)] == [second]
+
+    # A changed file is processed again
+    write_broken_image(tmp_path / "b.png", b"changed content", OLD_MTIME_NS + 2)
+    assert [path for path, _, _ in scan_new_files(str(tmp_path), processed)] == [second, first]
+
+
+def test_restart_resumes_from_the_checkpoint(tmp_path, built_db, monkeypatch):
+    monkeypatch.setattr(Main, "DB_PATH", built_db)
+    folder = tmp_path / "screens"
+    folder.mkdir()
+    report_path = str(tmp_path / "report.jsonl")
+    checkpoint_path = str(tmp_path / "checkpoint.db")
+    first = write_broken_image(folder / "first.png")
+
+    watch_folder(str(folder), [report_path], checkpoint_path, once=True)
+    assert report_images(report_path) == [first]
+
+    # Only the new file is appended after a restart
+    second = write_broken_image(folder / "second.png", mtime_ns=OLD_MTIME_NS + 1)
+    watch_folder(str(folder), [report_path], checkpoint_path, once=True)
+    assert report_images(report_path) == [first, second]
+
+    watch_folder(str(folder), [report_path], checkpoint_path, once=True)
+    assert report_images(report_path) == [first, second]
+
+    conn = open_checkpoint(checkpoint_path)
+    try:
+        assert set(load_checkpoint(conn)) == {first, second}
+    finally:
+        conn.close()
+
+
+def test_empty_folder_writes_nothing(tmp_path):
+    report_path = str(tmp_path / "report.jsonl")
+    checkpoint_path = str(tmp_path / "checkpoint.db")
+
+    watch_folder(str(tmp_path), [report_path], checkpoint_path, once=True)
+    assert report_images(report_path) == []
+    with sqlite3.connect(checkpoint_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM processed_files").fetchone() == (0,)
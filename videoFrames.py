@@ -0,0 +1,94 @@
+import cv2
+import numpy as np
+
+from pkmOCR import OCR_AREAS, RECTANGLES, crop_area
+
+# Screen recordings that process_folder accepts next to screenshots
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.avi', '.mkv')
+
+# Screen size the OCR_AREAS and RECTANGLES coordinates are defined for (width, height)
+SCREEN_SIZE = (1170, 2532)
+
+# Frames per second of the recording that are actually compared (the others are only grabbed)
+VIDEO_SAMPLE_FPS = 10
+
+# Mean gray-level difference of any area between consecutive samples below which the screen is still
+VIDEO_MOTION_THRESHOLD = 1.5
+
+# Seconds the screen has to stay still before a frame counts as a stable appraisal screen
+VIDEO_STABLE_SECONDS = 0.2
+
+# Mean gray-level difference of any area to the last extracted frame above which it shows a new Pokémon
+VIDEO_CHANGE_THRESHOLD = 2.0
+
+# Areas compared between frames: Name, CP and the bar of each IV
+SIGNATURE_AREAS = list(OCR_AREAS.values()) + [
+    (stat_rectangles[0][0], stat_rectangles[-1][1]) for stat_rectangles in RECTANGLES.values()
+]
+
+
+# Compute small grayscale thumbnails of the Name, CP and IV bar areas of a frame, one row per area
+def frame_signature(frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return np.stack([cv2.resize(crop_area(gray, area), (48, 8), interpolation=cv2.INTER_AREA).ravel()
+                     for area in SIGNATURE_AREAS]).astype(np.float32)
+
+
+# Difference between two signatures: the mean gray-level difference of the most changed area
+def signature_distance(signature, other):
+    return np.abs(signature - other).mean(axis=1).max()
+
+
+# Yield the distinct, stable appraisal frames of a screen recording
+def iter_appraisal_frames(video_path, sample_fps=VIDEO_SAMPLE_FPS, motion_threshold=VIDEO_MOTION_THRESHOLD,
+                          stable_seconds=VIDEO_STABLE_SECONDS, change_threshold=VIDEO_CHANGE_THRESHOLD):
+    """Yields ("<video_path>#frame=<index>", frame) for each new Pokémon shown in the recording.
+
+    Only every n-th frame (sample_fps per second) is decoded to pixels and compared. A sampled
+    frame is extracted once the Name/CP/IV areas have stayed still for stable_seconds
+    and differ from the previously extracted frame, so swipe animations and repeated frames of
+    the same appraisal are skipped without any OCR.
+    """
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise FileNotFoundError(f"Video could not be opened: {video_path}")
+
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30
+        frame_step = max(1, round(fps / sample_fps))
+        stable_samples = max(1, round(stable_seconds * fps / frame_step))
+
+        previous_signature = None
+        extracted_signature = None
+        still_samples = 0
+        frame_index = -1
+
+        while True:
+            # Skip the frames between samples without converting them
+            for _ in range(frame_step - 1):
+                if not capture.grab():
+                    return
+                frame_index += 1
+
+            ok, frame = capture.read()
+            if not ok:
+                return
+            frame_index += 1
+
+            if (frame.shape[1], frame.shape[0]) != SCREEN_SIZE:
+                frame = cv2.resize(frame, SCREEN_SIZE, interpolation=cv2.INTER_AREA)
+
+            signature = frame_signature(frame)
+            if previous_signature is not None and signature_distance(signature, previous_signature) < motion_threshold:
+                still_samples += 1
+            else:
+                still_samples = 0
+            previous_signature = signature
+
+            if still_samples == stable_samples and (
+                    extracted_signature is None
+                    or signature_distance(signature, extracted_signature) > change_threshold):
+                extracted_signature = signature
+                yield f"{video_path}#frame={frame_index}", frame
+    finally:
+        capture.release()
@@ -0,0 +1,161 @@
+import argparse
+import os
+import sqlite3
+import time
+
+import instrumentation
+from Main import IMAGE_EXTENSIONS, REPORT_PATH, lookup_extracted_batch
+from pkmOCR import OCR_BATCH_SIZE, process_sources_parallel
+from resultSinks import open_sink
+from videoFrames import VIDEO_EXTENSIONS
+
+# SQLite file recording which files have already been added to the report
+CHECKPOINT_PATH = 'pokemon_rankings_checkpoint.db'
+
+# Seconds between two scans of the watched folder
+WATCH_INTERVAL = 2.0
+
+# Seconds a file must be left unmodified before it is processed, so half-copied files are skipped
+WATCH_SETTLE_SECONDS = 2.0
+
+
+# Function to open the checkpoint database, creating its table on first use
+def open_checkpoint(checkpoint_path=CHECKPOINT_PATH):
+    conn = sqlite3.connect(checkpoint_path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS processed_files (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            processed_at REAL
+        )
+    ''')
+    conn.commit()
+    return conn
+
+
+# Function to load {path: (size, mtime_ns)} of every file already processed
+def load_checkpoint(conn):
+    return {path: (size, mtime_ns) for path, size, mtime_ns in
+            conn.execute("SELECT path, size, mtime_ns FROM processed_files")}
+
+
+# Function to find the screenshots and recordings that are not in the checkpoint yet
+def scan_new_files(folder_path, processed, settle_seconds=WATCH_SETTLE_SECONDS):
+    """Returns [(path, size, mtime_ns)] of new or changed files, oldest first.
+
+    The folder is streamed with os.scandir, whose entries carry their stat data, so files that
+    are already processed cost no extra system call.
+    """
+    extensions = IMAGE_EXTENSIONS + VIDEO_EXTENSIONS
+    settled_before = time.time_ns() - int(settle_seconds * 1e9)
+    new_files = []
+
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith(extensions) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            path = os.path.abspath(entry.path)
+            if processed.get(path) == (stat.st_size, stat.st_mtime_ns) or stat.st_mtime_ns > settled_before:
+                continue
+            new_files.append((path, stat.st_size, stat.st_mtime_ns))
+
+    new_files.sort(key=lambda new_file: (new_file[2], new_file[0]))
+    return new_files
+
+
+# Function to append the report entries of new files to every sink, checkpointing after each chunk
+def process_new_files(new_files, sinks, conn, processed, batch_size=OCR_BATCH_SIZE,
+                      recognition_only=False, workers=1):
+    """Processes new_files chunk by chunk and returns the number of report entries written.
+
+    A chunk is only recorded in the checkpoint after its entries have been flushed to every
+    sink, so after a crash at most one chunk is processed (and reported) again.
+    """
+    chunk_size = batch_size * (workers or os.cpu_count() or 1)
+    entries = 0
+
+    for start in range(0, len(new_files), chunk_size):
+        chunk = new_files[start:start + chunk_size]
+        extracted_batch = list(process_sources_parallel([path for path, _, _ in chunk], workers, batch_size,
+                                                        recognition_only=recognition_only))
+        for extracted_data, evolution_rankings in zip(extracted_batch, lookup_extracted_batch(extracted_batch)):
+            for sink in sinks:
+                sink.write(extracted_data, evolution_rankings)
+        entries += len(extracted_batch)
+        for sink in sinks:
+            sink.flush()
+
+        processed_at = time.time()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO processed_files VALUES (?, ?, ?, ?)",
+                             [(path, size, mtime_ns, processed_at) for path, size, mtime_ns in chunk])
+        processed.update({path: (size, mtime_ns) for path, size, mtime_ns in chunk})
+
+    return entries
+
+
+# Main function to keep adding new screenshots and recordings of a folder to the report
+def watch_folder(folder_path, output_paths=(REPORT_PATH,), checkpoint_path=CHECKPOINT_PATH, interval=WATCH_INTERVAL,
+                 once=False, batch_size=OCR_BATCH_SIZE, recognition_only=False, workers=1,
+                 settle_seconds=WATCH_SETTLE_SECONDS, instrument=False, profile_path=None, memory_path=None):
+    """Appends the report entries of files not processed before, then (unless once) keeps watching.
+
+    Restarting resumes from the checkpoint: files already in it are skipped, and a file is
+    processed again only if its size or modification time changed. Each of output_paths is
+    written in the format of its extension (see resultSinks.SINKS). With instrument=True every
+    scan that found new files ends with an instrumentation summary (see Main.process_folder).
+    """
+    conn = open_checkpoint(checkpoint_path)
+    sinks = []
+    try:
+        processed = load_checkpoint(conn)
+        print(f"Watching {folder_path} ({len(processed)} files already processed).")
+
+        for output_path in output_paths:
+            sinks.append(open_sink(output_path, append=True))
+
+        while True:
+            new_files = scan_new_files(folder_path, processed, settle_seconds)
+            if new_files:
+                if instrument or profile_path or memory_path:
+                    instrumentation.start_run(profile_path, memory_path)
+                try:
+                    entries = process_new_files(new_files, sinks, conn, processed, batch_size,
+                                                recognition_only, workers)
+                finally:
+                    instrumentation.finish_run()
+                print(f"Processed {len(new_files)} new files ({entries} report entries).")
+            if once:
+                return
+            time.sleep(interval)
+    finally:
+        for sink in sinks:
+            sink.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add new Pokémon screenshots of a folder to the rankings report.")
+    parser.add_argument("folder", help="Folder with screenshots and screen recordings")
+    parser.add_argument("--output", action="append",
+                        help="File to append to, in the format of its extension (.txt, .jsonl, .csv, .db); "
+                             f"may be repeated (default: {REPORT_PATH})")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="SQLite file recording processed files")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="Seconds between folder scans")
+    parser.add_argument("--once", action="store_true", help="Process the new files once and exit")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="OCR worker processes (0 = one per CPU core, 1 = no process pool)")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Print the time per stage, call counts and cache hit rates after each scan")
+    parser.add_argument("--profile", metavar="PATH", help="Dump a cProfile of each scan to this file")
+    parser.add_argument("--trace-memory", metavar="PATH", help="Dump a tracemalloc snapshot of each scan to this file")
+    args = parser.parse_args()
+
+    try:
+        watch_folder(args.folder, args.output or [REPORT_PATH], args.checkpoint, args.interval, args.once,
+                     workers=args.workers, instrument=args.instrument, profile_path=args.profile,
+                     memory_path=args.trace_memory)
+    except KeyboardInterrupt:
+        print("Stopped.")